@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import zlib
+import time
+import os
+
+# Persistent on-disk cache of Twitch API responses, keyed by URL
+#   Responses are stored zlib-compressed in a single SQLite database, along with their ETag/Last-Modified validators
+
+def getCachePath():
+	"""Returns the default location of the API cache database for linux or windows"""
+	if os.name == 'nt':
+		base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+	else:
+		base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return os.path.join(base, 'PackCrafter', 'apicache.sqlite3')
+
+# A single cached response, as returned by ResponseCache.get()
+class CacheEntry:
+	# Instance variables:
+	#   url          - the URL the response was fetched from
+	#   body         - the raw (decompressed) response body as bytes
+	#   etag         - the ETag header of the response, or None
+	#   lastModified - the Last-Modified header of the response, or None
+	#   fetchedAt    - the time.time() at which the response was last fetched or revalidated
+	def __init__(self, url, body, etag, lastModified, fetchedAt):
+		self.url = url
+		self.body = body
+		self.etag = etag
+		self.lastModified = lastModified
+		self.fetchedAt = fetchedAt
+
+	# Returns True if this entry is younger than ttl seconds
+	def isFresh(self, ttl):
+		return ttl != None and time.time() - self.fetchedAt < ttl
+
+	# Returns the headers needed to revalidate this entry with a conditional GET
+	def validatorHeaders(self):
+		headers = {}
+		if self.etag != None:
+			headers['If-None-Match'] = self.etag
+		if self.lastModified != None:
+			headers['If-Modified-Since'] = self.lastModified
+		return headers
+
+# LRU-evicting response cache backed by SQLite
+#   Safe to share between threads; every database access is serialized through a lock
+class ResponseCache:
+	# Instance variables:
+	#   path    - the path of the SQLite database file
+	#   maxSize - the cap, in bytes of compressed body, above which least-recently-used entries are evicted
+	#   hits    - number of get() calls that found an entry
+	#   misses  - number of get() calls that found nothing
+	#   accessed - a dict of {url: time.time()} of the entries get() found since access times were last written; they're written in one go
+	#              by the next write (put, touch) or close(), so a cache hit never costs a write transaction
+	def __init__(self, path=None, maxSize=256 * 1024 * 1024):
+		self.path = path if path != None else getCachePath()
+		self.maxSize = maxSize
+		self.hits = 0
+		self.misses = 0
+		self.accessed = {}
+		self.lock = threading.Lock()
+
+		if self.path != ':memory:':
+			os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		self.connection = sqlite3.connect(self.path, check_same_thread=False)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.execute('''CREATE TABLE IF NOT EXISTS responses (
+			url          TEXT PRIMARY KEY,
+			body         BLOB NOT NULL,
+			size         INTEGER NOT NULL,
+			etag         TEXT,
+			lastModified TEXT,
+			fetchedAt    REAL NOT NULL,
+			lastAccess   REAL NOT NULL)''')
+		self.connection.execute('CREATE INDEX IF NOT EXISTS responsesLastAccess ON responses (lastAccess)')
+		self.connection.commit()
+		self.totalSize = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+	# Returns the CacheEntry stored for url (marking it as recently used), or None
+	def get(self, url):
+		with self.lock:
+			row = self.connection.execute('SELECT body, etag, lastModified, fetchedAt FROM responses WHERE url = ?', (url,)).fetchone()
+			if row == None:
+				self.misses = self.misses + 1
+				return None
+			self.hits = self.hits + 1
+			self.accessed[url] = time.time()
+		return CacheEntry(url, zlib.decompress(row[0]), row[1], row[2], row[3])
+
+	# Stores a response body for url, then evicts old entries if the cache is over its size cap
+	def put(self, url, body, etag=None, lastModified=None):
+		compressed = zlib.compress(body, 6)
+		now = time.time()
+		with self.lock:
+			row = self.connection.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+			if row != None:
+				self.totalSize = self.totalSize - row[0]
+			self.connection.execute('INSERT OR REPLACE INTO responses (url, body, size, etag, lastModified, fetchedAt, lastAccess) VALUES (?, ?, ?, ?, ?, ?, ?)',
+				(url, compressed, len(compressed), etag, lastModified, now, now))
+			self.totalSize = self.totalSize + len(compressed)
+			self.accessed.pop(url, None)
+			self.flushAccess()
+			self.evict()
+			self.connection.commit()
+
+	# Marks an entry as freshly fetched, after the server confirmed it's unchanged (HTTP 304)
+	def touch(self, url):
+		now = time.time()
+		with self.lock:
+			self.accessed.pop(url, None)
+			self.flushAccess()
+			self.connection.execute('UPDATE responses SET fetchedAt = ?, lastAccess = ? WHERE url = ?', (now, now, url))
+			self.connection.commit()
+
+	# Writes the access times get() recorded into the database, as part of the caller's transaction
+	#   Must be called with the lock held
+	def flushAccess(self):
+		if self.accessed:
+			self.connection.executemany('UPDATE responses SET lastAccess = ? WHERE url = ?', [(lastAccess, url) for url, lastAccess in self.accessed.items()])
+			self.accessed = {}
+
+	# Removes least-recently-used entries until the cache fits in maxSize
+	#   Must be called with the lock held
+	def evict(self):
+		if self.totalSize <= self.maxSize:
+			return
+		for url, size in self.connection.execute('SELECT url, size FROM responses ORDER BY lastAccess ASC').fetchall():
+			self.connection.execute('DELETE FROM responses WHERE url = ?', (url,))
+			self.totalSize = self.totalSize - size
+			if self.totalSize <= self.maxSize:
+				break
+
+	# Removes every entry from the cache
+	def clear(self):
+		with self.lock:
+			self.connection.execute('DELETE FROM responses')
+			self.connection.commit()
+			self.accessed = {}
+			self.totalSize = 0
+
+	def close(self):
+		with self.lock:
+			self.flushAccess()
+			self.connection.commit()
+			self.connection.close()
@@ -1,16 +1,22 @@
 import tkinter
 from tkinter import ttk
-from packaging import version
-from enum import IntEnum
-from collections import namedtuple
+from tkinter import messagebox
+import logging
 import json
-import webbrowser
+import time
+import sys
 import os
-from zipfile import ZipFile
-import shutil
 
 import twitchapi
 import modlist
+import taskexecutor
+import modloaders
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Modules only needed once the user does something (webbrowser, catalog, packbuilder, packtargets, jarstore) are imported
+#   where they're used rather than here, so the window can be shown before they load; run with -X importtime to check
 
 def getDownloadPath():
     """Returns the default downloads path for linux or windows"""
@@ -24,37 +30,195 @@ def getDownloadPath():
     else:
         return os.path.join(os.path.expanduser('~'), 'downloads')
 
-# Scrollable Frame Class, courtesy of https://gist.github.com/mp035/9f2027c3ef9172264532fcd6262f3b01
-#   Modified to accept a width parameter (set to 25 by default)
-class ScrollFrame(tkinter.Frame):
-    def __init__(self, parent, width=25):
-        super().__init__(parent) # create a frame (self)
-
-        self.canvas = tkinter.Canvas(self, borderwidth=0, background="#ffffff", width=width)          #place canvas on self
-        self.viewPort = tkinter.Frame(self.canvas, background="#ffffff", width=width)                 #place a frame on the canvas, this frame will hold the child widgets 
-        self.vsb = tkinter.Scrollbar(self, orient="vertical", command=self.canvas.yview) #place a scrollbar on self 
-        self.canvas.configure(yscrollcommand=self.vsb.set)                          #attach scrollbar action to scroll of canvas
-
-        self.vsb.pack(side="right", fill="y")                                       #pack scrollbar to right of self
-        self.canvas.pack(side="left", fill="both", expand=True)                     #pack canvas to left of self and expand to fil
-        self.canvas_window = self.canvas.create_window((4,4), window=self.viewPort, anchor="nw",            #add view port frame to canvas
-                                  tags="self.viewPort")
-
-        self.viewPort.bind("<Configure>", self.onFrameConfigure)                       #bind an event whenever the size of the viewPort frame changes.
-        self.canvas.bind("<Configure>", self.onCanvasConfigure)                       #bind an event whenever the size of the viewPort frame changes.
-
-        self.onFrameConfigure(None)                                                 #perform an initial stretch on render, otherwise the scroll region has a tiny border until the first resize
-
-    def onFrameConfigure(self, event):                                              
-        '''Reset the scroll region to encompass the inner frame'''
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))                 #whenever the size of the frame changes, alter the scroll region respectively.
-
-    def onCanvasConfigure(self, event):
-        '''Reset the canvas window to encompass inner frame when required'''
-        canvas_width = event.width
-        self.canvas.itemconfig(self.canvas_window, width = canvas_width)            #whenever the size of the canvas changes alter the window region respectively.
-
-
+def getBootstrapPath():
+	"""Returns the location of the startup data snapshot for linux or windows"""
+	if os.name == 'nt':
+		base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+	else:
+		base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return os.path.join(base, 'PackCrafter', 'bootstrap.json')
+
+# Returns the startup data saved by the last run, or an empty dict if there is none (or it can't be read)
+#   Keys:
+#     minecraftVersions - a list of Minecraft version strings, as shown in the Minecraft version combobox
+def loadBootstrap(path=None):
+	try:
+		with open(path if path != None else getBootstrapPath(), encoding='utf-8') as bootstrapFile:
+			bootstrap = json.load(bootstrapFile)
+	except (OSError, ValueError):
+		return {}
+	return bootstrap if isinstance(bootstrap, dict) else {}
+
+# Saves the startup data for the next run, replacing the previous snapshot atomically
+def saveBootstrap(bootstrap, path=None):
+	path = path if path != None else getBootstrapPath()
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path + '.tmp', 'w', encoding='utf-8') as bootstrapFile:
+		json.dump(bootstrap, bootstrapFile)
+	os.replace(path + '.tmp', path)
+
+# Fetches the Minecraft version list and saves it as the snapshot shown on the next startup
+#   Returns the list of Minecraft version strings
+def refreshMinecraftVersions():
+	minecraftVersions = [entry['versionString'] for entry in twitchapi.getMinecraftVersionList()]
+	bootstrap = loadBootstrap()
+	bootstrap['minecraftVersions'] = minecraftVersions
+	try:
+		saveBootstrap(bootstrap)
+	except OSError:
+		pass # Only costs a slower start next time
+	return minecraftVersions
+
+# Returns the label shown for a File, with its A/B/R release type added on
+def fileLabel(file):
+	if file.releaseType == modlist.ReleaseType.ALPHA:
+		return file.fileName + " (Alpha)"
+	elif file.releaseType == modlist.ReleaseType.BETA:
+		return file.fileName + " (Beta)"
+	elif file.releaseType == modlist.ReleaseType.RELEASE:
+		return file.fileName + " (Release)"
+	return file.fileName + " (Unknown Type)"
+
+# Mod list display built on a ttk.Treeview, which only draws the rows that are scrolled into view
+#   refresh() diffs the ModList against the rows already shown, and only inserts, deletes or updates the rows that changed
+#   Clicking a row's file cell opens a combobox over it listing that mod's files for the selected Minecraft version
+class ModListView(tkinter.Frame):
+	# Instance variables:
+	#   tree             - the Treeview showing one row per Mod, with its iid set to the Mod's addonID
+	#   vsb              - the Treeview's vertical scrollbar
+	#   comboboxFile     - the combobox placed over a file cell while the user picks a file; hidden otherwise
+	#   comboboxFileDict - a dict of {file label: File} for the mod currently being edited with comboboxFile
+	#   rows             - a dict of {addonID: tuple of row values} for every row currently in the Treeview
+	#   modList          - the ModList last passed to refresh()
+	#   minecraftVersion - the Minecraft version last passed to refresh()
+	#   onSelectFile     - called with (Mod, File) when the user picks a file
+	#   onRemoveMods     - called with a list of addonIDs when the user presses Delete with rows selected
+	def __init__(self, parent, onSelectFile, onRemoveMods):
+		super().__init__(parent)
+		self.onSelectFile = onSelectFile
+		self.onRemoveMods = onRemoveMods
+		self.rows = {}
+		self.modList = None
+		self.minecraftVersion = None
+		self.editedModID = None
+		self.comboboxFileDict = {}
+
+		self.tree = ttk.Treeview(self, columns=('file', 'authors', 'page'), selectmode='extended')
+		self.tree.heading('#0', text='Mod')
+		self.tree.heading('file', text='File')
+		self.tree.heading('authors', text='Author(s)')
+		self.tree.heading('page', text='Curseforge Page')
+		self.tree.column('#0', width=200)
+		self.tree.column('file', width=320)
+		self.tree.column('authors', width=150)
+		self.tree.column('page', width=110, anchor='center')
+		self.vsb = tkinter.Scrollbar(self, orient="vertical", command=self.onScroll)
+		self.tree.configure(yscrollcommand=self.vsb.set)
+		self.vsb.pack(side="right", fill="y")
+		self.tree.pack(side="left", fill="both", expand=True)
+
+		self.comboboxFile = ttk.Combobox(self.tree, state="readonly")
+		self.comboboxFile.bind('<<ComboboxSelected>>', self.selectFile)
+		self.comboboxFile.bind('<Escape>', self.hideCombobox)
+		self.tree.bind('<Button-1>', self.onClick)
+		self.tree.bind('<Motion>', self.onMotion)
+		self.tree.bind('<Delete>', self.onDelete)
+		self.tree.bind('<MouseWheel>', self.hideCombobox)
+		self.tree.bind('<Configure>', self.hideCombobox)
+
+	# Returns the values shown in a Mod's row
+	def rowValues(self, mod):
+		if self.minecraftVersion == None:
+			fileText = 'Select a version of Minecraft'
+		elif not mod.getFiles(self.minecraftVersion):
+			fileText = 'No files for this version of Minecraft'
+		elif mod.selectedFile == None:
+			fileText = 'Choose a mod file'
+		else:
+			fileText = fileLabel(mod.selectedFile)
+		return (mod.modName, fileText, str(mod.authors), 'Curseforge Page')
+
+	# Brings the rows in line with the ModList, touching only rows that were added, removed or changed
+	def refresh(self, modList, minecraftVersion):
+		self.modList = modList
+		self.minecraftVersion = minecraftVersion
+
+		for addonID in [addonID for addonID in self.rows if addonID not in modList.mods]:
+			self.tree.delete(addonID)
+			del self.rows[addonID]
+			if addonID == self.editedModID:
+				self.hideCombobox()
+
+		for addonID, mod in list(modList.mods.items()): # Worker threads may add mods meanwhile
+			values = self.rowValues(mod)
+			if addonID not in self.rows:
+				self.tree.insert('', 'end', iid=addonID, text=values[0], values=values[1:])
+			elif self.rows[addonID] != values:
+				self.tree.item(addonID, text=values[0], values=values[1:])
+			self.rows[addonID] = values
+
+	# Updates the row of a single Mod, e.g. after its selected file changed
+	def refreshMod(self, mod):
+		values = self.rowValues(mod)
+		if self.rows.get(mod.addonID) != values:
+			self.tree.item(mod.addonID, text=values[0], values=values[1:])
+			self.rows[mod.addonID] = values
+
+	# Opens the file combobox when a file cell is clicked, or the mod's webpage when its Curseforge Page cell is clicked
+	def onClick(self, event):
+		self.hideCombobox()
+		row = self.tree.identify_row(event.y)
+		column = self.tree.identify_column(event.x)
+		if row == '' or self.modList == None:
+			return
+		mod = self.modList.mods.get(int(row))
+		if mod == None: # Removed by a background task since the row was drawn
+			return
+		if column == '#3':
+			import webbrowser
+			webbrowser.open_new(mod.modURL) # Open mod webpage in user's browser if clicked-on
+		elif column == '#1' and self.minecraftVersion != None:
+			modFiles = mod.getFiles(self.minecraftVersion) # Already sorted newest-first by the Mod's version index
+			if not modFiles:
+				return
+			self.comboboxFileDict = {fileLabel(file): file for file in modFiles}
+			x, y, width, height = self.tree.bbox(row, column)
+			self.editedModID = mod.addonID
+			self.comboboxFile['values'] = list(self.comboboxFileDict)
+			if mod.selectedFile != None:
+				self.comboboxFile.set(fileLabel(mod.selectedFile))
+			else:
+				self.comboboxFile.set('Choose a mod file')
+			self.comboboxFile.place(x=x, y=y, width=width, height=height)
+			self.comboboxFile.focus_set()
+
+	# Shows a hand cursor over the Curseforge Page cells, the only ones that open a link
+	def onMotion(self, event):
+		overLink = self.tree.identify_row(event.y) != '' and self.tree.identify_column(event.x) == '#3'
+		self.tree.configure(cursor='hand2' if overLink else '')
+
+	def selectFile(self, event=None):
+		mod = self.modList.mods.get(self.editedModID)
+		if mod == None:
+			self.hideCombobox()
+			return
+		file = self.comboboxFileDict[self.comboboxFile.get()]
+		self.hideCombobox()
+		self.onSelectFile(mod, file)
+		self.refreshMod(mod)
+
+	def hideCombobox(self, event=None):
+		self.editedModID = None
+		self.comboboxFile.place_forget()
+
+	def onScroll(self, *args):
+		self.hideCombobox()
+		self.tree.yview(*args)
+
+	def onDelete(self, event=None):
+		selection = [int(addonID) for addonID in self.tree.selection()]
+		if selection:
+			self.onRemoveMods(selection)
 
 class Application():
 	# Instance variables:
@@ -75,22 +239,38 @@ class Application():
 	#   frameForgeVersion      - a frame to hold Forge version widgets
 	#     labelForgeVersion    - a label for Forge version combobox widget
 	#     comboboxForgeVersion - a combobox widget for selecting pack Forge version
-	#   scrollFrameModList     - a ScrollFrame displaying currently added mods
+	#   modListView            - a ModListView displaying currently added mods
+	#   buttonRemoveMod        - a button removing the mods selected in modListView
+	#   buttonImportMods       - a button importing the jars of an existing instance's mods folder (see importModsFolder)
+	#   buttonSolveFiles       - a button selecting the newest workable file of every mod at once (see solveFiles)
+	#   allowBetaFiles         - a BooleanVar set when solveFiles may pick beta files as well as releases
+	#   addModDialog           - the AddModDialog, built the first time it's opened and reused afterwards; None until then
+	#   frameStatus            - a frame to hold the background task status widgets
+	#     labelStatus          - a label describing the running background tasks
+	#     progressbarStatus    - an indeterminate progress bar animated while background tasks run
+	#     buttonCancel         - a button cancelling every running background task
 
 	# minecraftVersion - a string containing the selected Minecraft version; updated whenever a new Minecraft version is chosen. None by default
 	# forgeVersion     - a string containing the selected Forge version; updated whenever a new Minecraft and/or Forge version is chosen. None by default
 	# modList          - a ModList object containing all the Mods a user adds to the modpack
-	# modListWidgets   - a dict of {modID: tuples}, where the tuples are of Tkinter widgets for displaying each Mod: (labelModName, comboboxFileName, comboboxFileDict, labelModAuthors, labelModLicense, buttonModRemove)
-	#                    comboboxFileDict is a dict where File names with added-on A/B/R information are the keys for a specific File
-
-	def __init__(self):
+	# chosenFiles      - a dict of {addonID: File} of the files the user picked by hand in the mod list, which solveFiles keeps
+	# catalog          - the local catalog.Catalog searched as the user types in the Add Mod dialog; None until it has been loaded
+	# modloaderCatalog - the modloaders.ModloaderCatalog the Forge versions are listed from; None until it has been loaded
+	# executor         - a TaskExecutor running every Twitch API call off the main thread
+	#                    Everything that changes the ModList runs in its 'modList' lane, so those changes happen one at a time
+
+	# The window is shown straight away, with the Minecraft versions saved by the last run; the live list is fetched once it's up
+	#   exitAfterPaint - if True, prints the time since startTime (a time.perf_counter() value) once the window is first drawn, then closes it
+	def __init__(self, startTime=None, exitAfterPaint=False):
 		self.modList = modlist.ModList()
+		self.chosenFiles = {}
 		self.minecraftVersion = None
 		self.forgeVersion = None
-
-		# Setup named tuple and list of aforementioned tuples for organizing ModList widgets
-		self.ModListWidget = namedtuple('ModListWidget', 'labelModName comboboxFileName comboboxFileDict labelModAuthors labelModLicense buttonModRemove')
-		self.modListWidgets = {}
+		self.addModDialog = None
+		self.catalog = None
+		self.modloaderCatalog = None
+		self.startTime = startTime if startTime != None else time.perf_counter()
+		self.exitAfterPaint = exitAfterPaint
 
 		# Setup main window
 		self.mainWindow = tkinter.Tk()
@@ -98,6 +278,8 @@ class Application():
 		#self.mainWindow.resizable(False, False) # Make the main window not resizable
 		self.mainWindow.resizable(True, True) # Make the main window resizable
 		self.mainWindow.title("PackCrafter Alpha")
+		self.mainWindow.protocol("WM_DELETE_WINDOW", self.close)
+		self.executor = taskexecutor.TaskExecutor(self.mainWindow, onBusyChanged=self.updateStatus, onError=self.showTaskError)
 
 		# Grid resizing configuration
 		for i in range(3):
@@ -134,7 +316,12 @@ class Application():
 		self.frameMCVersion.grid(row=1, column=0, padx=5, pady=5)
 		self.labelMCVersion = tkinter.Label(self.frameMCVersion, text='Minecraft Version')
 		self.labelMCVersion.pack()
-		self.comboboxMCVersion = ttk.Combobox(self.frameMCVersion, values = [entry['versionString'] for entry in twitchapi.getMinecraftVersionList()], state="readonly", width=10)
+		minecraftVersions = loadBootstrap().get('minecraftVersions')
+		if minecraftVersions:
+			self.comboboxMCVersion = ttk.Combobox(self.frameMCVersion, values = minecraftVersions, state="readonly", width=10)
+		else: # First run: nothing to show until the list has been fetched
+			self.comboboxMCVersion = ttk.Combobox(self.frameMCVersion, values = ['Loading...'], state="disabled", width=10)
+			self.comboboxMCVersion.current(0)
 		self.comboboxMCVersion.pack()
 		self.comboboxMCVersion.bind('<<ComboboxSelected>>', self.selectMinecraftVersion)
 
@@ -150,20 +337,109 @@ class Application():
 		self.forgeVersionDict = {} # A dict for storing {"Forge name string w/ recommended/latest info": "normal Forge name string"}
 
 		# Setup mod list section
-		self.scrollFrameModList = ScrollFrame(self.mainWindow, width=1920)
-		self.scrollFrameModList.grid(row=2, column=0, rowspan=5, columnspan=3)
+		self.modListView = ModListView(self.mainWindow, self.setModSelectedFile, self.removeMods)
+		self.modListView.grid(row=2, column=0, rowspan=5, columnspan=3, sticky='nsew')
 
 		# Setup add mod button
 		self.frameAddMod = tkinter.Frame(master=self.mainWindow)
 		self.frameAddMod.grid(row=7, column=2, padx=5, pady=15)
-		self.buttonAddMod = tkinter.Button(master=self.frameAddMod, text='Add Mod', command=lambda: self.AddModDialog(self))
+		self.buttonAddMod = tkinter.Button(master=self.frameAddMod, text='Add Mod', command=lambda: self.showAddModDialog())
 		self.buttonAddMod.pack()
 
+		# Setup remove mod button
+		self.buttonRemoveMod = tkinter.Button(master=self.mainWindow, text='Remove Selected', command=lambda: self.removeMods([int(addonID) for addonID in self.modListView.tree.selection()]))
+		self.buttonRemoveMod.grid(row=7, column=1, padx=5, pady=15)
+
+		# Setup import mods folder button
+		self.buttonImportMods = tkinter.Button(master=self.mainWindow, text='Import Mods Folder', command=lambda: self.importModsFolder())
+		self.buttonImportMods.grid(row=7, column=0, padx=5, pady=15)
+
+		# Setup automatic file selection
+		self.allowBetaFiles = tkinter.BooleanVar(master=self.mainWindow, value=False)
+		tkinter.Checkbutton(master=self.mainWindow, text='Allow beta files', variable=self.allowBetaFiles).grid(row=8, column=1)
+		self.buttonSolveFiles = tkinter.Button(master=self.mainWindow, text='Auto-Select Files', command=lambda: self.solveFiles())
+		self.buttonSolveFiles.grid(row=8, column=2, padx=5, pady=5)
+
+		# Create a checkbox for including the selected mod jars in the modpack's overrides
+		self.includeModJars = tkinter.BooleanVar(master=self.mainWindow, value=False)
+		tkinter.Checkbutton(master=self.mainWindow, text='Include mod jars', variable=self.includeModJars).grid(row=11, column=1)
+
 		# Create a button to create the modpack
 		tkinter.Button(master=self.mainWindow, text='Create Modpack', command=lambda: self.createModpack()).grid(row=11, column=2)
 
+		# Setup background task status
+		self.frameStatus = tkinter.Frame(master=self.mainWindow)
+		self.frameStatus.grid(row=12, column=0, columnspan=3, sticky='ew', padx=5, pady=5)
+		self.labelStatus = tkinter.Label(self.frameStatus, text='', anchor='w')
+		self.labelStatus.pack(side='left', fill='x', expand=True)
+		self.buttonCancel = tkinter.Button(self.frameStatus, text='Cancel', state=tkinter.DISABLED, command=lambda: self.executor.cancelAll())
+		self.buttonCancel.pack(side='right')
+		self.progressbarStatus = ttk.Progressbar(self.frameStatus, mode='indeterminate', length=150)
+		self.progressbarStatus.pack(side='right', padx=5)
+
+		self.mainWindow.bind('<Expose>', self.onFirstPaint)
 		self.mainWindow.mainloop()
 
+	# Called once the window has been drawn for the first time; only then are the Minecraft versions refreshed
+	def onFirstPaint(self, event=None):
+		self.mainWindow.unbind('<Expose>')
+		if self.exitAfterPaint:
+			self.mainWindow.update_idletasks()
+			print('First paint after {:.1f} ms'.format((time.perf_counter() - self.startTime) * 1000), flush=True)
+			self.close()
+			return
+		self.executor.submit(refreshMinecraftVersions, description='Loading Minecraft versions', key='minecraftVersions', onSuccess=self.setMinecraftVersions)
+		self.executor.submit(openCatalog, description='Loading mod catalog', key='catalog', onSuccess=self.setCatalog)
+		self.executor.submit(modloaders.getCatalog, description='Loading Forge versions', key='modloaders', onSuccess=self.setModloaderCatalog)
+
+	# Starts searching the loaded local catalog, then brings it up to date in the background
+	def setCatalog(self, modCatalog):
+		self.catalog = modCatalog
+		self.searchCatalog()
+		self.executor.submit(lambda: modCatalog.refresh(isCancelled=taskexecutor.currentTask().isCancelled), description='Updating mod catalog', key='catalogRefresh',
+			onSuccess=lambda updated: self.searchCatalog())
+
+	# Reruns the Add Mod dialog's type-ahead search, if the dialog has been opened
+	def searchCatalog(self):
+		if self.addModDialog != None:
+			self.addModDialog.searchCatalog()
+
+	# Shows which background tasks are running, called by the TaskExecutor whenever that changes
+	def updateStatus(self, tasks):
+		if tasks:
+			self.labelStatus['text'] = '{}...'.format(tasks[-1].description) + (' (+{} more)'.format(len(tasks) - 1) if len(tasks) > 1 else '')
+			self.buttonCancel['state'] = tkinter.NORMAL
+			self.progressbarStatus.start(15)
+		else:
+			self.labelStatus['text'] = ''
+			self.buttonCancel['state'] = tkinter.DISABLED
+			self.progressbarStatus.stop()
+
+	# Reports a failed background task to the user
+	def showTaskError(self, task, error):
+		messagebox.showerror('{} failed'.format(task.description), str(error), parent=self.mainWindow)
+
+	# Stops every background task, then closes the main window
+	def close(self):
+		self.executor.shutdown()
+		self.mainWindow.destroy()
+
+	# Fills the Minecraft version combobox with a list of version strings, keeping the current selection
+	def setMinecraftVersions(self, minecraftVersions):
+		self.comboboxMCVersion['values'] = minecraftVersions
+		if self.minecraftVersion == None:
+			self.comboboxMCVersion.set('')
+		self.comboboxMCVersion['state'] = "readonly"
+
+	# Opens the Add Mod dialog, building it the first time; closing it only hides it, so it reopens instantly with its last results
+	def showAddModDialog(self):
+		if self.addModDialog == None:
+			self.addModDialog = self.AddModDialog(self)
+		else:
+			self.addModDialog.window.deiconify()
+			self.addModDialog.window.lift()
+		self.addModDialog.entrySearchbox.focus_set()
+
 	# Nested class for the Add Mod dialog
 	class AddModDialog():
 		def __init__(self, application):
@@ -174,14 +450,19 @@ class Application():
 			self.window = tkinter.Toplevel(self.application.mainWindow)
 			self.window.geometry("500x300")
 			self.window.resizable(False, False)
+			self.window.transient(self.application.mainWindow)
+			self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
 
 			# Setup searchbox
 			self.entrySearchbox = tkinter.Entry(master=self.window, text='Mod Name')
 			self.entrySearchbox.grid(row=0, column=0, columnspan=2)
+			self.entrySearchbox.bind('<Return>', lambda e: self.updateModList())
+			self.entrySearchbox.bind('<KeyRelease>', self.searchCatalog)
 			self.buttonSearchbox = tkinter.Button(master=self.window, text='Search', command=lambda: self.updateModList())
 			self.buttonSearchbox.grid(row=0, column=2)
 
 			# Setup mod list
+			self.mods = []
 			self.listboxModList = tkinter.Listbox(master=self.window, width=50, selectmode=tkinter.SINGLE)
 			self.listboxModList.grid(row=1, column=0, rowspan=5, columnspan=2)
 			self.listboxModList.bind("<<ListboxSelect>>", self.updateButtonAddMod)
@@ -190,24 +471,99 @@ class Application():
 			self.buttonAddMod = tkinter.Button(master=self.window, text='Add Mod', state=tkinter.DISABLED, command=lambda: self.addMod())
 			self.buttonAddMod.grid(row=6, column=1)
 
-			self.window.mainloop()
-
 		def updateButtonAddMod(self, event=None):
 			if self.listboxModList.curselection() == (): # Will return empty tuple if nothing is currently selected
 				self.buttonAddMod['state'] = tkinter.DISABLED
 			else:
 				self.buttonAddMod['state'] = tkinter.NORMAL
 
+		# Type-ahead search of the local catalog, run on every keystroke; does nothing until the catalog has been loaded
+		#   Return and the Search button still search online, which also finds mods newer than the catalog
+		def searchCatalog(self, event=None):
+			modCatalog = self.application.catalog
+			if (event != None and event.keysym == 'Return') or modCatalog == None or not len(modCatalog.index):
+				return
+			self.application.executor.cancel('search') # An online search still running would replace these results
+			results = modCatalog.search(self.entrySearchbox.get(), self.application.minecraftVersion, limit=100)
+			self.showSearchResults([entry.toSearchResult() for entry in results], filterMods=False)
+
+		# Starts a search in the background; a search still running from an earlier click is cancelled
 		def updateModList(self):
 			self.listboxModList.delete(0, self.listboxModList.size())
-			self.mods = [entry for entry in twitchapi.twitchAddonSearch(self.entrySearchbox.get()) if entry['categorySection']['name'] == 'Mods']
-			for mod in self.mods:
-				self.listboxModList.insert(tkinter.END, mod['name'])
+			self.listboxModList.insert(tkinter.END, 'Searching...')
+			self.buttonAddMod['state'] = tkinter.DISABLED
+			self.mods = []
+			self.application.executor.submit(twitchapi.twitchAddonSearch, self.entrySearchbox.get(), description='Searching', key='search', supersede=True, onSuccess=self.showSearchResults)
+
+		# Fills the mod list with search results; online results also list modpacks, resource packs etc, which are filtered out unless filterMods is False
+		def showSearchResults(self, searchResults, filterMods=True):
+			self.listboxModList.delete(0, self.listboxModList.size())
+			self.buttonAddMod['state'] = tkinter.DISABLED
+			self.mods = [entry for entry in searchResults if not filterMods or entry['categorySection']['name'] == 'Mods']
+			if self.mods:
+				self.listboxModList.insert(tkinter.END, *[mod['name'] for mod in self.mods])
 
 		def addMod(self):
-			print("User wants to add mod {}".format(self.mods[self.listboxModList.curselection()[0]]['name']))
-			self.application.modList.addMod(modlist.Mod(self.application.modList, addonSearchResult=self.mods[self.listboxModList.curselection()[0]]))
-			self.application.updateModList()
+			if not self.listboxModList.curselection() or not self.mods:
+				return
+			self.application.addMod(self.mods[self.listboxModList.curselection()[0]])
+
+	# Fetches and adds a Mod (with its dependencies) in the background, then updates the mod list display
+	#   Adding a mod that's already in the ModList, or already being added, does nothing
+	def addMod(self, addonSearchResult):
+		logger.info('User wants to add mod %s', addonSearchResult['name'])
+		if addonSearchResult['id'] in self.modList.mods:
+			return
+		def work():
+			self.modList.addMod(modlist.Mod(self.modList, addonSearchResult=addonSearchResult))
+		self.executor.submit(work, description='Adding {}'.format(addonSearchResult['name']), key=('addMod', addonSearchResult['id']), lane='modList',
+			onSuccess=lambda result: self.updateModList())
+
+	# Selects the newest file of every mod for the selected Minecraft version whose required dependencies can all be given a file too,
+	#   in the background (see ModList.solve); mods that can't be given a file are listed afterwards
+	#   Files the user picked by hand are kept, as long as they're still selected (changing the Minecraft version may have cleared them)
+	def solveFiles(self):
+		if self.minecraftVersion == None:
+			messagebox.showinfo('Auto-Select Files', 'Select a version of Minecraft first', parent=self.mainWindow)
+			return
+		allowBeta = self.allowBetaFiles.get()
+		def work():
+			import solver
+			pinned = {addonID: file for addonID, file in self.chosenFiles.items()
+				if addonID in self.modList.mods and self.modList.mods[addonID].selectedFile is file}
+			return self.modList.solve(solver.ALLOW_BETA if allowBeta else solver.RELEASE_ONLY, pinned=pinned)
+		self.executor.submit(work, description='Selecting files for Minecraft {}'.format(self.minecraftVersion), key='solveFiles', lane='modList',
+			onSuccess=self.showSolveResult)
+
+	# Updates the mod list display after solveFiles, and lists any mods that couldn't be given a file
+	def showSolveResult(self, result):
+		self.updateModList()
+		if result.conflicts:
+			messagebox.showwarning('Some mods have no usable file', '\n'.join(result.conflicts.values()), parent=self.mainWindow)
+
+	# Asks for an existing instance's mods folder, then adds a Mod for every jar in it that matches a CurseForge file, in the background
+	#   Each Mod gets the matched file as its selectedFile (see modimport.importFolder); jars that matched nothing are listed afterwards
+	def importModsFolder(self):
+		from tkinter import filedialog
+		folder = filedialog.askdirectory(parent=self.mainWindow, title='Choose a mods folder to import', mustexist=True)
+		if not folder:
+			return
+		def work():
+			import modimport
+			cache = modimport.FingerprintCache()
+			try:
+				return modimport.importFolder(self.modList, folder, cache)
+			finally:
+				cache.close()
+		self.executor.submit(work, description='Importing {}'.format(folder), key='importMods', lane='modList', onSuccess=self.showImportResult)
+
+	# Updates the mod list display after an import, and lists the jars that couldn't be matched
+	def showImportResult(self, result):
+		mods, unmatched = result
+		self.updateModList()
+		if unmatched:
+			messagebox.showwarning('Import finished', 'Imported {} mods. No CurseForge file matches these jars:\n{}'.format(len(mods),
+				'\n'.join(os.path.basename(path) for path in unmatched)), parent=self.mainWindow)
 
 	# Callback function for when a version of Minecraft is selected using the combobox
 	#   Will check if a new version was selected, and update other widgets accordingly
@@ -217,32 +573,41 @@ class Application():
 			return                                       #   Do nothing
 		self.minecraftVersion = newMinecraftVersion      # Otherwise, update Forge versions and Mod list
 		self.updateForgeVersions()
+		def work():
+			for mod in list(self.modList.mods.values()): # Keep any selected file that also supports the new version
+				if mod.selectedFile != None and newMinecraftVersion not in mod.selectedFile.mcVersions:
+					mod.selectedFile = None
+			self.modList.setMinecraftVersion(newMinecraftVersion) # Expands dependencies of every Mod's files for this version
+		self.executor.submit(work, description='Resolving dependencies for Minecraft {}'.format(newMinecraftVersion), lane='modList',
+			onSuccess=lambda result: self.updateModList())
 		self.updateModList()
 
 	# Callback function for when a version of Forge is selected using the combobox
 	def selectForgeVersion(self, event=None):
 		self.forgeVersion = self.forgeVersionDict[self.comboboxForgeVersion.get()]
-		print(self.forgeVersion)
+		logger.debug('Selected Forge version %s', self.forgeVersion)
 
-	# Update the forge version combobox
+	# Update the forge version combobox from the modloader catalog, which is loaded in the background at startup
+	#   Once it's loaded this needs no request; until then the combobox says it's loading, and is filled in by setModloaderCatalog
 	def updateForgeVersions(self):
-		sortedVersions = sorted([entry for entry in twitchapi.getModloaderList() if entry['gameVersion'] == self.minecraftVersion], key=lambda x : version.parse(x['name']), reverse=True)
-		#print(sortedVersions)
-		#forgeList = []
-		self.forgeVersionDict = {}
-		for versionEntry in sortedVersions:
-			versionString = versionEntry['name']
-			if versionEntry['recommended']:
-				#versionString = versionString + '  Recommended'
-				self.forgeVersionDict[versionString + ' (Recommended)'] = versionString
-			if versionEntry['latest']:
-				#versionString = versionString + '  Latest'
-				self.forgeVersionDict[versionString + ' (Latest)'] = versionString
-			else:
-				self.forgeVersionDict[versionString] = versionString
-			#forgeList.append(versionString)
+		self.forgeVersion = None
+		if self.modloaderCatalog != None:
+			self.setForgeVersions()
+			return
+		self.comboboxForgeVersion['state'] = "disabled"
+		self.comboboxForgeVersion['values'] = ["Loading..."]
+		self.comboboxForgeVersion.current(0)
+		self.executor.submit(modloaders.getCatalog, description='Loading Forge versions', key='modloaders', onSuccess=self.setModloaderCatalog)
+
+	def setModloaderCatalog(self, modloaderCatalog):
+		self.modloaderCatalog = modloaderCatalog
+		if self.minecraftVersion != None:
+			self.setForgeVersions()
+
+	# Fills the forge version combobox with the modloader catalog's Forge versions for the selected Minecraft version, newest first
+	def setForgeVersions(self):
+		self.forgeVersionDict = {modloader.label(): modloader.name for modloader in self.modloaderCatalog.versions(self.minecraftVersion)}
 		self.comboboxForgeVersion['state'] = "readonly"
-		#self.comboboxForgeVersion['values'] = forgeList
 		self.comboboxForgeVersion['values'] = [key for key, value in self.forgeVersionDict.items()]
 		try:
 			self.comboboxForgeVersion.current(0)
@@ -253,180 +618,91 @@ class Application():
 			self.comboboxForgeVersion.current(0)
 			self.forgeVersion = None
 
+	# Returns a packbuilder.PackSpec describing the modpack as currently entered, with each Mod's selected file pinned
+	def packSpec(self):
+		import packbuilder
+		mods = [(mod.addonID, mod.selectedFile.fileID if mod.selectedFile != None else None) for mod in self.modList.mods.values()]
+		return packbuilder.PackSpec(self.entryModpackName.get(), self.entryModpackVersion.get(), self.entryModpackAuthor.get(), self.minecraftVersion, self.forgeVersion, mods)
+
 	# Create the modpack's manifest
 	#   Returns the generated manifest structure to be written as a JSON separately
-	def createManifest(self):
-		manifest = {
-			"minecraft": {
-				"version": self.minecraftVersion,
-				"modLoaders": [
-						{
-							"id": self.forgeVersion,
-							"primary": True
-						}
-					]
-				},
-			"manifestType": "minecraftModpack",
-			"manifestVersion": 1,
-			"name": self.entryModpackName.get(),
-			"version": self.entryModpackVersion.get(),
-			"author": self.entryModpackAuthor.get(),
-			"files": [],
-			"overrides": "overrides"
-			}
-
-		# Add selected Mod Files to manifest (means each Mod doesn't need to be downloaded)
-		for modID, mod in self.modList.mods.items():
-			if mod.selectedFile != None:
-				modManifest = {}
-				modManifest['projectID'] = mod.addonID
-				modManifest['fileID'] = mod.selectedFile.fileID
-				modManifest['required'] = True
-				manifest['files'].append(modManifest)
-
-		print(json.dumps(manifest))
+	def createManifest(self, spec=None):
+		import packbuilder
+		manifest = packbuilder.createManifest(spec if spec != None else self.packSpec(), self.modList)
+		logger.debug('Manifest: %s', manifest)
 		return manifest
-		
+
 	# Creates a modpack modlist with credits
 	#   Returns the generated HTML string to be written as an HTML file separately
 	def createModpackCredits(self):
-		html = "<!DOCTYPE html><html><body>\n"
-
-		# Write modpack information to HTML string
-		html = html + "<h1>Modpack Information</h1><p>Name: {}</p><p>Version: {}</p><p>Author: {}</p><p>Minecraft Version: {}</p><p>Forge Version: {}</p>".format(self.entryModpackName.get(), self.entryModpackVersion.get(), self.entryModpackAuthor.get(), self.minecraftVersion, self.forgeVersion)
+		import packbuilder
+		return packbuilder.createModpackCredits(self.packSpec(), self.modList)
 
-		# Write mod information to HTML string
-		html = html + "<h1>Mod Credits</h1>"
-		for modID, mod in self.modList.mods.items(): # For every mod with a selected file
-			if mod.selectedFile != None:
-				html = html + "<h2>{}</h2>".format(mod.modName)
-				html = html + "<p>Version: {}</p><p>Author(s): {}</p><p>Website: {}</p>".format(mod.selectedFile.fileName, mod.authors, mod.modURL)
-
-		html = html + "</body></html>"
-		return html
-
-	# Creates a modpack folder in the user's "Downloads" directory, then adds a generated manifest.json and zips the folder for easy import into MultiMC
+	# Creates a modpack zip in the user's "Downloads" directory containing a generated manifest.json and credits.html, for easy import into MultiMC
+	#   The zip is streamed straight to disk; if requested, the selected mod jars are streamed into overrides/mods from the shared jar store
 	# TODO: Check to make sure MC/Forge versions are valid, and that the modpack has a name/version/author
-	# TODO: Checkbox to allow user to specify whether or not to zip the modpack when done
 	def createModpack(self):
-		modpackFolder = getDownloadPath() + '\\{}'.format(self.entryModpackName.get())
-		try:
-			os.mkdir(modpackFolder)
-			os.mkdir(modpackFolder + '\\overrides')
-			os.mkdir(modpackFolder + '\\overrides\\mods')
-			os.mkdir(modpackFolder + '\\overrides\\config')
-			os.mkdir(modpackFolder + '\\overrides\\resources')
-			os.mkdir(modpackFolder + '\\overrides\\scripts')
-		except FileExistsError:
-			pass
-		with open(modpackFolder + '\\manifest.json', 'w') as manifestFile:
-			json.dump(self.createManifest(), manifestFile)
-		with open(modpackFolder + '\\credits.html', 'w') as creditsFile:
-			creditsFile.write(self.createModpackCredits())
-
-		# Zip the modpack for easy import into MultiMC
-		#shutil.make_archive(modpackFolder, 'zip', modpackFolder)
-
-
-	# Update all the available files in the combobox for each mod in the modpack
-	# #TODO: Don't replace selected files when adding a new mod
+		spec = self.packSpec()
+		path = os.path.join(getDownloadPath(), spec.name + '.zip')
+		includeModJars = self.includeModJars.get()
+		def work():
+			import packtargets, jarstore
+			store = jarstore.JarStore() if includeModJars else None
+			try:
+				packtargets.exportPack(spec, self.modList, [packtargets.CurseForgeZip(path, includeModJars)], store)
+			finally:
+				if store != None:
+					store.close()
+		self.executor.submit(work, description='Creating modpack {}'.format(spec.name), key='createModpack', lane='modList',
+			onSuccess=lambda result: messagebox.showinfo('Modpack created', 'Created {}'.format(path), parent=self.mainWindow))
+
+	# Update the mod list display to match the ModList
+	#   Only rows whose Mod or file selection changed are touched, and selected files are kept
 	def updateModList(self):
-		#print("Updated mod list is:")
-		#self.modListWidgets = {}
-		i = 0
-		for modID, mod in self.modList.mods.items():
-
-			mod.selectedFile = None
-
-			# modListWidgets   - a dict of {modID: tuples}, where the tuples are of Tkinter widgets for displaying each Mod: (labelModName, comboboxFileName, comboboxFileDict, labelModAuthors, labelModLicense, buttonModRemove)
-			# If mod already has a set of widgets:
-			if modID in self.modListWidgets:
-				print("Mod {} already has widgets. Updating widgets".format(mod.modName))
-				print("i is {}".format(i));
-				self.modListWidgets[modID].labelModName.grid(row=i, column=0);
-				self.modListWidgets[modID].comboboxFileName.grid(row=i, column=1);
-				self.modListWidgets[modID].labelModAuthors.grid(row=i, column=2);
-				self.modListWidgets[modID].labelModLicense.grid(row=i, column=3);
-				self.modListWidgets[modID].buttonModRemove.grid(row=i, column=4);
-
-			# If mod doesn't have a set of widgets yet:
-			else:
-				print("Creating new widgets for Mod {}".format(mod.modName))
-				print("i is {}".format(i));
-				# Create Mod name label
-				labelName = tkinter.Label(self.scrollFrameModList.viewPort, text=mod.modName)
-				labelName.grid(row=i, column=0)
-				# Create Mod Files list combobox
-				combobox = ttk.Combobox(self.scrollFrameModList.viewPort, state="readonly", width=45)
-				combobox.grid(row=i, column=1)
-				# Create Mod authors label
-				labelAuthor = tkinter.Label(self.scrollFrameModList.viewPort, text=mod.authors)
-				labelAuthor.grid(row=i, column=2)
-				# Create Mod Curseforge page hyperlink label
-				labelLicense = tkinter.Label(self.scrollFrameModList.viewPort, text='Curseforge Page', fg="blue") # Setup label like a hyperlink
-				labelLicense.grid(row=i, column=3)
-				labelLicense.bind("<Button-1>", lambda e, url=mod.modURL: webbrowser.open_new(url)) # Open mod webpage in user's browser if clicked-on
-				# Create Mod removal button
-				button = tkinter.Button(self.scrollFrameModList.viewPort, text='X', command=lambda m=modID: self.removeMod(m))
-				button.grid(row=i, column=4)
-				# Add above widgets to a ModListWidgets named tuple for this mod
-				widgets = self.ModListWidget(labelName, combobox, {}, labelAuthor, labelLicense, button)
-				self.modListWidgets[modID] = widgets
-
-			# Put Mod Files in combobox
-			modFiles = sorted([file for file in mod.files if (self.minecraftVersion in file.mcVersions)], key=lambda x: version.parse(x.fileName), reverse=True)
-
-			# If no Minecraft version is selected:
-			if self.minecraftVersion == None:
-				self.modListWidgets[modID].comboboxFileName['values'] = ['Select a version of Minecraft']
-				self.modListWidgets[modID].comboboxFileName['state'] = 'disabled'
-				self.modListWidgets[modID].comboboxFileName.current(0)
-			# If no Files exist for this version of Minecraft:
-			elif modFiles == []:
-				self.modListWidgets[modID].comboboxFileName['values'] = ['No files for this version of Minecraft']
-				self.modListWidgets[modID].comboboxFileName['state'] = 'disabled'
-				self.modListWidgets[modID].comboboxFileName.current(0)
-			# Otherwise, list relevant Files
-			else:
-				self.modListWidgets[modID].comboboxFileDict.clear(); # Reset file dictionary
-				for file in modFiles:
-					# Record File release type
-					if file.releaseType == modlist.ReleaseType.ALPHA:
-						self.modListWidgets[modID].comboboxFileDict[file.fileName + " (Alpha)"] = file
-					elif file.releaseType == modlist.ReleaseType.BETA:
-						self.modListWidgets[modID].comboboxFileDict[file.fileName + " (Beta)"] = file
-					elif file.releaseType == modlist.ReleaseType.RELEASE:
-						self.modListWidgets[modID].comboboxFileDict[file.fileName + " (Release)"] = file
-					else:
-						self.modListWidgets[modID].comboboxFileDict[file.fileName + " (Unknown Type)"] = file
-
-				# Setup combobox with list of valid files
-				self.modListWidgets[modID].comboboxFileName['values'] = ['Choose a mod file']
-				self.modListWidgets[modID].comboboxFileName.current(0)
-				self.modListWidgets[modID].comboboxFileName['values'] = [key for key, value in self.modListWidgets[modID].comboboxFileDict.items()]
-				self.modListWidgets[modID].comboboxFileName['state'] = 'readonly'
-				self.modListWidgets[modID].comboboxFileName.bind('<<ComboboxSelected>>', lambda e, m=mod: self.setModSelectedFile(m, self.modListWidgets[m.addonID].comboboxFileDict[self.modListWidgets[m.addonID].comboboxFileName.get()]))
-			
-			i = i + 1
-
-	# Set the Mod's selectedFile variable to File
+		self.modListView.refresh(self.modList, self.minecraftVersion)
+
+	# Set the Mod's selectedFile variable to File, then expand that File's dependencies in the background
 	def setModSelectedFile(self, mod, file):
-		print("Set File for {} to {}".format(mod.modName, file.fileName))
+		logger.info('Set File for %s to %s', mod.modName, file.fileName)
 		mod.selectedFile = file
-
-	# Removes the Mod with the given modID from the ModList and remove its associated widgets from modListWidgets
-	def removeMod(self, modID):
-		removedMod = self.modList.mods.pop(modID) # Remove Mod from ModList
-		print(removedMod)
-		print(self.modList.mods)
-		removedWidgets = self.modListWidgets.pop(modID) # Remove ModListWidget from modListWidgets
-		for widget in removedWidgets: # Remove widgets from the window, then destroy them
-			if widget != removedWidgets.comboboxFileDict:
-				tkinter.Grid.grid_remove(widget)
-				widget.destroy()
-			else:
-				widget.clear()
-		self.updateModList()
-
-# Run application
-packCrafter = Application()
\ No newline at end of file
+		self.chosenFiles[mod.addonID] = file
+		self.executor.submit(self.modList.selectFile, mod, file, description='Resolving dependencies of {}'.format(file.fileName), lane='modList',
+			onSuccess=lambda result: self.updateModList()) # The selected file may have pulled in new dependency mods
+
+	# Removes the Mods with the given modIDs from the ModList, then updates the mod list display
+	def removeMods(self, modIDs):
+		def work():
+			for modID in modIDs:
+				if modID in self.modList.mods:
+					removedMod = self.modList.removeMod(modID) # Remove Mod from ModList
+					self.chosenFiles.pop(modID, None)
+					logger.info('Removed mod %s', removedMod.modName)
+		self.executor.submit(work, description='Removing mods', lane='modList', onSuccess=lambda result: self.updateModList())
+
+# Opens the local mod catalog and loads its search index
+#   Returns the catalog.Catalog
+def openCatalog():
+	import catalog
+	modCatalog = catalog.Catalog()
+	modCatalog.load()
+	return modCatalog
+
+# Runs the application; returns the process exit code
+#   --exit-after-paint closes the window as soon as it's drawn, printing how long that took (see benchmarks/startup.py)
+#   --verbose logs what the GUI and ModList are doing; --trace FILE records a trace (see tracing.py), saved to FILE and summarized on exit
+def main(argv=None):
+	startTime = time.perf_counter()
+	argv = sys.argv[1:] if argv == None else argv
+	logging.basicConfig(level=logging.DEBUG if '--verbose' in argv else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+	tracePath = argv[argv.index('--trace') + 1] if '--trace' in argv[:-1] else None
+	if tracePath != None:
+		tracing.enable()
+	Application(startTime, exitAfterPaint='--exit-after-paint' in argv)
+	if tracePath != None:
+		tracer = tracing.disable()
+		tracer.saveChromeTrace(tracePath)
+		print(tracer.summary())
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
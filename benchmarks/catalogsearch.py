@@ -0,0 +1,68 @@
+import argparse
+import random
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import catalog
+
+# Measures catalog search latency per keystroke, as the Add Mod dialog runs it while the user types
+#   Usage:
+#     python benchmarks/catalogsearch.py                    (synthetic catalog of 80000 mods)
+#     python benchmarks/catalogsearch.py --catalog          (the local catalog, after the GUI has fetched it)
+#     python benchmarks/catalogsearch.py --mods 150000 --version 1.12.2
+
+# Words synthetic mod names are made of; real mod names share a lot of vocabulary, which is what makes prefix queries expensive
+WORDS = ['just', 'enough', 'items', 'thermal', 'expansion', 'foundation', 'applied', 'energistics', 'industrial', 'craft', 'tinkers',
+	'construct', 'biomes', 'plenty', 'iron', 'chests', 'storage', 'drawers', 'mekanism', 'generators', 'tools', 'magic', 'botania', 'quark',
+	'waystones', 'journey', 'map', 'xaeros', 'minimap', 'chisel', 'bits', 'mystical', 'agriculture', 'refined', 'buildcraft', 'forestry',
+	'immersive', 'engineering', 'create', 'farmers', 'delight', 'better', 'end', 'nether', 'dungeons', 'structures', 'mobs', 'pets', 'core',
+	'lib', 'api', 'tweaks', 'utilities', 'extra', 'more', 'simple', 'advanced', 'power', 'energy', 'fluids', 'pipes', 'cables', 'backpacks']
+
+QUERIES = ['just enough items', 'thermal expansion', 'applied energistics', 'storage drawers', 'jei', 'thermla', 'energistcs', 'mekansim gen']
+
+def syntheticCatalog(modCount, seed=0):
+	rng = random.Random(seed)
+	mcVersions = ['1.7.10', '1.10.2', '1.12.2', '1.14.4', '1.15.2', '1.16.5', '1.18.2', '1.19.2', '1.20.1']
+	entries = []
+	for addonID in range(1, modCount + 1):
+		words = rng.sample(WORDS, rng.randint(1, 4)) + ['{}{}'.format(rng.choice(WORDS)[:4], addonID)] # Plus a unique word, like most real names have
+		name = ' '.join(word.capitalize() for word in words)
+		entries.append(catalog.CatalogEntry(addonID, name, '-'.join(words), ['author{}'.format(rng.randint(1, modCount // 5))],
+			int(rng.paretovariate(0.8) * 1000), rng.sample(mcVersions, rng.randint(1, 4)), '', ''))
+	return entries
+
+# Returns a sorted list of per-keystroke search times in seconds, typing every query one character at a time
+def measure(index, minecraftVersion, limit):
+	times = []
+	for query in QUERIES:
+		for length in range(1, len(query) + 1):
+			start = time.perf_counter()
+			index.search(query[:length], minecraftVersion, limit)
+			times.append(time.perf_counter() - start)
+	return sorted(times)
+
+def main():
+	parser = argparse.ArgumentParser(description='Report catalog search latency per keystroke')
+	parser.add_argument('--catalog', action='store_true', help='search the local catalog instead of a synthetic one')
+	parser.add_argument('--mods', type=int, default=80000, help='number of mods in the synthetic catalog')
+	parser.add_argument('--version', help='only return mods for this Minecraft version')
+	parser.add_argument('--limit', type=int, default=100, help='maximum number of results per search')
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	if args.catalog:
+		index = catalog.Catalog().load()
+	else:
+		index = catalog.CatalogIndex(syntheticCatalog(args.mods))
+	print('Indexed {} mods ({} tokens) in {:.2f}s'.format(len(index), len(index.tokens), time.perf_counter() - start))
+
+	times = measure(index, args.version, args.limit)
+	print('{} searches: median {:.2f} ms, p95 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms'.format(len(times),
+		times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000, times[int(len(times) * 0.99)] * 1000, times[-1] * 1000))
+	for query in QUERIES[-3:]:
+		print('  {!r}: {}'.format(query, ', '.join(entry.name for entry in index.search(query, args.version, 3))))
+
+if __name__ == '__main__':
+	main()
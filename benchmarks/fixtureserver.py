@@ -0,0 +1,328 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import collections
+import threading
+import argparse
+import random
+import json
+import time
+import re
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local stand-in for the Twitch API, replaying recorded (or synthetic) responses so benchmarks never touch the live service
+#   Point PackCrafter at it with twitchapi.setBaseURL(server.url), or the PACKCRAFTER_API_URL environment variable
+#   Usage:
+#     python benchmarks/fixtureserver.py --record fixture.json 238222 32274 ...   (records the addons, their required dependencies,
+#                                                                                    the Minecraft version list and the modloader list)
+#     python benchmarks/fixtureserver.py --fixture fixture.json --port 8080 --latency 80
+#     python benchmarks/fixtureserver.py --mods 500 --port 8080                    (serves a synthetic fixture)
+#
+#   A fixture is a JSON document:
+#     {
+#       "addons": {"<addonID>": getAddonInfo() response, ...},
+#       "files": {"<addonID>": getAddonFiles() response, ...},
+#       "minecraftVersions": getMinecraftVersionList() response,
+#       "modloaders": getModloaderList() response,
+#       "pack": [addonIDs a user would pick, most popular first; the rest of "addons" are their dependencies]
+#     }
+
+MINECRAFT_VERSIONS = ['1.20.1', '1.19.2', '1.18.2', '1.16.5', '1.12.2']
+
+# Words synthetic mod names are made of
+WORDS = ['just', 'enough', 'items', 'thermal', 'expansion', 'applied', 'energistics', 'industrial', 'craft', 'tinkers', 'construct', 'biomes',
+	'iron', 'chests', 'storage', 'drawers', 'mekanism', 'tools', 'magic', 'quark', 'waystones', 'journey', 'map', 'chisel', 'mystical',
+	'agriculture', 'refined', 'forestry', 'immersive', 'engineering', 'create', 'better', 'nether', 'dungeons', 'mobs', 'extra', 'simple']
+
+# Returns the fixture saved at path
+def loadFixture(path):
+	with open(path, encoding='utf-8') as fixtureFile:
+		return json.load(fixtureFile)
+
+def saveFixture(fixture, path):
+	with open(path, 'w', encoding='utf-8') as fixtureFile:
+		json.dump(fixture, fixtureFile)
+
+# Returns a fixture recorded from the live API: the given addons, every required dependency of any of their files (recursively),
+#   and the Minecraft version and modloader lists
+def recordFixture(addonIDs):
+	import twitchapi
+	fixture = {'addons': {}, 'files': {}, 'pack': list(addonIDs)}
+	pending = list(addonIDs)
+	while pending:
+		addonID = pending.pop()
+		if str(addonID) in fixture['addons']:
+			continue
+		fixture['addons'][str(addonID)] = twitchapi.getAddonInfo(addonID)
+		fixture['files'][str(addonID)] = twitchapi.getAddonFiles(addonID)
+		for fileInfo in fixture['files'][str(addonID)]:
+			pending.extend(dependency['addonId'] for dependency in fileInfo['dependencies'] if dependency['type'] == 3)
+		print('Recorded addon {} ({} files)'.format(addonID, len(fixture['files'][str(addonID)])))
+	fixture['minecraftVersions'] = twitchapi.getMinecraftVersionList()
+	fixture['modloaders'] = twitchapi.getModloaderList()
+	return fixture
+
+# The "gameVersion" entries of a file that aren't Minecraft versions: the modloader, and the environments the file runs in
+ENVIRONMENT_TAGS = frozenset(['Forge', 'Client', 'Server'])
+
+# Returns the environment tags of the files of the addon: a tenth are client-only, a third are tagged for both, the rest untagged
+#   Derived from addonID only, like fileExtras()
+def environmentTags(addonID):
+	if addonID % 10 == 7:
+		return ['Client']
+	return ['Client', 'Server'] if addonID % 3 == 0 else []
+
+# Returns the fields of a real getAddonFiles() entry that syntheticFixture() doesn't otherwise fill in, with placeholder values
+#   Derived from fileID only, so they don't change which mods and dependencies a fixture of a given size has
+def fileExtras(fileID, mcVersions):
+	return {
+		'displayName': 'file-{}.jar'.format(fileID),
+		'fileDate': '2021-{:02d}-{:02d}T12:00:00.{:03d}Z'.format(fileID % 12 + 1, fileID % 28 + 1, fileID % 1000),
+		'releaseDate': None,
+		'isAlternate': False,
+		'alternateFileId': 0,
+		'isAvailable': True,
+		'packageFingerprint': fileID * 2654435761 % 2 ** 32,
+		'modules': [{'foldername': folder, 'fingerprint': (fileID + offset) * 2246822519 % 2 ** 32, 'type': 0}
+			for offset, folder in enumerate(['META-INF', 'assets', 'data', 'mcmod.info', 'pack.mcmeta', 'com'])],
+		'gameVersionDateReleased': '2021-01-15T00:00:00Z',
+		'sortableGameVersion': [{'gameVersionPadded': '0000000001.0000000016', 'gameVersion': mcVersion, 'gameVersionReleaseDate': '2021-01-15T00:00:00Z',
+			'gameVersionName': mcVersion} for mcVersion in mcVersions],
+		'hasInstallScript': False,
+		'isServerPack': False,
+		'changelog': None,
+		}
+
+# Returns the "gameVersionLatestFiles" of an addon info for a file list: the newest file of each Minecraft version and release type
+def latestFileSummaries(fileList):
+	latest = {}
+	for fileInfo in fileList:
+		for mcVersion in fileInfo['gameVersion']:
+			key = (mcVersion, fileInfo['releaseType'])
+			if mcVersion not in ENVIRONMENT_TAGS and (key not in latest or fileInfo['id'] > latest[key]['id']):
+				latest[key] = fileInfo
+	return [{'gameVersion': mcVersion, 'projectFileId': fileInfo['id'], 'projectFileName': fileInfo['fileName'], 'fileType': releaseType, 'modLoader': 1}
+		for (mcVersion, releaseType), fileInfo in sorted(latest.items())]
+
+# Returns a deterministic fixture shaped like the real catalog: modCount mods a user would pick, plus the libraries they depend on
+#   Dependency fan-out follows real packs: most mods need zero to two libraries, popular libraries are shared by many mods and often
+#   need a core library of their own, and some mods are add-ons requiring another mod of the pack
+def syntheticFixture(modCount, seed=0):
+	rng = random.Random(seed)
+	coreCount = max(2, modCount // 100)
+	libraryCount = max(5, modCount // 8)
+	addons = {}
+	files = {}
+
+	# dependencyChoices are required by every file; some Minecraft versions' files also require one of extraChoices, as ports often do
+	def addAddon(addonID, name, downloadCount, dependencyChoices, extraChoices=()):
+		versionExtras = {mcVersion: rng.choice(extraChoices) for mcVersion in MINECRAFT_VERSIONS if extraChoices and rng.random() < 0.2}
+		fileList = []
+		fileCount = rng.randint(5, 60)
+		for index in range(fileCount):
+			if index < len(MINECRAFT_VERSIONS): # Every mod has at least one file for each version, so any of them can be picked
+				mcVersions = [MINECRAFT_VERSIONS[index]]
+			else:
+				mcVersions = rng.sample(MINECRAFT_VERSIONS, rng.choice([1, 1, 1, 2]))
+			dependencies = [{'addonId': dependencyID, 'type': 3} for dependencyID in dependencyChoices]
+			if mcVersions[0] in versionExtras and versionExtras[mcVersions[0]] not in dependencyChoices:
+				dependencies.append({'addonId': versionExtras[mcVersions[0]], 'type': 3})
+			dependencies.extend({'addonId': rng.randint(1, modCount), 'type': 2} for _ in range(rng.randint(0, 2))) # Optional, never followed
+			fileList.append({
+				'id': addonID * 1000 + index,
+				'fileName': '{}-{}-{}.{}.{}.jar'.format(name.replace(' ', ''), mcVersions[0], index // 20 + 1, index // 5 % 4, index % 5),
+				'downloadUrl': 'https://edge.forgecdn.net/files/{}/{}/{}.jar'.format(addonID, index, name.replace(' ', '')),
+				'fileLength': rng.randint(20000, 8000000),
+				'hashes': [{'algo': 1, 'value': '{:040x}'.format(rng.getrandbits(160))}],
+				'releaseType': rng.choice([1, 1, 1, 1, 2, 3]),
+				'gameVersion': mcVersions + ['Forge'] + environmentTags(addonID),
+				'dependencies': dependencies,
+				**fileExtras(addonID * 1000 + index, mcVersions), # Fields real responses have and PackCrafter doesn't use
+				})
+		addons[str(addonID)] = {
+			'id': addonID,
+			'name': name,
+			'slug': name.lower().replace(' ', '-'),
+			'websiteUrl': 'https://www.curseforge.com/minecraft/mc-mods/' + name.lower().replace(' ', '-'),
+			'authors': [{'name': 'author{}'.format(rng.randint(1, modCount))}],
+			'downloadCount': downloadCount,
+			'dateModified': '2021-{:02d}-{:02d}T12:00:00Z'.format(rng.randint(1, 12), rng.randint(1, 28)),
+			'gameVersionLatestFiles': latestFileSummaries(fileList),
+			}
+		files[str(addonID)] = fileList
+
+	# Libraries are numbered after the pack's mods, core libraries after those
+	coreIDs = list(range(modCount + libraryCount + 1, modCount + libraryCount + coreCount + 1))
+	libraryIDs = list(range(modCount + 1, modCount + libraryCount + 1))
+	libraryWeights = [1.0 / (rank + 1) for rank in range(libraryCount)] # A few libraries are needed by most mods
+	for addonID in coreIDs:
+		addAddon(addonID, 'Core Lib {}'.format(addonID), 50000000, [])
+	for addonID in libraryIDs:
+		addAddon(addonID, '{} Lib {}'.format(rng.choice(WORDS).capitalize(), addonID), 20000000, [rng.choice(coreIDs)] if rng.random() < 0.3 else [])
+	for addonID in range(1, modCount + 1):
+		dependencies = set(rng.choices(libraryIDs, libraryWeights, k=rng.choice([0, 0, 1, 1, 1, 2, 2, 3])))
+		if addonID > 10 and rng.random() < 0.1:
+			dependencies.add(rng.randint(1, addonID - 1))
+		name = ' '.join(word.capitalize() for word in rng.sample(WORDS, rng.randint(1, 3))) + ' {}'.format(addonID)
+		addAddon(addonID, name, int(10000000 / addonID), sorted(dependencies), libraryIDs)
+
+	modloaders = []
+	for mcVersion in MINECRAFT_VERSIONS:
+		for build in range(120):
+			modloaders.append({'name': 'forge-{}.{}.{}'.format(mcVersion.split('.')[1], build // 10, build), 'gameVersion': mcVersion, 'latest': build == 119, 'recommended': build == 100})
+	return {
+		'addons': addons,
+		'files': files,
+		'minecraftVersions': [{'versionString': mcVersion} for mcVersion in MINECRAFT_VERSIONS],
+		'modloaders': modloaders,
+		'pack': list(range(1, modCount + 1)),
+		}
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1' # Keep-alive, like the real API
+	disable_nagle_algorithm = True # Headers and body are written separately; don't let each response stall on a delayed ACK
+
+	def log_message(self, format, *args):
+		pass
+
+	def respond(self, endpoint, document, status=200):
+		self.server.record(endpoint)
+		body = json.dumps(document).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		self.server.delay()
+		fixture = self.server.fixture
+		url = urlsplit(self.path)
+		path = url.path[len(self.server.prefix):]
+		match = re.fullmatch(r'/addon/(\d+)(/files)?', path)
+		if match and match.group(1) in fixture['addons']:
+			if match.group(2):
+				return self.respond('getAddonFiles', fixture['files'][match.group(1)])
+			return self.respond('getAddonInfo', fixture['addons'][match.group(1)])
+		if path == '/addon/search':
+			query = parse_qs(url.query)
+			searchFilter = query.get('searchFilter', [''])[0].lower()
+			index = int(query.get('index', ['0'])[0])
+			pageSize = int(query.get('pageSize', ['50'])[0])
+			gameVersion = query.get('gameVersion', [None])[0]
+			if self.server.searchDepth != None and index >= self.server.searchDepth:
+				return self.respond('twitchAddonSearch', {'error': 'Index too deep'}, 400)
+			ordered = self.server.addonsByUpdate if query.get('sort') == ['2'] else self.server.addonsByDownloads
+			results = [info for info in ordered if searchFilter in info['name'].lower()
+				and (gameVersion == None or any(latest['gameVersion'] == gameVersion for latest in info.get('gameVersionLatestFiles', ())))]
+			return self.respond('twitchAddonSearch', results[index:index + pageSize])
+		if path == '/minecraft/version':
+			return self.respond('getMinecraftVersionList', fixture['minecraftVersions'])
+		if path == '/minecraft/modloader':
+			return self.respond('getModloaderList', fixture['modloaders'])
+		self.respond('notFound', {'error': 'Not found'}, 404)
+
+	def do_POST(self):
+		self.server.delay()
+		fixture = self.server.fixture
+		path = urlsplit(self.path).path[len(self.server.prefix):]
+		ids = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+		if path == '/addon':
+			return self.respond('getAddonInfos', [fixture['addons'][str(addonID)] for addonID in ids if str(addonID) in fixture['addons']])
+		if path == '/addon/files':
+			return self.respond('getFiles', {str(fileID): [self.server.filesByID[fileID]] for fileID in ids if fileID in self.server.filesByID})
+		if path == '/fingerprint':
+			matches = [self.server.filesByFingerprint[fingerprint] for fingerprint in ids if fingerprint in self.server.filesByFingerprint]
+			return self.respond('getFingerprintMatches', {'isCacheBuilt': True,
+				'exactMatches': [{'id': addonID, 'file': fileInfo, 'latestFiles': []} for addonID, fileInfo in matches],
+				'exactFingerprints': [fileInfo['packageFingerprint'] for addonID, fileInfo in matches],
+				'partialMatches': [], 'partialMatchFingerprints': {}, 'installedFingerprints': ids,
+				'unmatchedFingerprints': [fingerprint for fingerprint in ids if fingerprint not in self.server.filesByFingerprint]})
+		self.respond('notFound', {'error': 'Not found'}, 404)
+
+# Threaded HTTP server answering Twitch API requests from a fixture, after an injected delay
+class FixtureServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+	# Instance variables:
+	#   fixture - the fixture being served (see the format above)
+	#   latency - seconds every request is delayed by, to stand in for the round trip to the real API
+	#   jitter  - up to this many extra seconds are added to each delay at random
+	#   prefix  - the path the API is served under, mirroring the real API's
+	#   counts  - a Counter of {endpoint name: number of requests}, e.g. {'getAddonFiles': 399, 'getAddonInfos': 4}
+	#   searchDepth - the deepest index /addon/search pages to before answering HTTP 400, as the real API does; None for no limit
+	def __init__(self, fixture, latency=0.0, jitter=0.0, port=0, prefix='/api/v2', searchDepth=None):
+		super().__init__(('127.0.0.1', port), FixtureRequestHandler)
+		self.fixture = fixture
+		self.latency = latency
+		self.jitter = jitter
+		self.prefix = prefix
+		self.counts = collections.Counter()
+		self.countsLock = threading.Lock()
+		self.random = random.Random(0)
+		self.searchDepth = searchDepth
+		self.addonsByDownloads = sorted(fixture['addons'].values(), key=lambda info: -info.get('downloadCount', 0))
+		self.addonsByUpdate = sorted(fixture['addons'].values(), key=lambda info: info.get('dateModified', ''), reverse=True)
+		self.filesByID = {fileInfo['id']: fileInfo for fileList in fixture['files'].values() for fileInfo in fileList}
+		self.filesByFingerprint = {fileInfo['packageFingerprint']: (int(addonID), fileInfo) for addonID, fileList in fixture['files'].items()
+			for fileInfo in fileList if 'packageFingerprint' in fileInfo}
+		self.thread = None
+
+	# The base URL to give twitchapi.setBaseURL()
+	@property
+	def url(self):
+		return 'http://127.0.0.1:{}{}'.format(self.server_address[1], self.prefix)
+
+	def delay(self):
+		if self.latency or self.jitter:
+			time.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+	def record(self, endpoint):
+		with self.countsLock:
+			self.counts[endpoint] = self.counts[endpoint] + 1
+
+	# Returns a copy of counts, and resets it
+	def takeCounts(self):
+		with self.countsLock:
+			counts = dict(self.counts)
+			self.counts.clear()
+		return counts
+
+	# Serves requests on a background thread; returns self
+	def start(self):
+		self.thread = threading.Thread(target=self.serve_forever, name='FixtureServer', daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+def main():
+	parser = argparse.ArgumentParser(description='Serve recorded Twitch API responses locally')
+	parser.add_argument('--record', metavar='FILE', help='record the given addonIDs from the live API into FILE and exit')
+	parser.add_argument('--fixture', metavar='FILE', help='serve a fixture saved with --record (default: a synthetic fixture)')
+	parser.add_argument('--mods', type=int, default=500, help='number of mods in the synthetic fixture')
+	parser.add_argument('--port', type=int, default=8080)
+	parser.add_argument('--latency', type=float, default=0.0, help='milliseconds every request is delayed by')
+	parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra milliseconds are added to each delay')
+	parser.add_argument('addonIDs', nargs='*', type=int)
+	args = parser.parse_args()
+
+	if args.record:
+		saveFixture(recordFixture(args.addonIDs), args.record)
+		return
+	fixture = loadFixture(args.fixture) if args.fixture else syntheticFixture(args.mods)
+	server = FixtureServer(fixture, args.latency / 1000, args.jitter / 1000, args.port)
+	print('Serving {} addons at {}'.format(len(fixture['addons']), server.url))
+	print('Run PackCrafter with PACKCRAFTER_API_URL={} to use it'.format(server.url))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	print('Requests served: {}'.format(dict(server.counts)))
+
+if __name__ == '__main__':
+	main()
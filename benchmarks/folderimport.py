@@ -0,0 +1,82 @@
+import argparse
+import tempfile
+import random
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fixtureserver
+
+# Measures importing a mods folder (see modimport.py) against a local fixture server
+#   Writes a folder of synthetic jars, gives each one's fingerprint to a file of a synthetic fixture mod, then imports the folder:
+#   once cold (every jar fingerprinted) and once warm (every fingerprint cached), next to the time it takes just to read the jars
+#   Usage:
+#     python benchmarks/folderimport.py                        (300 jars of 1.5 MB on average, no latency)
+#     python benchmarks/folderimport.py --jars 50 --latency 80 --workers 1
+
+# Writes count jars of random sizes averaging meanSize bytes into folder; returns their paths
+def writeJars(folder, count, meanSize, seed=0):
+	rng = random.Random(seed)
+	paths = []
+	for index in range(count):
+		paths.append(os.path.join(folder, 'mod{}.jar'.format(index)))
+		with open(paths[-1], 'wb') as jarFile:
+			size = max(1024, int(rng.expovariate(1 / meanSize)))
+			jarFile.write(rng.getrandbits(8 * size).to_bytes(size, 'little'))
+	return paths
+
+# Returns the seconds it takes to read every file in paths
+def readAll(paths):
+	start = time.perf_counter()
+	for path in paths:
+		with open(path, 'rb') as jarFile:
+			while jarFile.read(1024 * 1024):
+				pass
+	return time.perf_counter() - start
+
+def main():
+	parser = argparse.ArgumentParser(description='Measure importing a mods folder against a local fixture server')
+	parser.add_argument('--jars', type=int, default=300, help='number of jars in the folder (default: 300)')
+	parser.add_argument('--size', type=float, default=1.5, help='average jar size in MB (default: 1.5)')
+	parser.add_argument('--workers', type=int, help='fingerprinting processes (default: one per CPU)')
+	parser.add_argument('--version', default='1.16.5', help='Minecraft version of the files the jars match (default: 1.16.5)')
+	parser.add_argument('--latency', type=float, default=0.0, help='milliseconds the server delays every request by (default: 0)')
+	args = parser.parse_args()
+
+	import twitchapi
+	import modimport
+	import modlist
+
+	with tempfile.TemporaryDirectory() as folder:
+		paths = writeJars(folder, args.jars, args.size * 1e6)
+		totalSize = sum(os.path.getsize(path) for path in paths)
+		readSeconds = readAll(paths)
+
+		# Each jar becomes a pack mod's newest file for the version; the last tenth match nothing
+		fixture = fixtureserver.syntheticFixture(max(args.jars, fixtureserver.MINECRAFT_VERSIONS.index(args.version) + 1))
+		fingerprints = modimport.scanFolder(folder, maxWorkers=args.workers)
+		for addonID, path in enumerate(paths[:args.jars - args.jars // 10], 1):
+			next(fileInfo for fileInfo in fixture['files'][str(addonID)] if args.version in fileInfo['gameVersion'])['packageFingerprint'] = fingerprints[path]
+		server = fixtureserver.FixtureServer(fixture, args.latency / 1000).start()
+		twitchapi.setBaseURL(server.url)
+
+		cache = modimport.FingerprintCache(os.path.join(folder, 'fingerprints.sqlite3'))
+		try:
+			print('{} jars, {:.1f} MB; reading them takes {:.1f} ms'.format(len(paths), totalSize / 1e6, readSeconds * 1000))
+			for run in ['cold', 'warm']:
+				server.takeCounts()
+				modList = modlist.ModList()
+				start = time.perf_counter()
+				mods, unmatched = modimport.importFolder(modList, folder, cache, args.workers)
+				elapsed = time.perf_counter() - start
+				print('{:<5} {:>9.1f} ms  {} matched, {} unmatched, {} mods in the modlist; requests: {}'.format(run, elapsed * 1000, len(mods), len(unmatched),
+					len(modList.mods), ', '.join('{} {}'.format(count, endpoint) for endpoint, count in sorted(server.takeCounts().items()))))
+		finally:
+			cache.close()
+			server.stop()
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,108 @@
+import argparse
+import tracemalloc
+import random
+import json
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import modlist
+
+# Measures how many bytes each modlist.File costs, compared with the original plain-object representation
+#   Usage:
+#     python benchmarks/memoryusage.py --record catalog 238222 32274 ...   (records getAddonInfo/getAddonFiles responses into catalog/)
+#     python benchmarks/memoryusage.py --catalog catalog                    (measures a recorded catalog)
+#     python benchmarks/memoryusage.py --mods 200 --files 1500              (measures a synthetic catalog)
+
+# Replica of the File layout before __slots__ and interning, used as the "before" figure
+class LegacyFile():
+	def __init__(self, mod, fileListItem):
+		self.mod = mod
+		self.mcVersions = [gameVersion for gameVersion in fileListItem['gameVersion'] if gameVersion != 'Forge']
+		self.fileID = fileListItem['id']
+		self.fileName = fileListItem['fileName']
+		self.fileURL = fileListItem['downloadUrl']
+		self.releaseType = modlist.ReleaseType(fileListItem['releaseType'])
+		self.dependencies = [(dependency['addonId'], modlist.DependencyType(dependency['type'])) for dependency in fileListItem['dependencies'] if dependency['type'] == modlist.DependencyType.REQUIRED]
+
+# Saves the getAddonInfo/getAddonFiles responses of the given addonIDs as <addonID>.json files in directory
+def recordCatalog(directory, addonIDs):
+	import twitchapi
+	os.makedirs(directory, exist_ok=True)
+	for addonID in addonIDs:
+		with open(os.path.join(directory, '{}.json'.format(addonID)), 'w') as recordFile:
+			json.dump({'info': twitchapi.getAddonInfo(addonID), 'files': twitchapi.getAddonFiles(addonID)}, recordFile)
+		print('Recorded addon {}'.format(addonID))
+
+# Returns a list of {'info': ..., 'files': ...} dicts loaded from a recorded catalog directory
+def loadCatalog(directory):
+	catalog = []
+	for fileName in sorted(os.listdir(directory)):
+		if fileName.endswith('.json'):
+			with open(os.path.join(directory, fileName)) as recordFile:
+				catalog.append(json.load(recordFile))
+	return catalog
+
+# Returns a synthetic catalog shaped like real getAddonFiles responses
+def syntheticCatalog(modCount, filesPerMod, seed=0):
+	rng = random.Random(seed)
+	mcVersions = ['1.7.10', '1.10.2', '1.12.2', '1.14.4', '1.15.2', '1.16.1', '1.16.3', '1.16.4', '1.16.5']
+	catalog = []
+	for addonID in range(1, modCount + 1):
+		files = []
+		for index in range(filesPerMod):
+			files.append({
+				'id': addonID * 100000 + index,
+				'fileName': 'mod{}-{}-{}.{}.{}.jar'.format(addonID, rng.choice(mcVersions), index // 100, index // 10 % 10, index % 10),
+				'downloadUrl': 'https://edge.forgecdn.net/files/{}/{}/mod{}.jar'.format(addonID, index, addonID),
+				'releaseType': rng.choice([1, 1, 1, 2, 3]),
+				'gameVersion': rng.sample(mcVersions, rng.randint(1, 3)) + ['Forge'],
+				'dependencies': [{'addonId': rng.randint(1, modCount), 'type': rng.choice([2, 3])} for _ in range(rng.randint(0, 3))],
+				})
+		info = {'id': addonID, 'name': 'Mod {}'.format(addonID), 'websiteUrl': 'https://www.curseforge.com/minecraft/mc-mods/mod{}'.format(addonID), 'authors': [{'name': 'author{}'.format(addonID)}]}
+		catalog.append({'info': info, 'files': files})
+	return catalog
+
+# Returns the number of bytes still allocated after build() returns, with its result kept alive
+def measure(build):
+	gc.collect()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	result = build()
+	gc.collect()
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del result
+	return after - before
+
+def main():
+	parser = argparse.ArgumentParser(description='Report bytes per modlist.File before and after the compact representation')
+	parser.add_argument('--record', metavar='DIR', help='record the given addonIDs from the live API into DIR and exit')
+	parser.add_argument('--catalog', metavar='DIR', help='measure a catalog previously saved with --record')
+	parser.add_argument('--mods', type=int, default=200, help='number of mods in the synthetic catalog')
+	parser.add_argument('--files', type=int, default=1000, help='number of files per mod in the synthetic catalog')
+	parser.add_argument('addonIDs', nargs='*', type=int)
+	args = parser.parse_args()
+
+	if args.record:
+		recordCatalog(args.record, args.addonIDs)
+		return
+	catalog = loadCatalog(args.catalog) if args.catalog else syntheticCatalog(args.mods, args.files)
+	fileCount = sum(len(entry['files']) for entry in catalog)
+
+	def buildLegacy():
+		return [[LegacyFile(None, fileListItem) for fileListItem in entry['files']] for entry in catalog]
+
+	def buildCurrent():
+		modList = modlist.ModList()
+		return [modlist.Mod(modList, addonSearchResult=entry['info'], fileInfo=entry['files']) for entry in catalog]
+
+	legacyBytes = measure(buildLegacy)
+	currentBytes = measure(buildCurrent)
+	print('{} mods, {} files'.format(len(catalog), fileCount))
+	print('Before: {:8.1f} bytes per file ({:.1f} MB)'.format(legacyBytes / fileCount, legacyBytes / 1e6))
+	print('After:  {:8.1f} bytes per file ({:.1f} MB, includes version indexes)'.format(currentBytes / fileCount, currentBytes / 1e6))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,213 @@
+import subprocess
+import statistics
+import argparse
+import tempfile
+import platform
+import json
+import time
+import gc
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fixtureserver
+
+# Measures what building a pack costs, against a local fixture server instead of the live API (see fixtureserver.py)
+#   Every scenario runs in a fresh interpreter, so nothing is shared between them and peak RSS means something
+#   Each scenario resolves a pack of N mods, exports it, then switches it to another Minecraft version, and reports per phase:
+#   wall time, requests sent, peak RSS, and the number of objects (Mods, Files and every other GC-tracked object) created
+#   Usage:
+#     python benchmarks/packbuild.py                                    (10, 100 and 500 mods, synthetic fixture, no latency)
+#     python benchmarks/packbuild.py --latency 80 --output after.json   (80 ms per request, results saved as JSON)
+#     python benchmarks/packbuild.py --compare before.json              (prints the change against results saved earlier)
+#     python benchmarks/packbuild.py --fixture fixture.json --mods 25 --version 1.12.2 --switch 1.16.5
+
+PHASES = ['resolve', 'export', 'switch']
+SYNTHETIC_FIXTURE_MODS = 500
+
+# Returns the peak resident set size of this process in bytes, or None if it can't be found
+def peakRSS():
+	try:
+		import resource
+	except ImportError: # Windows
+		return windowsPeakRSS()
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == 'darwin' else peak * 1024 # Kilobytes everywhere but macOS
+
+def windowsPeakRSS():
+	import ctypes
+	from ctypes import wintypes
+	class ProcessMemoryCounters(ctypes.Structure):
+		_fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t),
+			('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+			('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+			('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+	counters = ProcessMemoryCounters()
+	counters.cb = ctypes.sizeof(counters)
+	try:
+		if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+			return counters.PeakWorkingSetSize
+	except (AttributeError, OSError):
+		pass
+	return None
+
+# Runs function() and returns (its result, the phase's measurements)
+def measurePhase(function):
+	import twitchapi
+	gc.collect()
+	objectsBefore = len(gc.get_objects())
+	requestsBefore = twitchapi.getTransportStats()['attempts']
+	start = time.perf_counter()
+	result = function()
+	elapsed = time.perf_counter() - start
+	measurements = {
+		'seconds': elapsed,
+		'requests': twitchapi.getTransportStats()['attempts'] - requestsBefore,
+		'peakRSS': peakRSS(),
+		'objects': len(gc.get_objects()) - objectsBefore,
+		}
+	return result, measurements
+
+# Child process side: builds one pack from the server at url and prints its measurements as JSON
+def runScenario(url, pack, minecraftVersion, switchVersion):
+	import twitchapi
+	twitchapi.setBaseURL(url)
+	import packbuilder
+	import packtargets
+	import modloaders
+
+	spec = packbuilder.PackSpec('Benchmark', '1.0', 'benchmark', minecraftVersion, None, [(addonID, None) for addonID in pack])
+	results = {}
+	with tempfile.TemporaryDirectory() as outputFolder:
+		builder = packbuilder.PackBuilder(outputFolder, useLocks=False)
+		modList, results['resolve'] = measurePhase(lambda: builder.resolve(spec))
+		results['totals'] = {'mods': len(modList.mods), 'files': sum(len(mod.files) for mod in modList.mods.values()),
+			'selected': sum(1 for mod in modList.mods.values() if mod.selectedFile != None)}
+
+		def export():
+			packtargets.exportPack(spec, modList, [packtargets.PackFolder(outputFolder), packtargets.CurseForgeZip(os.path.join(outputFolder, 'Benchmark.zip'))])
+		_, results['export'] = measurePhase(export)
+
+		def switch(): # What the GUI does when another Minecraft version is picked (see Application.selectMinecraftVersion)
+			modloaders.getCatalog().versions(switchVersion)
+			for mod in list(modList.mods.values()):
+				if mod.selectedFile != None and switchVersion not in mod.selectedFile.mcVersions:
+					mod.selectedFile = None
+			modList.setMinecraftVersion(switchVersion)
+		_, results['switch'] = measurePhase(switch)
+		builder.close()
+	print(json.dumps(results))
+
+# Parent side: runs the scenario for the first modCount mods of the fixture's pack in a fresh interpreter, and returns its results
+#   Each phase also gets the requests the server saw per endpoint
+def launchScenario(server, modCount, minecraftVersion, switchVersion):
+	pack = server.fixture['pack'][:modCount]
+	server.takeCounts()
+	result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', server.url, ','.join(str(addonID) for addonID in pack),
+		minecraftVersion, switchVersion], cwd=ROOT, capture_output=True, text=True)
+	if result.returncode != 0:
+		raise RuntimeError('Scenario with {} mods failed:\n{}'.format(modCount, result.stderr))
+	results = json.loads(result.stdout.splitlines()[-1])
+	results['totals']['endpoints'] = server.takeCounts()
+	return results
+
+# Returns the results of runs of the same scenario combined: the median time of each phase, and the rest from the first run
+def combineRuns(runs):
+	combined = runs[0]
+	for phase in PHASES:
+		combined[phase]['seconds'] = statistics.median(run[phase]['seconds'] for run in runs)
+	return combined
+
+def gitCommit():
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def formatBytes(value):
+	return '{:.1f} MB'.format(value / 1e6) if value != None else 'n/a'
+
+def printResults(document):
+	print('{:>6}  {:<8}  {:>10}  {:>9}  {:>10}  {:>9}'.format('mods', 'phase', 'time', 'requests', 'peak RSS', 'objects'))
+	for modCount, scenario in document['scenarios'].items():
+		for phase in PHASES:
+			measurements = scenario[phase]
+			print('{:>6}  {:<8}  {:>7.1f} ms  {:>9}  {:>10}  {:>9}'.format(modCount, phase, measurements['seconds'] * 1000, measurements['requests'],
+				formatBytes(measurements['peakRSS']), measurements['objects']))
+		totals = scenario['totals']
+		print('{:>6}  {} mods and {} files resolved, {} files selected; requests by endpoint: {}'.format('', totals['mods'], totals['files'], totals['selected'],
+			', '.join('{} {}'.format(count, endpoint) for endpoint, count in sorted(totals['endpoints'].items()))))
+
+# Prints how every measurement changed between two results documents
+def printComparison(before, after):
+	print('Compared with {} (commit {}):'.format(before.get('date'), before.get('commit')))
+	for setting in ['fixture', 'latency', 'jitter', 'minecraftVersion', 'switchVersion']:
+		if before.get(setting) != after.get(setting):
+			print('  Warning: {} was {!r}, now {!r}; the results are not directly comparable'.format(setting, before.get(setting), after.get(setting)))
+	for modCount, scenario in after['scenarios'].items():
+		if modCount not in before['scenarios']:
+			continue
+		for phase in PHASES:
+			changes = []
+			for metric in ['seconds', 'requests', 'peakRSS', 'objects']:
+				old = before['scenarios'][modCount][phase][metric]
+				new = scenario[phase][metric]
+				if old == None or new == None:
+					continue
+				changes.append('{} {}'.format(metric, '{:+.1f}%'.format((new - old) * 100 / old) if old else '{:+}'.format(new)))
+			print('{:>6}  {:<8}  {}'.format(modCount, phase, ', '.join(changes)))
+
+def main():
+	if len(sys.argv) > 1 and sys.argv[1] == '--child':
+		url, pack, minecraftVersion, switchVersion = sys.argv[2:6]
+		runScenario(url, [int(addonID) for addonID in pack.split(',')], minecraftVersion, switchVersion)
+		return 0
+
+	parser = argparse.ArgumentParser(description='Measure pack resolution, export and version switching against a local fixture server')
+	parser.add_argument('--fixture', metavar='FILE', help='fixture recorded with fixtureserver.py --record (default: a synthetic fixture)')
+	parser.add_argument('--mods', type=int, nargs='+', default=[10, 100, 500], help='pack sizes to run (default: 10 100 500)')
+	parser.add_argument('--version', default='1.16.5', help='Minecraft version the pack is resolved for (default: 1.16.5)')
+	parser.add_argument('--switch', default='1.18.2', help='Minecraft version the pack is switched to (default: 1.18.2)')
+	parser.add_argument('--latency', type=float, default=0.0, help='milliseconds the server delays every request by (default: 0)')
+	parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra milliseconds are added to each delay (default: 0)')
+	parser.add_argument('--runs', type=int, default=3, help='runs per scenario; the median time of each phase is reported (default: 3)')
+	parser.add_argument('--output', metavar='FILE', help='save the results as JSON')
+	parser.add_argument('--compare', metavar='FILE', help='compare the results with ones saved earlier with --output')
+	args = parser.parse_args()
+
+	# The synthetic fixture only depends on its size, so runs with different --mods still see the same mods
+	syntheticSize = max([SYNTHETIC_FIXTURE_MODS] + args.mods)
+	fixture = fixtureserver.loadFixture(args.fixture) if args.fixture else fixtureserver.syntheticFixture(syntheticSize)
+	server = fixtureserver.FixtureServer(fixture, args.latency / 1000, args.jitter / 1000).start()
+	document = {
+		'commit': gitCommit(),
+		'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'fixture': args.fixture or 'synthetic-{}'.format(syntheticSize),
+		'latency': args.latency,
+		'jitter': args.jitter,
+		'minecraftVersion': args.version,
+		'switchVersion': args.switch,
+		'scenarios': {},
+		}
+	try:
+		for modCount in args.mods:
+			runs = [launchScenario(server, modCount, args.version, args.switch) for _ in range(args.runs)]
+			document['scenarios'][str(modCount)] = combineRuns(runs)
+	finally:
+		server.stop()
+
+	printResults(document)
+	if args.compare:
+		with open(args.compare, encoding='utf-8') as compareFile:
+			printComparison(json.load(compareFile), document)
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as outputFile:
+			json.dump(document, outputFile, indent='\t')
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
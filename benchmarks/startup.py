@@ -0,0 +1,90 @@
+import subprocess
+import argparse
+import time
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Measures PackCrafter's cold start, and fails if importing the GUI gets slow again
+#   Usage:
+#     python benchmarks/startup.py                  (import time budget check, then time to first paint if a display is available)
+#     python benchmarks/startup.py --budget 60 --runs 10
+#   Exits with status 1 if the import budget is exceeded, or a deferred module is imported at startup
+
+# Milliseconds importing the GUI may take (see tests/test_startup.py, which enforces it)
+IMPORT_BUDGET_MS = 80.0
+
+# Modules the GUI only imports once they're needed; importing any of them at startup fails the check
+DEFERRED_MODULES = ['requests', 'urllib3', 'packaging', 'webbrowser', 'zipfile', 'sqlite3', 'argparse', 'packbuilder', 'packexport', 'packtargets', 'jarstore', 'apicache', 'catalog']
+
+# Runs "import module" under -X importtime in a fresh interpreter
+#   Returns (cumulative microseconds spent importing module, {name: cumulative microseconds} of every module imported because of it)
+def importTime(module):
+	result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=ROOT, capture_output=True, text=True, check=True)
+	subtree = {}
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:') or line.endswith('| imported package'):
+			continue
+		try:
+			selfTime, cumulative, name = line[len('import time:'):].split('|')
+			cumulative = int(cumulative)
+		except ValueError: # Header line
+			continue
+		if not name.startswith('  '): # Top-level import; everything listed since the previous one was imported by it
+			if name.strip() == module:
+				return cumulative, subtree
+			subtree = {}
+		else:
+			subtree[name.strip()] = cumulative
+	raise RuntimeError('{} was not imported'.format(module))
+
+# Launches the GUI with --exit-after-paint and returns the wall time in seconds from launch to the window's first paint, or None without a display
+def firstPaint():
+	start = time.perf_counter()
+	process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'application.py'), '--exit-after-paint'], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+	line = process.stdout.readline()
+	elapsed = time.perf_counter() - start
+	process.wait()
+	if not line.startswith('First paint'):
+		return None
+	return elapsed
+
+def main():
+	parser = argparse.ArgumentParser(description='Check the GUI import time budget and measure time to first paint')
+	parser.add_argument('--module', default='application', help='module whose import time is checked (default: application)')
+	parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help='maximum import time in milliseconds (default: {:g})'.format(IMPORT_BUDGET_MS))
+	parser.add_argument('--runs', type=int, default=5, help='number of runs; the fastest import and the median paint are reported (default: 5)')
+	parser.add_argument('--no-paint', action='store_true', help="don't launch the GUI")
+	args = parser.parse_args()
+
+	failed = False
+	measurements = [importTime(args.module) for _ in range(args.runs)]
+	cumulative, subtree = min(measurements, key=lambda measurement: measurement[0])
+	print('import {}: {:.1f} ms (budget {:.1f} ms)'.format(args.module, cumulative / 1000, args.budget))
+	for name, microseconds in sorted(subtree.items(), key=lambda item: -item[1])[:10]:
+		print('  {:8.1f} ms  {}'.format(microseconds / 1000, name))
+	if cumulative / 1000 > args.budget:
+		print('FAILED: import time is over budget')
+		failed = True
+	deferred = [name for name in DEFERRED_MODULES if name in subtree]
+	if deferred:
+		print('FAILED: imported at startup: {}'.format(', '.join(deferred)))
+		failed = True
+
+	if not args.no_paint:
+		paints = []
+		for _ in range(args.runs):
+			elapsed = firstPaint()
+			if elapsed == None:
+				print('time to first paint: skipped (no display)')
+				break
+			paints.append(elapsed)
+		if paints:
+			paints.sort()
+			print('time to first paint: {:.1f} ms median, {:.1f} ms fastest over {} runs'.format(paints[len(paints) // 2] * 1000, paints[0] * 1000, len(paints)))
+
+	return 1 if failed else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,319 @@
+import itertools
+import threading
+import logging
+import bisect
+import sys
+import re
+import os
+
+import twitchapi
+
+logger = logging.getLogger(__name__)
+
+# Local, searchable copy of the Minecraft mod catalog, so mods can be found as the user types, without the network
+#   The catalog is stored in a small SQLite database and refreshed incrementally: only mods updated since the last refresh are fetched
+#   Searching is done on an in-memory CatalogIndex, which is rebuilt and swapped in whole after every refresh, so readers never need a lock
+
+def getCatalogPath():
+	"""Returns the default location of the mod catalog database for linux or windows"""
+	if os.name == 'nt':
+		base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+	else:
+		base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return os.path.join(base, 'PackCrafter', 'catalog.sqlite3')
+
+# How a pass of Catalog.fetchUpdates() ended: every update fetched, cut off by the search endpoint's depth limit, or cancelled
+REFRESH_DONE = 0
+REFRESH_CUT_OFF = 1
+REFRESH_CANCELLED = 2
+
+# Match qualities of a query token against a catalog token, best first
+EXACT  = 2 # The catalog token is the query token
+PREFIX = 1 # The catalog token starts with the query token (e.g. while it's still being typed)
+FUZZY  = 0 # The catalog token is one typo away from the query token (see withinOneEdit)
+
+# Query tokens shorter than this are never matched fuzzily; almost every short token is one edit away from something
+#   Tokens with digits in them (versions, "1.12", "mod2") aren't either: one digit off is a different thing, not a typo
+FUZZY_MIN_LENGTH = 4
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Returns the list of lowercase word/number tokens of a string, e.g. "Just Enough Items (JEI)" -> ['just', 'enough', 'items', 'jei']
+def tokenize(text):
+	return [sys.intern(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+# Returns True if a and b differ by at most one inserted, deleted, substituted or swapped (adjacent) character
+def withinOneEdit(a, b):
+	if abs(len(a) - len(b)) > 1:
+		return False
+	if len(a) > len(b):
+		a, b = b, a
+	for i in range(len(a)):
+		if a[i] != b[i]:
+			if len(a) == len(b):
+				return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:])
+			return a[i:] == b[i + 1:]
+	return True
+
+# Shared copies of the sets of Minecraft versions, as most mods support one of a few common combinations
+internedVersionSets = {}
+
+# Returns the shared frozenset of the given Minecraft version strings
+def internVersionSet(mcVersions):
+	versionSet = frozenset(mcVersions)
+	return internedVersionSets.setdefault(versionSet, frozenset(sys.intern(mcVersion) for mcVersion in versionSet))
+
+# One mod of the catalog
+#   Uses __slots__, as the full catalog holds tens of thousands of these
+class CatalogEntry:
+	__slots__ = ('addonID', 'name', 'slug', 'authors', 'downloadCount', 'mcVersions', 'websiteUrl', 'dateModified')
+
+	# Instance variables:
+	#   addonID       - the CurseForge "Addon ID" of the mod
+	#   name          - the name of the mod
+	#   slug          - the mod's URL slug, e.g. "jei"
+	#   authors       - a tuple of the names of the mod's authors
+	#   downloadCount - the mod's total download count, used to rank otherwise equal matches
+	#   mcVersions    - a frozenset of the Minecraft versions the mod has files for, shared with every other entry for the same versions
+	#   websiteUrl    - the URL of the mod on CurseForge
+	#   dateModified  - the API's ISO 8601 timestamp of the mod's last update
+	def __init__(self, addonID, name, slug, authors, downloadCount, mcVersions, websiteUrl, dateModified):
+		self.addonID = addonID
+		self.name = name
+		self.slug = slug
+		self.authors = tuple(authors)
+		self.downloadCount = downloadCount
+		self.mcVersions = internVersionSet(mcVersions)
+		self.websiteUrl = websiteUrl
+		self.dateModified = dateModified
+
+	# Returns the set of search tokens of the mod's name, slug and authors
+	def tokens(self):
+		return set(tokenize(self.name) + tokenize(self.slug) + [token for author in self.authors for token in tokenize(author)])
+
+	# Creates a CatalogEntry from one result of a twitchAddonSearch() or getModsPage() call
+	@classmethod
+	def fromSearchResult(cls, result):
+		return cls(result['id'], result['name'], result.get('slug') or '', [author['name'] for author in result.get('authors', [])],
+			result.get('downloadCount') or 0, [latestFile['gameVersion'] for latestFile in result.get('gameVersionLatestFiles', [])],
+			result.get('websiteUrl') or '', result.get('dateModified') or '')
+
+	# Returns the subset of a twitchAddonSearch() result needed to create a modlist.Mod, so adding a mod found here needs no getAddonInfo() call
+	def toSearchResult(self):
+		return {'id': self.addonID, 'name': self.name, 'websiteUrl': self.websiteUrl, 'authors': [{'name': author} for author in self.authors]}
+
+# Immutable in-memory search index over a list of CatalogEntries
+#   Entries are numbered by popularity (most downloaded first), so among equally good matches the lowest numbers win
+#   A search turns every query token into the set of entry numbers it matches and intersects those sets, so the per-keystroke work is
+#   done by set operations rather than by looking at entries one at a time
+class CatalogIndex:
+	# Instance variables:
+	#   entries  - the list of CatalogEntries, most downloaded first
+	#   postings - a dict of {token: tuple of the numbers of the entries with that token, ascending}
+	#   tokens   - a sorted list of every token, for finding the tokens starting with a prefix by bisection
+	#   initials - a dict of {first character: frozenset of entry numbers} with a token starting with it; the one-keystroke query is the broadest
+	#   versions - a dict of {Minecraft version: frozenset of the numbers of the entries with files for it}
+	#   buckets  - a dict of {(first character, length): list of tokens}, the candidates checked for fuzzy matches
+	def __init__(self, entries):
+		self.entries = sorted(entries, key=lambda entry: -entry.downloadCount)
+		postings = {}
+		versions = {}
+		for number, entry in enumerate(self.entries):
+			for token in entry.tokens():
+				postings.setdefault(token, []).append(number)
+			for mcVersion in entry.mcVersions:
+				versions.setdefault(mcVersion, []).append(number)
+		self.postings = {token: tuple(numbers) for token, numbers in postings.items()} # Most tokens belong to one or two entries; tuples keep those small
+		self.versions = {mcVersion: frozenset(numbers) for mcVersion, numbers in versions.items()}
+		self.tokens = sorted(self.postings)
+		initials = {}
+		self.buckets = {}
+		for token in self.tokens:
+			initials.setdefault(token[0], []).append(self.postings[token])
+			if len(token) >= FUZZY_MIN_LENGTH - 1 and token.isalpha():
+				self.buckets.setdefault((token[0], len(token)), []).append(token)
+		self.initials = {initial: frozenset().union(*numbers) for initial, numbers in initials.items()}
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Returns the list of catalog tokens starting with prefix (including prefix itself)
+	def tokensWithPrefix(self, prefix):
+		start = bisect.bisect_left(self.tokens, prefix)
+		end = bisect.bisect_left(self.tokens, prefix + '\U0010ffff', start)
+		return self.tokens[start:end]
+
+	# Returns the set of catalog tokens one typo away from token (see withinOneEdit)
+	#   Only tokens with the same first letter are considered, which keeps this to a few hundred comparisons
+	def fuzzyTokens(self, token):
+		if len(token) < FUZZY_MIN_LENGTH or not token.isalpha():
+			return []
+		matches = []
+		for length in (len(token) - 1, len(token), len(token) + 1):
+			for candidate in self.buckets.get((token[0], length), ()):
+				if withinOneEdit(token, candidate):
+					matches.append(candidate)
+		return matches
+
+	# Returns the set of numbers of the entries a query token matches with at least the given quality
+	#   previous is the set returned for the next better quality, which every worse quality's set includes
+	def matching(self, queryToken, quality, previous):
+		if quality == EXACT:
+			return frozenset(self.postings.get(queryToken, ()))
+		if quality == PREFIX:
+			if len(queryToken) == 1:
+				return self.initials.get(queryToken, frozenset())
+			return previous.union(*[self.postings[token] for token in self.tokensWithPrefix(queryToken)])
+		return previous.union(*[self.postings[token] for token in self.fuzzyTokens(queryToken)])
+
+	# Returns up to limit CatalogEntries matching every token of query, best first
+	#   Entries are ranked by their worst-matching query token (exact, then prefix, then fuzzy), then by download count
+	#   If minecraftVersion is given, only mods with files for that Minecraft version are returned
+	def search(self, query, minecraftVersion=None, limit=50):
+		queryTokens = list(dict.fromkeys(tokenize(query)))
+		if not queryTokens:
+			return []
+		numbers = []
+		found = frozenset()
+		tokenMatches = [frozenset()] * len(queryTokens)
+		for quality in (EXACT, PREFIX, FUZZY):
+			tokenMatches = [self.matching(queryToken, quality, previous) for queryToken, previous in zip(queryTokens, tokenMatches)]
+			candidates = sorted(tokenMatches, key=len)
+			if minecraftVersion != None:
+				candidates.insert(0, self.versions.get(minecraftVersion, frozenset()))
+			candidates = candidates[0].intersection(*candidates[1:]) - found
+			if candidates:
+				if len(candidates) < 4 * limit:
+					numbers.extend(sorted(candidates)[:limit - len(numbers)])
+				else: # Dense enough that counting up from the most popular entry finds enough of them quickly
+					numbers.extend(itertools.islice(filter(candidates.__contains__, range(len(self.entries))), limit - len(numbers)))
+				if len(numbers) >= limit:
+					break
+				found = found.union(numbers)
+		return [self.entries[number] for number in numbers]
+
+# The persistent mod catalog, and the CatalogIndex currently used to search it
+#   Safe to share between threads; every database access is serialized through a lock
+class Catalog:
+	# Instance variables:
+	#   path        - the path of the SQLite database file
+	#   index       - the CatalogIndex of every stored entry; replaced whole (never modified) by load() and refresh()
+	#   lastRefresh - the newest dateModified seen by the last completed refresh, or None if the catalog has never been fully fetched
+	#   complete    - False if the last refresh couldn't fetch every update (it was cancelled, or the search endpoint wouldn't page deep enough)
+	def __init__(self, path=None):
+		import sqlite3
+		self.path = path if path != None else getCatalogPath()
+		self.lock = threading.Lock()
+		self.index = CatalogIndex([])
+
+		if self.path != ':memory:':
+			os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		self.connection = sqlite3.connect(self.path, check_same_thread=False)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.execute('''CREATE TABLE IF NOT EXISTS addons (
+			addonID       INTEGER PRIMARY KEY,
+			name          TEXT NOT NULL,
+			slug          TEXT NOT NULL,
+			authors       TEXT NOT NULL,
+			downloadCount REAL NOT NULL,
+			mcVersions    TEXT NOT NULL,
+			websiteUrl    TEXT NOT NULL,
+			dateModified  TEXT NOT NULL)''')
+		self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+		self.connection.commit()
+		row = self.connection.execute("SELECT value FROM meta WHERE key = 'lastRefresh'").fetchone()
+		self.lastRefresh = row[0] if row != None else None
+		self.complete = self.lastRefresh != None
+
+	# Builds the search index from the stored entries
+	#   Returns the new CatalogIndex
+	def load(self):
+		with self.lock:
+			rows = self.connection.execute('SELECT addonID, name, slug, authors, downloadCount, mcVersions, websiteUrl, dateModified FROM addons').fetchall()
+		entries = [CatalogEntry(addonID, name, slug, authors.split('\n') if authors else [], downloadCount, mcVersions.split(), websiteUrl, dateModified)
+			for addonID, name, slug, authors, downloadCount, mcVersions, websiteUrl, dateModified in rows]
+		self.index = CatalogIndex(entries)
+		return self.index
+
+	# Searches the current index (see CatalogIndex.search)
+	def search(self, query, minecraftVersion=None, limit=50):
+		return self.index.search(query, minecraftVersion, limit)
+
+	# Stores (or updates) the given CatalogEntries
+	def store(self, entries):
+		with self.lock:
+			self.connection.executemany('INSERT OR REPLACE INTO addons (addonID, name, slug, authors, downloadCount, mcVersions, websiteUrl, dateModified) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+				[(entry.addonID, entry.name, entry.slug, '\n'.join(entry.authors), entry.downloadCount, ' '.join(sorted(entry.mcVersions)), entry.websiteUrl, entry.dateModified) for entry in entries])
+			self.connection.commit()
+
+	# Fetches every mod updated since the last refresh (or the whole catalog the first time), newest updates first, then rebuilds the index
+	#   Pages are stored as they arrive, so an interrupted first refresh only has to re-fetch, not re-store, what it already got
+	#   The search endpoint only pages so deep; when the updates go deeper than that, they're fetched again one Minecraft version at a time,
+	#   as each version's listing is far shorter. If even one of those is cut off too, the catalog is left partial (complete is False):
+	#   lastRefresh isn't moved, so the next refresh fetches every update again
+	#   isCancelled - an optional function; the refresh stops early (without marking the catalog up to date) once it returns True
+	#   Returns the number of entries added or updated
+	def refresh(self, pageSize=50, isCancelled=None):
+		seen = set()
+		newest, outcome = self.fetchUpdates(seen, pageSize, isCancelled)
+		if outcome == REFRESH_CUT_OFF:
+			logger.info('The mod catalog has more updates than the search endpoint pages through; fetching them per Minecraft version')
+			outcome = REFRESH_DONE
+			for gameVersion in [entry['versionString'] for entry in twitchapi.getMinecraftVersionList()]:
+				versionNewest, versionOutcome = self.fetchUpdates(seen, pageSize, isCancelled, gameVersion)
+				if versionNewest != None and (newest == None or versionNewest > newest):
+					newest = versionNewest
+				if versionOutcome == REFRESH_CANCELLED:
+					outcome = versionOutcome
+					break
+				if versionOutcome == REFRESH_CUT_OFF:
+					logger.warning('Minecraft %s has more updated mods than the search endpoint pages through', gameVersion)
+					outcome = versionOutcome
+
+		self.complete = outcome == REFRESH_DONE
+		if self.complete and newest != None:
+			with self.lock:
+				self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('lastRefresh', ?)", (newest,))
+				self.connection.commit()
+			self.lastRefresh = newest
+		elif outcome == REFRESH_CUT_OFF:
+			logger.warning('The mod catalog is partial: some updated mods are missing from it, and will be fetched again on the next refresh')
+		if seen or not len(self.index):
+			self.load()
+		return len(seen)
+
+	# Pages through the mods updated since the last refresh (only those with files for gameVersion, if it's given), newest first,
+	#   storing every entry whose addonID isn't in seen yet and adding it to seen
+	#   Returns (the newest dateModified fetched or None, REFRESH_DONE, REFRESH_CUT_OFF or REFRESH_CANCELLED)
+	def fetchUpdates(self, seen, pageSize, isCancelled, gameVersion=None):
+		newest = None
+		index = 0
+		while True:
+			if isCancelled != None and isCancelled():
+				return newest, REFRESH_CANCELLED
+			try:
+				page = twitchapi.getModsPage(index, pageSize, gameVersion=gameVersion)
+			except twitchapi.TwitchAPIStatusError as error:
+				if error.statusCode == 400 and index > 0: # Paged past the deepest index the search endpoint allows
+					return newest, REFRESH_CUT_OFF
+				raise
+			entries = []
+			reachedKnown = False
+			for result in page:
+				entry = CatalogEntry.fromSearchResult(result)
+				if self.lastRefresh != None and entry.dateModified <= self.lastRefresh:
+					reachedKnown = True
+					break
+				if newest == None or entry.dateModified > newest:
+					newest = entry.dateModified
+				if entry.addonID not in seen:
+					seen.add(entry.addonID)
+					entries.append(entry)
+			self.store(entries)
+			if reachedKnown or len(page) < pageSize:
+				return newest, REFRESH_DONE
+			index = index + pageSize
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
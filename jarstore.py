@@ -0,0 +1,215 @@
+import sqlite3
+import threading
+import shutil
+import time
+import os
+
+import modlist
+
+# Content-addressed store of downloaded mod jars, shared by every modpack built on this machine
+#   Each jar is stored once under objects/, keyed by its CurseForge file ID and hash, and pack folders hardlink (or reflink, or copy) into it
+#   A small SQLite database tracks which packs reference which jars, so unreferenced jars can be garbage collected
+
+def getStorePath():
+	"""Returns the default location of the jar store for linux or windows"""
+	if os.name == 'nt':
+		base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+	else:
+		base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return os.path.join(base, 'PackCrafter', 'jars')
+
+# ioctl request number for FICLONE on Linux, which makes a copy-on-write clone of a file on filesystems that support it (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Makes destination a reflink (copy-on-write clone) of source, raising OSError if the platform or filesystem can't
+def reflink(source, destination):
+	if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+		raise OSError('Reflinks are only supported on Linux')
+	import fcntl
+	with open(source, 'rb') as sourceFile, open(destination, 'wb') as destinationFile:
+		try:
+			fcntl.ioctl(destinationFile.fileno(), FICLONE, sourceFile.fileno())
+		except OSError:
+			destinationFile.close()
+			os.remove(destination)
+			raise
+
+# Returns the store key for a File: "<fileID>-<digest>" when its hash is known, otherwise just "<fileID>"
+def storeKey(file):
+	if file.fileHash != None:
+		return '{}-{}'.format(file.fileID, file.fileHash[1])
+	return str(file.fileID)
+
+class JarStore:
+	# Instance variables:
+	#   root    - the folder holding the store (objects/, tmp/ and the index database)
+	#   maxSize - the total size in bytes above which jars are evicted, least recently used (and unreferenced) first
+	#   linked  - number of jars hardlinked or reflinked into pack folders by this JarStore
+	#   copied  - number of jars that had to be copied into pack folders instead
+	def __init__(self, root=None, maxSize=10 * 1024 * 1024 * 1024):
+		self.root = root if root != None else getStorePath()
+		self.maxSize = maxSize
+		self.linked = 0
+		self.copied = 0
+		self.lock = threading.Lock()
+		os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+		os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+
+		self.connection = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), check_same_thread=False)
+		self.connection.execute('''CREATE TABLE IF NOT EXISTS jars (
+			key      TEXT PRIMARY KEY,
+			fileID   INTEGER NOT NULL,
+			fileName TEXT NOT NULL,
+			size     INTEGER NOT NULL,
+			lastUsed REAL NOT NULL)''')
+		self.connection.execute('''CREATE TABLE IF NOT EXISTS refs (
+			pack TEXT NOT NULL,
+			key  TEXT NOT NULL,
+			PRIMARY KEY (pack, key))''')
+		self.connection.commit()
+
+	# Returns the path a jar with the given key is (or would be) stored at
+	def objectPath(self, key):
+		return os.path.join(self.root, 'objects', key[-2:], key + '.jar')
+
+	# Returns True if the File's jar is already in the store
+	def contains(self, file):
+		return os.path.exists(self.objectPath(storeKey(file)))
+
+	# Makes sure every given File is in the store, downloading the missing ones in parallel
+	#   The downloads go into the store's tmp/ folder whatever downloadManager's directory is; it's restored afterwards
+	#   Returns a dict of {fileID: object path}
+	def ensureFiles(self, files, downloadManager=None):
+		missing = [file for file in files if not self.contains(file)]
+		if missing:
+			if downloadManager == None:
+				downloadManager = modlist.DownloadManager()
+			directory = downloadManager.directory
+			downloadManager.directory = os.path.join(self.root, 'tmp')
+			try:
+				downloaded = downloadManager.downloadFiles(missing)
+			finally:
+				downloadManager.directory = directory
+			for file in missing:
+				self.addFile(file, downloaded[file.mod.addonID])
+
+		paths = {}
+		now = time.time()
+		with self.lock:
+			for file in files:
+				paths[file.fileID] = self.objectPath(storeKey(file))
+				self.connection.execute('UPDATE jars SET lastUsed = ? WHERE key = ?', (now, storeKey(file)))
+			self.connection.commit()
+		return paths
+
+	# Moves a downloaded (and already verified) jar at path into the store
+	def addFile(self, file, path):
+		key = storeKey(file)
+		objectPath = self.objectPath(key)
+		os.makedirs(os.path.dirname(objectPath), exist_ok=True)
+		os.replace(path, objectPath)
+		with self.lock:
+			self.connection.execute('INSERT OR REPLACE INTO jars (key, fileID, fileName, size, lastUsed) VALUES (?, ?, ?, ?, ?)',
+				(key, file.fileID, file.fileName, os.path.getsize(objectPath), time.time()))
+			self.connection.commit()
+		return objectPath
+
+	# Places the stored jar at objectPath at destination, preferring a hardlink, then a reflink, then a plain copy
+	#   Nothing is written if destination already is the stored jar
+	def place(self, objectPath, destination):
+		if os.path.exists(destination):
+			if os.path.samefile(objectPath, destination):
+				return
+			os.remove(destination)
+		try:
+			os.link(objectPath, destination)
+			self.linked = self.linked + 1
+			return
+		except OSError:
+			pass
+		try:
+			reflink(objectPath, destination)
+			self.linked = self.linked + 1
+			return
+		except OSError:
+			pass
+		shutil.copyfile(objectPath, destination)
+		self.copied = self.copied + 1
+
+	# Makes sure every given File is in the store, fetching any jar the store doesn't have yet
+	#   The pack's references are replaced with exactly these jars, so jars it no longer uses become collectable;
+	#   then other jars are evicted if the store has grown past maxSize
+	#   Returns a dict of {fileID: object path}
+	def collectFiles(self, files, packName, downloadManager=None):
+		objectPaths = self.ensureFiles(files, downloadManager)
+		keys = [storeKey(file) for file in files]
+		self.setReferences(packName, keys)
+		self.evict(keep=keys)
+		return objectPaths
+
+	# Records that the pack named packName uses exactly the jars with the given keys
+	def setReferences(self, packName, keys):
+		with self.lock:
+			self.connection.execute('DELETE FROM refs WHERE pack = ?', (packName,))
+			self.connection.executemany('INSERT OR IGNORE INTO refs (pack, key) VALUES (?, ?)', [(packName, key) for key in keys])
+			self.connection.commit()
+
+	# Forgets every reference held by the pack named packName
+	def removePack(self, packName):
+		self.setReferences(packName, [])
+
+	# Returns the number of packs referencing the jar with the given key
+	def referenceCount(self, key):
+		with self.lock:
+			return self.connection.execute('SELECT COUNT(*) FROM refs WHERE key = ?', (key,)).fetchone()[0]
+
+	# Returns the total size in bytes of every jar in the store
+	def totalSize(self):
+		with self.lock:
+			return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM jars').fetchone()[0]
+
+	# Deletes jars from the store, returning the number of bytes freed
+	def deleteJars(self, keys):
+		freed = 0
+		with self.lock:
+			for key in keys:
+				row = self.connection.execute('SELECT size FROM jars WHERE key = ?', (key,)).fetchone()
+				try:
+					os.remove(self.objectPath(key))
+				except FileNotFoundError:
+					pass
+				self.connection.execute('DELETE FROM jars WHERE key = ?', (key,))
+				freed = freed + (row[0] if row != None else 0)
+			self.connection.commit()
+		return freed
+
+	# Deletes every jar no pack references, returning the number of bytes freed
+	def collectGarbage(self):
+		with self.lock:
+			keys = [row[0] for row in self.connection.execute('SELECT key FROM jars WHERE key NOT IN (SELECT key FROM refs)')]
+		return self.deleteJars(keys)
+
+	# Deletes jars until the store fits in maxSize, returning the number of bytes freed
+	#   Unreferenced jars go first, then the least recently used referenced ones (pack folders keep their own links to those)
+	#   Jars whose keys are in keep (e.g. those of the pack being exported) are never deleted, even if the store stays over maxSize
+	def evict(self, keep=()):
+		excess = self.totalSize() - self.maxSize
+		if excess <= 0:
+			return 0
+		keep = set(keep)
+		with self.lock:
+			rows = self.connection.execute('''SELECT key, size FROM jars
+				ORDER BY (SELECT COUNT(*) FROM refs WHERE refs.key = jars.key) > 0, lastUsed ASC''').fetchall()
+		keys = []
+		for key, size in rows:
+			if excess <= 0:
+				break
+			if key in keep:
+				continue
+			keys.append(key)
+			excess = excess - size
+		return self.deleteJars(keys)
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
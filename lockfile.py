@@ -0,0 +1,171 @@
+import json
+import os
+
+import modlist
+
+# Lockfiles record exactly how a pack spec was resolved, so the next build of the same pack only has to re-resolve what changed
+#   A lockfile (packcrafter.lock, written next to manifest.json) lists the pack's requested mods as they were in the spec,
+#   and for every mod in the pack: its addon info, its selected file (with content hash) and the required dependency edges of that file
+#   Mods taken from a lockfile are rebuilt without any API call (see LockedMod.toMod)
+
+LOCK_FILE_NAME = 'packcrafter.lock'
+LOCK_VERSION = 1
+
+# Hash algorithm names, and their numbers in the "hashes" list of a file (the reverse of modlist.HASH_ALGORITHMS)
+HASH_ALGORITHM_NUMBERS = {name: number for number, name in modlist.HASH_ALGORITHMS.items()}
+
+# Raised when a lockfile can't be read or was written by an incompatible version
+class LockError(ValueError):
+	pass
+
+# One mod of a lockfile: just enough of its addon info and selected file to rebuild the Mod and File
+class LockedMod:
+	# Instance variables:
+	#   addonID      - the CurseForge "Addon ID" of the mod
+	#   name         - the name of the mod
+	#   websiteUrl   - the URL of the mod on CurseForge
+	#   authors      - a list of the names of the mod's authors
+	#   dateModified - the addon's dateModified when it was resolved; a different value upstream means it needs re-resolving
+	#   fileID       - the CurseForge "File ID" of the selected file
+	#   fileName     - the name of the selected file
+	#   fileURL      - the download URL of the selected file
+	#   fileLength   - the size of the selected file in bytes, or None
+	#   fileHash     - the (algorithm name, hex digest) tuple of the selected file, or None
+	#   releaseType  - the ReleaseType of the selected file
+	#   mcVersions   - a list of the Minecraft versions the selected file supports
+	#   dependencies - a list of the addonIDs the selected file requires
+	def __init__(self, addonID, name, websiteUrl, authors, dateModified, fileID, fileName, fileURL, fileLength, fileHash, releaseType, mcVersions, dependencies):
+		self.addonID = addonID
+		self.name = name
+		self.websiteUrl = websiteUrl
+		self.authors = list(authors)
+		self.dateModified = dateModified
+		self.fileID = fileID
+		self.fileName = fileName
+		self.fileURL = fileURL
+		self.fileLength = fileLength
+		self.fileHash = tuple(fileHash) if fileHash != None else None
+		self.releaseType = modlist.ReleaseType(releaseType)
+		self.mcVersions = list(mcVersions)
+		self.dependencies = list(dependencies)
+
+	# Creates a LockedMod from a Mod with a selectedFile
+	@classmethod
+	def fromMod(cls, mod):
+		file = mod.selectedFile
+		return cls(mod.addonID, mod.modName, mod.modURL, mod.authors, mod.dateModified, file.fileID, file.fileName, file.fileURL, file.fileLength,
+			file.fileHash, file.releaseType, file.mcVersions, [addonID for addonID, dependencyType in file.dependencyIDs])
+
+	# Creates a LockedMod from an addon info and the JSON of one of its files (e.g. from twitchapi.getFiles()), without fetching anything
+	@classmethod
+	def fromInfo(cls, addonInfo, fileInfo):
+		mod = modlist.Mod(modlist.ModList(), addonSearchResult=addonInfo, fileInfo=[fileInfo])
+		mod.selectedFile = mod.files[0]
+		return cls.fromMod(mod)
+
+	@classmethod
+	def fromJSON(cls, document):
+		fileHash = document.get('hash')
+		return cls(document['addonID'], document['name'], document['websiteUrl'], document['authors'], document.get('dateModified'),
+			document['fileID'], document['fileName'], document['downloadUrl'], document.get('fileLength'),
+			fileHash.split(':', 1) if fileHash else None, document['releaseType'], document['gameVersions'], document['dependencies'])
+
+	def toJSON(self):
+		return {
+			'addonID': self.addonID,
+			'name': self.name,
+			'websiteUrl': self.websiteUrl,
+			'authors': self.authors,
+			'dateModified': self.dateModified,
+			'fileID': self.fileID,
+			'fileName': self.fileName,
+			'downloadUrl': self.fileURL,
+			'fileLength': self.fileLength,
+			'hash': '{}:{}'.format(*self.fileHash) if self.fileHash != None else None,
+			'releaseType': int(self.releaseType),
+			'gameVersions': self.mcVersions,
+			'dependencies': self.dependencies,
+			}
+
+	# Returns a new Mod for modList whose only File is the locked file, already selected
+	def toMod(self, modList):
+		fileInfo = {
+			'id': self.fileID,
+			'fileName': self.fileName,
+			'downloadUrl': self.fileURL,
+			'fileLength': self.fileLength,
+			'hashes': [{'algo': HASH_ALGORITHM_NUMBERS[self.fileHash[0]], 'value': self.fileHash[1]}] if self.fileHash != None else [],
+			'releaseType': int(self.releaseType),
+			'gameVersion': self.mcVersions,
+			'dependencies': [{'addonId': addonID, 'type': int(modlist.DependencyType.REQUIRED)} for addonID in self.dependencies],
+			}
+		addonInfo = {'id': self.addonID, 'name': self.name, 'websiteUrl': self.websiteUrl, 'authors': [{'name': author} for author in self.authors], 'dateModified': self.dateModified}
+		mod = modlist.Mod(modList, addonSearchResult=addonInfo, fileInfo=[fileInfo])
+		mod.selectedFile = mod.files[0]
+		return mod
+
+# The contents of a lockfile
+class PackLock:
+	# Instance variables:
+	#   minecraftVersion - the Minecraft version the pack was resolved for
+	#   requested        - a dict of {addonID: pinned fileID or None} of the mods listed in the pack spec when it was resolved
+	#   mods             - a dict of {addonID: LockedMod} of every mod in the resolved pack, including dependencies, in the ModList's order
+	#                      (so an unchanged rebuild lists the manifest's files in the same order)
+	def __init__(self, minecraftVersion, requested, mods):
+		self.minecraftVersion = minecraftVersion
+		self.requested = dict(requested)
+		self.mods = dict(mods)
+
+	# Creates the PackLock of a resolved ModList, recording every Mod with a selectedFile
+	@classmethod
+	def fromModList(cls, spec, modList):
+		return cls(spec.minecraftVersion, spec.mods, {addonID: LockedMod.fromMod(mod) for addonID, mod in modList.mods.items() if mod.selectedFile != None})
+
+	@classmethod
+	def fromJSON(cls, document):
+		try:
+			if document.get('lockVersion') != LOCK_VERSION:
+				raise LockError('Unsupported lockfile version {!r}'.format(document.get('lockVersion')))
+			mods = [LockedMod.fromJSON(entry) for entry in document['mods']]
+			return cls(document['minecraftVersion'], [(addonID, fileID) for addonID, fileID in document['requested']], {mod.addonID: mod for mod in mods})
+		except (KeyError, TypeError, ValueError, AttributeError) as error:
+			if isinstance(error, LockError):
+				raise
+			raise LockError('Invalid lockfile: {!r}'.format(error)) from error
+
+	def toJSON(self):
+		return {
+			'lockVersion': LOCK_VERSION,
+			'minecraftVersion': self.minecraftVersion,
+			'requested': [[addonID, fileID] for addonID, fileID in self.requested.items()],
+			'mods': [lockedMod.toJSON() for lockedMod in self.mods.values()],
+			}
+
+	# Returns the PackLock saved at path, or None if there is no lockfile there
+	@classmethod
+	def load(cls, path):
+		try:
+			with open(path, encoding='utf-8') as lockFile:
+				document = json.load(lockFile)
+		except FileNotFoundError:
+			return None
+		except ValueError as error:
+			raise LockError('Invalid lockfile {}: {}'.format(path, error)) from error
+		return cls.fromJSON(document)
+
+	# Writes the lockfile to path, replacing any previous one atomically
+	def save(self, path):
+		with open(path + '.tmp', 'w', encoding='utf-8') as lockFile:
+			json.dump(self.toJSON(), lockFile, indent='\t')
+		os.replace(path + '.tmp', path)
+
+	# Returns the set of addonIDs of the spec that must be resolved again: mods newly listed, or whose pinned fileID changed
+	def changedRequests(self, spec):
+		return {addonID for addonID, fileID in spec.mods if addonID not in self.requested or self.requested[addonID] != fileID}
+
+	# Returns the set of addonIDs of locked mods that aren't pinned by the spec, and whose addon was modified upstream since they were locked
+	#   infos is a dict of {addonID: addon info} such as twitchapi.getAddonInfos() returns; mods missing from it count as modified
+	def upstreamChanges(self, spec, infos):
+		pinned = {addonID for addonID, fileID in spec.mods if fileID != None}
+		return {addonID for addonID, lockedMod in self.mods.items()
+			if addonID not in pinned and (addonID not in infos or infos[addonID].get('dateModified') != lockedMod.dateModified)}
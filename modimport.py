@@ -0,0 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import functools
+import threading
+import logging
+import sqlite3
+import mmap
+import sys
+import os
+
+import twitchapi
+import modlist
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Imports the jars of an existing instance's mods/ folder into a ModList, by matching their CurseForge fingerprints
+#   Every jar's fingerprint is computed from a memory-mapped read on a process pool, and all of them are matched with a single
+#   getFingerprintMatches() call; the matched addons are then fetched together (see ModList.fetchMods), so the number of round trips
+#   doesn't grow with the number of jars. Fingerprints are cached by path, size and modification time, so rescanning reads nothing
+#   Usage:
+#     mods, unmatched = modimport.importFolder(modList, 'C:/MultiMC/instances/MyPack/.minecraft/mods')
+
+# Bytes left out of a jar before it's hashed, as CurseForge does
+FINGERPRINT_WHITESPACE = b'\t\n\r '
+
+# The multiplier and seed of CurseForge's fingerprint, a 32-bit MurmurHash2
+MURMUR2_M = 0x5bd1e995
+FINGERPRINT_SEED = 1
+
+# Jars are hashed this many bytes at a time (see mixWords), which bounds the memory a fingerprint takes
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+
+def getFingerprintCachePath():
+	"""Returns the default location of the fingerprint cache database for linux or windows"""
+	if os.name == 'nt':
+		base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+	else:
+		base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+	return os.path.join(base, 'PackCrafter', 'fingerprints.sqlite3')
+
+# Returns the (32-bit lane mask, 8-bit lane mask) big ints for count 64-bit lanes
+@functools.lru_cache(maxsize=4)
+def laneMasks(count):
+	return int.from_bytes(b'\xff\xff\xff\xff\0\0\0\0' * count, 'little'), int.from_bytes(b'\xff\0\0\0\0\0\0\0' * count, 'little')
+
+# Returns MurmurHash2's k = k * m; k ^= k >> 24; k = k * m (mod 2**32) of every little-endian 32-bit word of block, as a memoryview of native 64-bit ints
+#   The words are spread into 64-bit lanes of one big int, so each step is a single big int operation on all of them at once
+#   (a lane's product with m stays below 2**63, so lanes never carry into each other), instead of a few Python operations per word
+def mixWords(block):
+	count = len(block) // 4
+	lanes = bytearray(8 * count)
+	for offset in range(4):
+		lanes[offset::8] = block[offset::4]
+	mask32, mask8 = laneMasks(count)
+	words = int.from_bytes(lanes, 'little') * MURMUR2_M & mask32
+	words = words ^ (words >> 24 & mask8)
+	words = words * MURMUR2_M & mask32
+	return memoryview(words.to_bytes(8 * count, sys.byteorder)).cast('Q')
+
+# Returns the CurseForge fingerprint of data (bytes, an mmap, or anything else sliceable into bytes): the MurmurHash2 of its bytes
+#   with whitespace left out
+#   data is read FINGERPRINT_BLOCK_SIZE bytes at a time, so a memory-mapped jar is never copied whole
+def fingerprint(data):
+	total = len(data)
+
+	# The hash is seeded with the length of the data without whitespace, so that is counted first
+	length = total
+	for start in range(0, total, FINGERPRINT_BLOCK_SIZE):
+		block = data[start:start + FINGERPRINT_BLOCK_SIZE]
+		length = length - sum(block.count(byte) for byte in FINGERPRINT_WHITESPACE)
+
+	# Only h = ((h * m) ^ k) mod 2**32 has to be done word by word; the bytes of a word cut off by the end of a block are carried to the next
+	m = MURMUR2_M
+	h = (FINGERPRINT_SEED ^ length) & 0xFFFFFFFF
+	carried = b''
+	for start in range(0, total, FINGERPRINT_BLOCK_SIZE):
+		block = carried + bytes(data[start:start + FINGERPRINT_BLOCK_SIZE]).translate(None, FINGERPRINT_WHITESPACE)
+		whole = len(block) - len(block) % 4
+		if whole:
+			for k in mixWords(block[:whole]):
+				h = (h * m ^ k) & 0xFFFFFFFF
+		carried = block[whole:]
+	if carried:
+		for index, byte in enumerate(carried):
+			h ^= byte << (8 * index)
+		h = h * m & 0xFFFFFFFF
+	h ^= h >> 13
+	h = h * m & 0xFFFFFFFF
+	return h ^ h >> 15
+
+# Returns the CurseForge fingerprint of the file at path, read through a memory map
+#   Run in the process pool by scanFolder(), so it has to stay a plain module-level function
+def fingerprintFile(path):
+	with open(path, 'rb') as jarFile:
+		if os.fstat(jarFile.fileno()).st_size == 0: # Empty files can't be mapped
+			return fingerprint(b'')
+		with mmap.mmap(jarFile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+			return fingerprint(mapped)
+
+# SQLite cache of jar fingerprints, keyed by path and only valid while the jar's size and modification time are unchanged
+#   Safe to share between threads; every database access is serialized through a lock
+class FingerprintCache:
+	# Instance variables:
+	#   path - the path of the SQLite database file
+	def __init__(self, path=None):
+		self.path = path if path != None else getFingerprintCachePath()
+		self.lock = threading.Lock()
+
+		if self.path != ':memory:':
+			os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		self.connection = sqlite3.connect(self.path, check_same_thread=False)
+		self.connection.execute('''CREATE TABLE IF NOT EXISTS fingerprints (
+			path        TEXT PRIMARY KEY,
+			size        INTEGER NOT NULL,
+			mtime       INTEGER NOT NULL,
+			fingerprint INTEGER NOT NULL)''')
+		self.connection.commit()
+
+	# Returns the fingerprint stored for path if it was computed for the same size and mtime (in nanoseconds), otherwise None
+	def get(self, path, size, mtime):
+		with self.lock:
+			row = self.connection.execute('SELECT fingerprint FROM fingerprints WHERE path = ? AND size = ? AND mtime = ?', (path, size, mtime)).fetchone()
+		return row[0] if row != None else None
+
+	# Stores a list of (path, size, mtime, fingerprint) tuples
+	def putMany(self, rows):
+		with self.lock:
+			self.connection.executemany('INSERT OR REPLACE INTO fingerprints (path, size, mtime, fingerprint) VALUES (?, ?, ?, ?)', rows)
+			self.connection.commit()
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
+
+# Returns a sorted list of the paths of the jars directly inside folder
+def findJars(folder):
+	return sorted(entry.path for entry in os.scandir(folder) if entry.is_file() and entry.name.lower().endswith('.jar'))
+
+# Returns a dict of {path: fingerprint} of every jar in folder
+#   Jars the cache has a fingerprint for (if one is given) aren't read; the rest are fingerprinted on a pool of up to maxWorkers processes
+#   (one per CPU by default), largest first so the pool isn't left waiting on one big jar at the end
+@tracing.traced('import')
+def scanFolder(folder, cache=None, maxWorkers=None):
+	fingerprints = {}
+	stats = {}
+	for path in findJars(folder):
+		stat = os.stat(path)
+		stats[path] = (stat.st_size, stat.st_mtime_ns)
+		cached = cache.get(os.path.abspath(path), *stats[path]) if cache != None else None
+		if cached != None:
+			fingerprints[path] = cached
+	missing = sorted((path for path in stats if path not in fingerprints), key=lambda path: -stats[path][0])
+	tracing.count('fingerprint.cached', len(fingerprints))
+	tracing.count('fingerprint.computed', len(missing))
+
+	maxWorkers = min(maxWorkers or os.cpu_count() or 1, len(missing))
+	if maxWorkers <= 1: # Not worth starting processes for
+		computed = [fingerprintFile(path) for path in missing]
+	else:
+		with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=multiprocessing.get_context('spawn')) as executor: # Forking a threaded (Tk) process can deadlock
+			computed = list(executor.map(fingerprintFile, missing))
+	fingerprints.update(zip(missing, computed))
+	if cache != None and missing:
+		cache.putMany([(os.path.abspath(path),) + stats[path] + (value,) for path, value in zip(missing, computed)])
+	return {path: fingerprints[path] for path in stats}
+
+# Adds a Mod to the ModList for every jar in folder that matches a CurseForge file, with that File as its selectedFile,
+#   then resolves any required dependencies the matched files have that the folder didn't
+#   Jars of a mod that's already in the ModList are skipped; returns (list of the Mods added, list of the paths of jars that matched nothing)
+#   cache is a FingerprintCache, or None to fingerprint every jar
+@tracing.traced('import')
+def importFolder(modList, folder, cache=None, maxWorkers=None):
+	fingerprints = scanFolder(folder, cache, maxWorkers)
+	matches = twitchapi.getFingerprintMatches(fingerprints.values())
+	futures = modList.fetchMods(list(dict.fromkeys(addonID for addonID, fileInfo in matches.values())))
+
+	mods = []
+	unmatched = []
+	for path, value in fingerprints.items():
+		if value not in matches:
+			logger.info('No CurseForge file matches %s', path)
+			unmatched.append(path)
+			continue
+		addonID, fileInfo = matches[value]
+		if addonID in modList.mods:
+			logger.info('Skipping %s, as %s is already in the modlist', path, modList.mods[addonID].modName)
+			continue
+		addonInfo, addonFiles = futures[addonID].result()
+		mod = modlist.Mod(modList, addonSearchResult=addonInfo, fileInfo=addonFiles)
+		mod.selectedFile = next((file for file in mod.files if file.fileID == fileInfo['id']), None)
+		if mod.selectedFile == None: # Files hidden from the addon's file list can still be matched
+			mod.selectedFile = modlist.File(mod, twitchapi.projectFile(fileInfo))
+			mod.files.append(mod.selectedFile)
+			mod.indexFiles()
+		logger.debug('Matched %s to %s (%s)', path, mod.modName, mod.selectedFile.fileName)
+		modList.addMod(mod, resolveDependencies=False)
+		mods.append(mod)
+	modList.resolveDependencies([mod.selectedFile for mod in mods])
+	return mods, unmatched
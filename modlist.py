@@ -1,7 +1,17 @@
 from enum import IntEnum
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+import threading
+import logging
+import heapq
+import time
+import sys
+import re
 import os
 
 import twitchapi
+import tracing
+
+logger = logging.getLogger(__name__)
 
 def getDownloadPath():
     """Returns the default downloads path for linux or windows"""
@@ -15,37 +25,263 @@ def getDownloadPath():
     else:
         return os.path.join(os.path.expanduser('~'), 'downloads')
 
+# Returns a key for sorting version-like strings (such as file names) newest-last, comparing runs of digits numerically and ignoring punctuation
+#   e.g. "mod-1.10.2.jar" sorts after "mod-1.9.4.jar". Meant to be computed once per string, not on every sort
+#   The key is a flat tuple of (kind, value) pairs, with kind 1 for numbers and 0 for words, so values are only ever compared with values of the same type
+def versionKey(versionString):
+	key = []
+	for token in re.findall(r'\d+|[^\W\d_]+', versionString):
+		if token.isdigit():
+			key.append(1)
+			key.append(int(token))
+		else:
+			key.append(0)
+			key.append(sys.intern(token.lower()))
+	return tuple(key)
+
 # Class containing several Mod objects to simplify dependency resolution
 #   Creating an entirely new Mod object for each File's dependency is too expensive, tracking already-found mods is much nicer
+#   Only the dependencies of files that could end up in the pack are resolved: those for the selected Minecraft version, and each Mod's selectedFile
 class ModList:
 	# Instance variables:
-	#   mods - a dict of addonIDs and their associated Mod objects
-	def __init__(self):
+	#   mods                 - a dict of addonIDs and their associated Mod objects
+	#   minecraftVersion     - the Minecraft version the pack targets; None until one is chosen, in which case no dependencies are expanded
+	#   expandedDependencies - a dict of {fileID: list of (Mod, DependencyType) tuples} memoizing every File whose dependencies have been expanded
+	#   modsByVersion        - a dict of {Minecraft version: set of addonIDs} listing which Mods have files for each version; kept up to date by addMod/removeMod
+	#   maxWorkers           - the number of threads used to fetch mods while resolving dependencies
+	#   executor             - the ThreadPoolExecutor used for fetching; created on first use unless one is given to share with other ModLists
+	#   inFlight             - a dict of {addonID: Future} for fetches that haven't finished yet, so duplicate requests share one fetch
+	#   fetched              - an optional dict of {addonID: (addonInfo, addonFiles)} of finished fetches, which may be shared between ModLists
+	#                          (e.g. when building many packs in one process) so each addon is only fetched once; None to not keep them
+	#   solver               - the solver.FileSolver of the last solve(), kept so solving again for the same version and policy reuses its work
+	#   internedVersions     - a dict of the shared copies of the Minecraft version tuples of this ModList's Files (see internVersions)
+	#   internedDependencies - a dict of the shared copies of the dependency tuples of this ModList's Files (see internDependencies)
+	def __init__(self, maxWorkers=8, executor=None, fetched=None):
 		self.mods = {}
+		self.minecraftVersion = None
+		self.expandedDependencies = {}
+		self.modsByVersion = {}
+		self.maxWorkers = maxWorkers
+		self.executor = executor
+		self.inFlight = {}
+		self.fetched = fetched
+		self.solver = None
+		self.internedVersions = {}
+		self.internedDependencies = {}
+		self.lock = threading.Lock()
+
+	# Shared, de-duplicated copies of values that repeat across thousands of File objects
+	#   Identical Minecraft version tuples and dependency tuples are stored once and referenced by every File of the ModList using them;
+	#   the tables go away with the ModList
 
-	def addMod(self, mod):
+	# Returns the shared copy of a tuple of Minecraft version strings; the interned copy is only built the first time a tuple is seen
+	def internVersions(self, mcVersions):
+		shared = self.internedVersions.get(mcVersions)
+		if shared == None:
+			shared = self.internedVersions[mcVersions] = tuple(sys.intern(mcVersion) for mcVersion in mcVersions)
+		return shared
+
+	# Returns the shared copy of a tuple of (addonID, DependencyType) tuples
+	def internDependencies(self, dependencyIDs):
+		if not dependencyIDs:
+			return ()
+		return self.internedDependencies.setdefault(dependencyIDs, dependencyIDs)
+
+	# Adds a Mod to the ModList, then resolves any required dependencies it's missing for the selected Minecraft version
+	def addMod(self, mod, resolveDependencies=True):
 		if mod.addonID in self.mods:
-			print("{} is already in the modlist!".format(mod.modName))
+			logger.info('%s is already in the modlist', mod.modName)
 			return
-		print("Adding new mod:")
-		print(mod)
+		logger.debug('Adding mod %s (%s, %d files)', mod.addonID, mod.modName, len(mod.files))
 		self.mods[mod.addonID] = mod
+		for mcVersion in mod.filesByVersion:
+			self.modsByVersion.setdefault(mcVersion, set()).add(mod.addonID)
+		if resolveDependencies:
+			self.resolveDependencies(self.filesInScope(mod))
+
+	# Removes the Mod with the given addonID from the ModList, and forgets any expansions that referenced it
+	#   Returns the removed Mod
+	def removeMod(self, addonID):
+		removedMod = self.mods.pop(addonID)
+		for mcVersion in removedMod.filesByVersion:
+			self.modsByVersion[mcVersion].discard(addonID)
+			if not self.modsByVersion[mcVersion]:
+				del self.modsByVersion[mcVersion]
+		self.expandedDependencies = {fileID: dependencies for fileID, dependencies in self.expandedDependencies.items()
+			if all(dependency[0] is not removedMod for dependency in dependencies)}
+		for file in removedMod.files:
+			self.expandedDependencies.pop(file.fileID, None)
+		return removedMod
+
+	# Changes the Minecraft version the pack targets, and expands the dependencies of every Mod's files for that version
+	def setMinecraftVersion(self, minecraftVersion):
+		self.minecraftVersion = minecraftVersion
+		files = []
+		for mod in list(self.mods.values()):
+			files.extend(self.filesInScope(mod))
+		self.resolveDependencies(files)
+
+	# Sets the Mod's selectedFile to File (or None), and expands that File's dependencies
+	def selectFile(self, mod, file):
+		mod.selectedFile = file
+		if file != None:
+			self.expandDependencies(file)
+
+	# Selects the best file allowed by policy (a solver.ReleasePolicy, release only by default) for the Minecraft version of every Mod in roots
+	#   (every Mod by default) and of every Mod they require, so that every required dependency of a selected file has a selected file too
+	#   pinned is a dict of {addonID: File} of files to keep; every other Mod's selectedFile is replaced, and cleared if it isn't needed
+	#   Returns the solver.SolveResult, whose conflicts say which needed Mods couldn't be given a file and why
+	def solve(self, policy=None, roots=None, pinned=None, minecraftVersion=None):
+		import solver
+		minecraftVersion = minecraftVersion if minecraftVersion != None else self.minecraftVersion
+		policy = policy if policy != None else solver.RELEASE_ONLY
+		if self.solver == None or self.solver.minecraftVersion != minecraftVersion or self.solver.policy is not policy:
+			self.solver = solver.FileSolver(self, minecraftVersion, policy)
+		with tracing.span('solve', 'resolve', mods=len(self.mods), policy=policy.name) as span:
+			result = self.solver.solve(roots, pinned)
+			span.set(selected=len(result.selected), conflicts=len(result.conflicts))
+		for addonID, mod in self.mods.items():
+			mod.selectedFile = result.selected.get(addonID)
+		return result
+
+	# Returns the Mod's files whose dependencies should be expanded: those for the selected Minecraft version, and its selectedFile
+	def filesInScope(self, mod):
+		files = list(mod.getFiles(self.minecraftVersion))
+		if mod.selectedFile != None and mod.selectedFile not in files:
+			files.append(mod.selectedFile)
+		return files
+
+	# Returns the File's list of (Mod, DependencyType) tuples, resolving any missing dependency mods first
+	#   The result is memoized, so each File is only ever expanded once
+	def expandDependencies(self, file):
+		if file.fileID not in self.expandedDependencies:
+			self.resolveDependencies([file])
+		return self.expandedDependencies[file.fileID]
+
+	# Returns a Future whose result is the (addonInfo, addonFiles) pair for addonID (see fetchMods)
+	def fetchMod(self, addonID):
+		return self.fetchMods([addonID])[addonID]
+
+	# Returns a dict of {addonID: Future} whose results are the (addonInfo, addonFiles) pair of each addonID
+	#   The info of every addon that isn't already fetched is requested with one batched getAddonInfos() call, and each addon's files
+	#   with its own streamAddonFiles() call, all on the worker pool; asking for an addonID that is already being fetched returns the existing Future
+	#   The files are parsed as they download and only the fields File uses are kept, so the full response is never held in memory
+	def fetchMods(self, addonIDs):
+		futures = {}
+		newIDs = []
+		filesFutures = []
+		with self.lock:
+			for addonID in addonIDs:
+				if addonID in futures:
+					continue
+				if self.fetched != None and addonID in self.fetched:
+					futures[addonID] = Future()
+					futures[addonID].set_result(self.fetched[addonID])
+				elif addonID in self.inFlight:
+					futures[addonID] = self.inFlight[addonID]
+				else:
+					futures[addonID] = self.inFlight[addonID] = Future()
+					newIDs.append(addonID)
+			if newIDs:
+				if self.executor == None:
+					self.executor = ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix='ModList')
+				infosFuture = self.executor.submit(twitchapi.getAddonInfos, newIDs)
+				filesFutures = [self.executor.submit(list, twitchapi.streamAddonFiles(addonID)) for addonID in newIDs]
+
+		for addonID, filesFuture in zip(newIDs, filesFutures):
+			self.combine(addonID, futures[addonID], infosFuture, filesFuture)
+		return futures
+
+	# Completes future with (the addon's entry in the result of infosFuture, the result of filesFuture) once both have arrived
+	#   Only the first callback to see both halves done gets past the lock, as it removes the in-flight entry
+	def combine(self, addonID, future, infosFuture, filesFuture):
+		def onDone(_):
+			with self.lock:
+				if not (infosFuture.done() and filesFuture.done()) or self.inFlight.get(addonID) is not future:
+					return
+				del self.inFlight[addonID]
+			try:
+				infos = infosFuture.result()
+				if addonID not in infos:
+					raise twitchapi.TwitchAPIError('Addon {} does not exist'.format(addonID))
+				result = (infos[addonID], filesFuture.result())
+			except Exception as error:
+				future.set_exception(error)
+			else:
+				if self.fetched != None:
+					self.fetched[addonID] = result
+				future.set_result(result)
+		infosFuture.add_done_callback(onDone)
+		filesFuture.add_done_callback(onDone)
+
+	# Walks the dependency graph of the given Files breadth-first, adding every missing required dependency to the ModList
+	#   Every mod in a frontier is fetched concurrently, so the time taken grows with the depth of the graph, not its size
+	#   Only in-scope files of newly found mods are followed (see filesInScope), and each expanded File is memoized in expandedDependencies
+	#   Traced as a "resolveDependencies" span, with the Mods it creates nested inside at their depth below the given Files
+	def resolveDependencies(self, files):
+		expanded = [file for file in files if file.fileID not in self.expandedDependencies]
+		frontier = self.missingDependencies(expanded)
+		if not frontier: # Nothing to fetch; not worth a span, as expandDependencies() ends up here for every File it's asked about
+			self.storeExpanded(expanded)
+			return
+		with tracing.span('resolveDependencies', 'resolve', files=len(files)) as span:
+			depth = 0
+			added = 0
+			while frontier:
+				depth = depth + 1
+				futures = self.fetchMods(frontier)
+				newFiles = []
+				for addonID, future in futures.items():
+					if addonID in self.mods: # Another resolution finished this one first
+						continue
+					addonInfo, addonFiles = future.result()
+					newMod = Mod(self, addonSearchResult=addonInfo, fileInfo=addonFiles, depth=depth)
+					logger.debug('Found new mod dependency %s at depth %d', newMod.modName, depth)
+					self.addMod(newMod, resolveDependencies=False)
+					added = added + 1
+					newFiles.extend(file for file in self.filesInScope(newMod) if file.fileID not in self.expandedDependencies)
+				expanded.extend(newFiles)
+				frontier = self.missingDependencies(newFiles)
+			span.set(depth=depth, mods=added)
+		self.storeExpanded(expanded)
+
+	# Memoizes the (Mod, DependencyType) list of every given File in expandedDependencies, once all their dependencies are in the ModList
+	def storeExpanded(self, files):
+		for file in files:
+			self.expandedDependencies[file.fileID] = [(self.mods[addonID], dependencyType) for addonID, dependencyType in file.dependencyIDs if addonID in self.mods]
+
+	# Returns the set of required dependency addonIDs of the given Files that aren't in the ModList yet
+	def missingDependencies(self, files):
+		missing = set()
+		for file in files:
+			for addonID, dependencyType in file.dependencyIDs:
+				if addonID not in self.mods:
+					missing.add(addonID)
+		return missing
 
 # Class containing all the relevant information about a Mod
 #   Inherits instance variable "modList" from the parent ModList
+#   Uses __slots__ to keep large packs small in memory
 class Mod():
+	__slots__ = ('modList', 'addonID', 'modName', 'modURL', 'authors', 'dateModified', 'files', 'filesByVersion', 'filesByReleaseType', 'selectedFile')
+
 	# Instance variables:
 	#   modList - a reference to the ModList this Mod object is referenced in
 	#   addonID - the CurseForge "Addon ID" for this mod
 	#   modName - the name of the mod
 	#   modURL  - a string containing the URL for this mod on CurseForge (useful for checking license)
 	#   authors - a list of strings containing all the authors for this mod
+	#   dateModified - the API's timestamp of the addon's last update, or None; used by lockfiles to notice upstream changes
 	#   files   - a list of File objects of all the files available for this mod on CurseForge
+	#   filesByVersion     - a dict of {Minecraft version: list of File objects}, each list sorted newest-first (by File.sortKey)
+	#   filesByReleaseType - a dict of {Minecraft version: {ReleaseType: list of File objects}}, each list sorted newest-first
 
 	# Constructor
 	# Creates a new Mod object based on a chosen search result from the twitchAddonSearch() function
-	#   Will populate instance variable "files" with File objects through a getAddonFiles() call
-	def __init__(self, modList, addonSearchResult = None, addonID = None):
+	#   Will populate instance variable "files" with File objects through a streamAddonFiles() call, unless a list of the files is given as fileInfo
+	#   Dependencies aren't fetched here; ModList.addMod() resolves those of in-scope files once the Mod is added
+	#   depth is how many dependency links away from a Mod the user picked this one was found, shown in traces (0 for picked Mods)
+	def __init__(self, modList, addonSearchResult = None, addonID = None, fileInfo = None, depth = 0):
 		self.modList = modList
 
 		# If only given addonID, get addon information using getAddonInfo() call
@@ -57,15 +293,44 @@ class Mod():
 		self.modName = addonSearchResult['name']
 		self.modURL  = addonSearchResult['websiteUrl']
 		self.authors = [entry['name'] for entry in addonSearchResult['authors']]
+		self.dateModified = addonSearchResult.get('dateModified')
 
 		# Initialize list of File objects
-		self.files = []
-		fileInfo = twitchapi.getAddonFiles(self.addonID)
-		for fileListItem in fileInfo:
-			self.files.append(File(self, fileListItem))
+		if fileInfo == None: # Files are created as the response streams in
+			fileInfo = twitchapi.streamAddonFiles(self.addonID)
+		with tracing.span('Mod', 'resolve', addonID=self.addonID, mod=self.modName, depth=depth) as span:
+			if tracing.tracer == None:
+				self.files = [File(self, fileListItem) for fileListItem in fileInfo]
+			else: # Popular mods have thousands of Files, so they only get a span each while tracing
+				self.files = []
+				for fileListItem in fileInfo:
+					with tracing.span('File', 'resolve', fileID=fileListItem['id'], depth=depth):
+						self.files.append(File(self, fileListItem))
+			self.indexFiles()
+			span.set(files=len(self.files))
 
 		self.selectedFile = None
 
+	# Builds the filesByVersion and filesByReleaseType indexes from the files list
+	#   Each File's versionKey() is parsed once here, then reduced to its small-int rank among this Mod's files (File.sortKey)
+	def indexFiles(self):
+		self.filesByVersion = {}
+		self.filesByReleaseType = {}
+		newestFirst = sorted(self.files, key=lambda x: versionKey(x.fileName), reverse=True)
+		for rank, file in enumerate(reversed(newestFirst)):
+			file.sortKey = rank
+		for file in newestFirst:
+			for mcVersion in file.mcVersions:
+				self.filesByVersion.setdefault(mcVersion, []).append(file)
+				self.filesByReleaseType.setdefault(mcVersion, {}).setdefault(file.releaseType, []).append(file)
+
+	# Returns the Files available for the given Minecraft version sorted newest-first, optionally only those of the given ReleaseTypes
+	def getFiles(self, mcVersion, releaseTypes=None):
+		if releaseTypes == None:
+			return self.filesByVersion.get(mcVersion, ())
+		buckets = self.filesByReleaseType.get(mcVersion, {})
+		return list(heapq.merge(*[buckets.get(releaseType, ()) for releaseType in releaseTypes], key=lambda x: x.sortKey, reverse=True))
+
 	def __str__(self):
 		result = ''
 		result = result + 'Mod ID {}:\n'.format(self.addonID)
@@ -88,43 +353,51 @@ class ReleaseType(IntEnum):
 
 # Class containing all the relevant information about a File for a mod
 #   Inherits instance variable "mod" from the parent Mod
+#   Popular mods have thousands of files, so File uses __slots__ and shares its version/dependency tuples with other Files (see ModList.internVersions)
 class File():
+	__slots__ = ('mod', 'mcVersions', 'fileID', 'fileName', 'sortKey', 'fileURL', 'fileLength', 'fileHash', 'releaseType', 'dependencyIDs')
+
 	# Instance variables:
 	#   mod          - a reference to the Mod object this File object is a referenced in
-	#   mcVersions   - a list of strings containing the versions of Minecraft this file is compatible with
+	#   mcVersions   - a tuple of strings containing the versions of Minecraft this file is compatible with
 	#   fileID       - the CurseForge "File ID" for this file
 	#   fileName     - the name of the file on CurseForge (includes extension)
 	#   fileURL      - a string containing the download URL for this file on CurseForge
+	#   fileLength   - the size of the file in bytes, or None if the API didn't say
+	#   fileHash     - an (algorithm name, hex digest) tuple usable with hashlib, e.g. ('sha1', '...'), or None if the API didn't give one
 	#   releaseType  - a ReleaseType enum value stating whether this file is Alpha, Beta, or Release
+	#   sortKey      - this file's rank among its Mod's files by versionKey(fileName), oldest first; computed once so Files can be sorted cheaply
+	#   dependencyIDs - a tuple of tuples of the addonIDs this file (optionally) depends on to function and a Dependency enum value
 	#   dependencies - a list of tuples of Mod objects this file (optionally) depends on to function and a Dependency enum value stating whether it's a required/optional dependency
+	#                  Computed on first use by the ModList (see ModList.expandDependencies)
 
 	# Constructor
 	# Creates a new File object based on a chosen file from a getAddonFiles() call
 	def __init__(self, mod, fileListItem):
 		self.mod       = mod
-		self.mcVersions = [];
-		print('\n\nMod File Supported Versions:');
-		for gameVersion in fileListItem['gameVersion']:
-			if gameVersion != 'Forge':
-				self.mcVersions.append(gameVersion);
-				print('{}'.format(gameVersion));
+		self.mcVersions = mod.modList.internVersions(tuple(gameVersion for gameVersion in fileListItem['gameVersion'] if gameVersion != 'Forge'))
 		self.fileID      = fileListItem['id']
 		self.fileName    = fileListItem['fileName']
+		self.sortKey     = 0 # Set by Mod.indexFiles()
 		self.fileURL     = fileListItem['downloadUrl']
+		self.fileLength  = fileListItem.get('fileLength')
+		self.fileHash    = parseFileHash(fileListItem.get('hashes'))
 		self.releaseType = ReleaseType(fileListItem['releaseType'])
 
-		# Parse dependencies and create a (Mod, Dependency(Enum)) tuple for each and add it to the dependencies list
-		self.dependencies = []
-		for dependency in fileListItem['dependencies']:
-			if dependency['type'] == DependencyType.REQUIRED: # Only look for required dependencies
-				if dependency['addonId'] in self.mod.modList.mods:
-					#print("Found existing mod dependency for {}: {}".format(self.mod.modName, self.mod.modList.mods[dependency['addonId']].modName))
-					self.dependencies.append((self.mod.modList.mods[dependency['addonId']], DependencyType(dependency['type'])))
-				else:
-					newMod = Mod(mod.modList, addonID=dependency['addonId'])
-					print("Found new mod dependency {}: adding to ModList".format(newMod.modName))
-					self.mod.modList.addMod(newMod)
-					self.dependencies.append((self.mod.modList.mods[dependency['addonId']], DependencyType(dependency['type'])))
+		# Parse required dependencies into (addonID, Dependency(Enum)) tuples
+		#   The matching Mod objects are only looked up (and fetched if needed) when the dependencies property is first used
+		self.dependencyIDs = mod.modList.internDependencies(tuple((dependency['addonId'], DependencyType(dependency['type'])) for dependency in fileListItem['dependencies'] if dependency['type'] == DependencyType.REQUIRED)) # Only look for required dependencies
+
+	# A list of (Mod, Dependency(Enum)) tuples, expanded lazily and memoized by the ModList
+	@property
+	def dependencies(self):
+		return self.mod.modList.expandDependencies(self)
+
+	# True if CurseForge tags this file as for the client only: its game versions include "Client" but not "Server"
+	#   Files with neither tag (most files uploaded before the tags existed) are assumed to work on a server too
+	@property
+	def clientOnly(self):
+		return 'Client' in self.mcVersions and 'Server' not in self.mcVersions
 
 	def __str__(self):
 		result = ''
@@ -135,10 +408,172 @@ class File():
 			result = result + '{}{}\n'.format(dependency[0], dependency[1].name)
 		return result
 
-	# Downloads this file from the fileURL
-	def download(self):
-		req = requests.get(self.fileURL, HEADERS, stream=True)
-		with open(getDownloadPath()+'\\modpack\\'+self.fileName, 'wb') as fd:
-			for chunk in req.iter_content(chunk_size=128):
-				fd.write(chunk)
+	# Downloads this file from the fileURL into directory (by default a "modpack" folder in the user's Downloads), returning the path written
+	def download(self, directory=None):
+		return DownloadManager(directory).downloadFile(self)
+
+# Hash algorithm numbers used in the "hashes" list of a file, and their hashlib names
+HASH_ALGORITHMS = {1: 'sha1', 2: 'md5'}
+
+# Returns the strongest (algorithm name, hex digest) tuple from a file's "hashes" list, or None
+def parseFileHash(hashes):
+	best = None
+	for entry in hashes or ():
+		algorithm = HASH_ALGORITHMS.get(entry.get('algo', entry.get('algorithm')))
+		if algorithm == 'sha1':
+			return (algorithm, entry['value'].lower())
+		if algorithm != None:
+			best = (algorithm, entry['value'].lower())
+	return best
+
+# Raised when a File can't be downloaded, or what was downloaded doesn't match the file's metadata
+class DownloadError(Exception):
+	def __init__(self, message, file=None):
+		super().__init__(message)
+		self.file = file
+
+# Downloads the selected Files of a ModList in parallel
+#   Each file is streamed into a ".part" file with large buffered writes, checked against its length and hash, then atomically renamed into place
+#   Partial downloads left by a failed or cancelled run are resumed with an HTTP Range request
+class DownloadManager:
+	# Instance variables:
+	#   directory        - the folder files are downloaded into
+	#   maxWorkers       - the maximum number of files downloaded at the same time
+	#   chunkSize        - the number of bytes read from the network and written to disk at a time
+	#   progressCallback - called with this DownloadManager after every chunk; may be called from worker threads
+	#   filesTotal       - the number of files in the current download
+	#   filesDone        - the number of those files finished (downloaded, or already present and valid)
+	#   bytesTotal       - the sum of the lengths of every file in the current download, where known
+	#   bytesDone        - the number of bytes of those files that are on disk
+	#   bytesDownloaded  - the number of bytes actually transferred over the network
+	#   startTime        - the time.perf_counter() at which the current download started
+	def __init__(self, directory=None, maxWorkers=8, chunkSize=1024 * 1024, progressCallback=None):
+		self.directory = directory if directory != None else os.path.join(getDownloadPath(), 'modpack')
+		self.maxWorkers = maxWorkers
+		self.chunkSize = chunkSize
+		self.progressCallback = progressCallback
+		self.lock = threading.Lock()
+		self.reset([])
+
+	def reset(self, files):
+		self.filesTotal = len(files)
+		self.filesDone = 0
+		self.bytesTotal = sum(file.fileLength or 0 for file in files)
+		self.bytesDone = 0
+		self.bytesDownloaded = 0
+		self.startTime = time.perf_counter()
+
+	# Returns the average download speed of the current download in bytes per second
+	def throughput(self):
+		elapsed = time.perf_counter() - self.startTime
+		return self.bytesDownloaded / elapsed if elapsed > 0 else 0.0
+
+	def __str__(self):
+		return '{}/{} files, {:.1f}/{:.1f} MB, {:.2f} MB/s'.format(self.filesDone, self.filesTotal, self.bytesDone / 1e6, self.bytesTotal / 1e6, self.throughput() / 1e6)
+
+	def reportProgress(self, bytesDone=0, bytesDownloaded=0, filesDone=0):
+		with self.lock:
+			self.bytesDone = self.bytesDone + bytesDone
+			self.bytesDownloaded = self.bytesDownloaded + bytesDownloaded
+			self.filesDone = self.filesDone + filesDone
+		if self.progressCallback != None:
+			self.progressCallback(self)
+
+	# Downloads the selectedFile of every Mod in the ModList that has one
+	#   Returns a dict of {addonID: path}; raises a DownloadError listing every file that failed, after the others have finished
+	def downloadModList(self, modList):
+		return self.downloadFiles([mod.selectedFile for mod in modList.mods.values() if mod.selectedFile != None])
+
+	# Downloads the given Files concurrently, returning a dict of {addonID: path}
+	def downloadFiles(self, files):
+		os.makedirs(self.directory, exist_ok=True)
+		self.reset(files)
+		paths = {}
+		errors = []
+		with ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix='Download') as executor:
+			futures = {executor.submit(self.downloadFile, file, False): file for file in files}
+			for future in as_completed(futures):
+				try:
+					paths[futures[future].mod.addonID] = future.result()
+				except (DownloadError, twitchapi.TwitchAPIError) as error:
+					errors.append(error)
+		if errors:
+			raise DownloadError('{} of {} downloads failed:\n{}'.format(len(errors), len(files), '\n'.join(str(error) for error in errors)))
+		return paths
+
+	# Downloads a single File, returning the path it was written to
+	#   A file already in the directory with the right length and hash isn't downloaded again
+	def downloadFile(self, file, single=True):
+		import requests # Only needed once downloading starts; see twitchapi
+		if single:
+			os.makedirs(self.directory, exist_ok=True)
+			self.reset([file])
+		path = os.path.join(self.directory, file.fileName)
+		if os.path.exists(path) and self.isValid(file, path):
+			self.reportProgress(bytesDone=os.path.getsize(path), filesDone=1)
+			return path
+
+		partPath = path + '.part'
+		if os.path.exists(partPath): # Count a partial download left by an earlier run as done
+			self.reportProgress(bytesDone=os.path.getsize(partPath))
+		for attempt in range(twitchapi.transport.maxRetries + 1):
+			try:
+				verified = self.transfer(file, partPath)
+				break
+			except (OSError, requests.RequestException) as error: # Connection dropped mid-stream: resume from what's on disk
+				if attempt == twitchapi.transport.maxRetries:
+					raise DownloadError('Downloading {} failed: {}'.format(file.fileName, error), file) from error
+				time.sleep(twitchapi.transport.backoffDelay(attempt))
+
+		if not verified and not self.isValid(file, partPath):
+			os.remove(partPath)
+			raise DownloadError('Downloaded {} does not match its expected length/hash'.format(file.fileName), file)
+		os.replace(partPath, path)
+		self.reportProgress(filesDone=1)
+		return path
+
+	# Streams file.fileURL into partPath, continuing from the end of partPath if it already exists
+	#   A partial file that's already complete and valid is kept as it is; one the server can't continue from (HTTP 416, e.g. because
+	#   it's complete but the File's length is unknown) is deleted and downloaded again from the start
+	#   Returns True if partPath was found complete and checked with isValid(), so nothing was transferred
+	def transfer(self, file, partPath):
+		offset = os.path.getsize(partPath) if os.path.exists(partPath) else 0
+		if file.fileLength != None and offset >= file.fileLength:
+			if offset == file.fileLength and self.isValid(file, partPath): # e.g. the connection dropped after the last byte
+				return True
+			self.reportProgress(bytesDone=-offset) # Oversized or complete-but-invalid partial file; start over
+			offset = 0
+		headers = dict(twitchapi.HEADERS)
+		if offset:
+			headers['Range'] = 'bytes={}-'.format(offset)
+		response = twitchapi.transport.request('GET', file.fileURL, headers=headers, okStatusCodes=(200, 206, 416) if offset else (200,), stream=True)
+		if response.status_code == 416:
+			response.close()
+			if file.fileHash != None and self.isValid(file, partPath):
+				return True
+			self.reportProgress(bytesDone=-offset)
+			os.remove(partPath)
+			return self.transfer(file, partPath)
+		with response:
+			if response.status_code == 200 and offset: # Server ignored the Range request
+				self.reportProgress(bytesDone=-offset)
+				offset = 0
+			with open(partPath, 'ab' if offset else 'wb', buffering=self.chunkSize) as partFile:
+				for chunk in response.iter_content(chunk_size=self.chunkSize):
+					partFile.write(chunk)
+					self.reportProgress(bytesDone=len(chunk), bytesDownloaded=len(chunk))
 
+	# Returns True if the file at path has the File's expected length and hash (whichever of them are known)
+	def isValid(self, file, path):
+		if file.fileLength != None and os.path.getsize(path) != file.fileLength:
+			return False
+		if file.fileHash != None:
+			import hashlib
+			algorithm, expected = file.fileHash
+			digest = hashlib.new(algorithm)
+			with open(path, 'rb') as fileToHash:
+				for block in iter(lambda: fileToHash.read(self.chunkSize), b''):
+					digest.update(block)
+			if digest.hexdigest() != expected:
+				return False
+		return True
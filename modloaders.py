@@ -0,0 +1,96 @@
+import threading
+import time
+
+import twitchapi
+import modlist
+
+# Catalog of the Forge versions available for each Minecraft version, built once from the getModloaderList() response
+#   The response lists every Forge build for every Minecraft version ever released; it's grouped and sorted once here,
+#   so finding the Forge versions of a Minecraft version (e.g. whenever the user picks another one) is a dict lookup
+
+# One Forge version from the modloader list
+class Modloader:
+	__slots__ = ('name', 'gameVersion', 'sortKey', 'latest', 'recommended')
+
+	# Instance variables:
+	#   name        - the name of the Forge version, as used in manifests (e.g. "forge-14.23.5.2854")
+	#   gameVersion - the Minecraft version it's for
+	#   sortKey     - modlist.versionKey() of the name, parsed once so versions sort newest-first without packaging.version
+	#   latest      - whether it's the latest Forge version for its Minecraft version
+	#   recommended - whether it's the recommended Forge version for its Minecraft version
+	def __init__(self, entry):
+		self.name = entry['name']
+		self.gameVersion = entry['gameVersion']
+		self.sortKey = modlist.versionKey(self.name)
+		self.latest = bool(entry.get('latest'))
+		self.recommended = bool(entry.get('recommended'))
+
+	# Returns the text shown for this version in the GUI, e.g. "forge-14.23.5.2847 (Recommended)"
+	def label(self):
+		if self.recommended:
+			return self.name + ' (Recommended)'
+		if self.latest:
+			return self.name + ' (Latest)'
+		return self.name
+
+class ModloaderCatalog:
+	# Instance variables:
+	#   byGameVersion - a dict of {Minecraft version: tuple of Modloaders, newest first}
+	#   byName        - a dict of {Forge version name: Modloader}
+	#   fetchedAt     - time.monotonic() when the modloader list was fetched
+	def __init__(self, modloaderList):
+		self.byName = {}
+		byGameVersion = {}
+		for entry in modloaderList:
+			modloader = Modloader(entry)
+			self.byName[modloader.name] = modloader
+			byGameVersion.setdefault(modloader.gameVersion, []).append(modloader)
+		self.byGameVersion = {gameVersion: tuple(sorted(modloaders, key=lambda modloader: modloader.sortKey, reverse=True))
+			for gameVersion, modloaders in byGameVersion.items()}
+		self.fetchedAt = time.monotonic()
+
+	# Returns a new ModloaderCatalog of the streamModloaderList() response (cached and revalidated if the response cache is enabled)
+	#   Entries are added as they're parsed, so the multi-megabyte response is never held in memory whole
+	@classmethod
+	def fetch(cls):
+		return cls(twitchapi.streamModloaderList())
+
+	# Returns the tuple of Modloaders for the Minecraft version, newest first
+	def versions(self, gameVersion):
+		return self.byGameVersion.get(gameVersion, ())
+
+	# Returns the Modloader with the given name, or None
+	def get(self, name):
+		return self.byName.get(name)
+
+	# Returns the recommended Modloader for the Minecraft version, otherwise its newest one, or None if it has none
+	def recommended(self, gameVersion):
+		versions = self.versions(gameVersion)
+		return next((modloader for modloader in versions if modloader.recommended), versions[0] if versions else None)
+
+	# Returns None if name is a Forge version for the Minecraft version, otherwise a message saying what's wrong with it
+	def check(self, gameVersion, name):
+		modloader = self.get(name)
+		if modloader != None and modloader.gameVersion == gameVersion:
+			return None
+		suggestion = self.recommended(gameVersion)
+		if modloader != None:
+			message = '{} is for Minecraft {}, not {}'.format(name, modloader.gameVersion, gameVersion)
+		else:
+			message = '{} is not a known Forge version'.format(name)
+		if suggestion != None:
+			message = message + ' (Minecraft {} recommends {})'.format(gameVersion, suggestion.name)
+		return message
+
+# The catalog shared by the GUI and PackBuilder, and the lock guarding it
+sharedCatalog = None
+sharedLock = threading.Lock()
+
+# Returns the shared ModloaderCatalog, fetching it the first time, or again once it's older than maxAge seconds
+#   Defaults to how long the modloader list's response is cached (see twitchapi.CACHE_TTLS)
+def getCatalog(maxAge=twitchapi.CACHE_TTLS[twitchapi.URL_GET_MODLOADER_LIST]):
+	global sharedCatalog
+	with sharedLock:
+		if sharedCatalog == None or time.monotonic() - sharedCatalog.fetchedAt > maxAge:
+			sharedCatalog = ModloaderCatalog.fetch()
+		return sharedCatalog
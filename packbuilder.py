@@ -0,0 +1,299 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import logging
+import json
+import sys
+import io
+import os
+
+import twitchapi
+import modlist
+import lockfile
+import modloaders
+import packtargets
+import solver
+import tracing
+
+# GUI-free modpack building: resolves declarative pack specs into ModLists, then exports each to every requested target in one pass
+#   Usage: python packbuilder.py spec.json [more specs...] --output build [--targets curseforge multimc server]
+#   A spec file holds a single pack spec or a list of them:
+#     {
+#       "name": "My Pack", "version": "1.0.0", "author": "Me",
+#       "minecraftVersion": "1.12.2", "forgeVersion": "forge-14.23.5.2847",
+#       "mods": [238222, {"addonID": 32274, "fileID": 2978394}],
+#       "clientOnly": [238222]
+#     }
+#   Mods given as a bare addonID get the newest file for the Minecraft version (releases preferred over betas, betas over alphas)
+#   whose required dependencies can all be given a file too (see ModList.solve)
+#   "clientOnly" optionally lists mods to leave out of the server pack on top of those CurseForge tags as client-only (see packtargets.py)
+#   Each build writes a lockfile next to the pack's manifest.json (see lockfile.py); rebuilding the pack then only re-resolves the mods
+#   whose spec entry changed or whose addon was modified upstream, and takes every other mod straight from the lockfile
+
+# Raised when a pack spec is malformed, or can't be satisfied (e.g. a pinned file doesn't exist)
+class PackSpecError(ValueError):
+	pass
+
+# A declarative description of a modpack
+class PackSpec:
+	# Instance variables:
+	#   name             - the name of the modpack
+	#   version          - the version of the modpack
+	#   author           - the author of the modpack
+	#   minecraftVersion - a string containing the Minecraft version the pack targets
+	#   forgeVersion     - a string containing the Forge version the pack uses, or None
+	#   mods             - a list of (addonID, fileID) tuples, where fileID is None unless the file is pinned
+	#   clientOnly       - a set of the addonIDs of mods that must be left out of a server pack
+	def __init__(self, name, version, author, minecraftVersion, forgeVersion=None, mods=(), clientOnly=()):
+		self.name = name
+		self.version = version
+		self.author = author
+		self.minecraftVersion = minecraftVersion
+		self.forgeVersion = forgeVersion
+		self.mods = list(mods)
+		self.clientOnly = set(clientOnly)
+
+	# Creates a PackSpec from its JSON structure (see the top of this file)
+	@classmethod
+	def fromJSON(cls, document):
+		try:
+			mods = []
+			for entry in document.get('mods', []):
+				if isinstance(entry, dict):
+					mods.append((int(entry['addonID']), int(entry['fileID']) if entry.get('fileID') != None else None))
+				else:
+					mods.append((int(entry), None))
+			clientOnly = [int(addonID) for addonID in document.get('clientOnly', [])]
+			return cls(document['name'], document['version'], document['author'], document['minecraftVersion'], document.get('forgeVersion'), mods, clientOnly)
+		except (KeyError, TypeError, ValueError, AttributeError) as error:
+			raise PackSpecError('Invalid pack spec: {!r}'.format(error)) from error
+
+	# Returns the JSON structure of this PackSpec
+	def toJSON(self):
+		return {
+			'name': self.name,
+			'version': self.version,
+			'author': self.author,
+			'minecraftVersion': self.minecraftVersion,
+			'forgeVersion': self.forgeVersion,
+			'mods': [addonID if fileID == None else {'addonID': addonID, 'fileID': fileID} for addonID, fileID in self.mods],
+			'clientOnly': sorted(self.clientOnly),
+			}
+
+# Returns the list of PackSpecs in the JSON file at path, which may hold one spec or a list of them
+def loadSpecs(path):
+	with open(path) as specFile:
+		document = json.load(specFile)
+	if isinstance(document, list):
+		return [PackSpec.fromJSON(entry) for entry in document]
+	return [PackSpec.fromJSON(document)]
+
+# The targets PackBuilder can export each pack to (see PackBuilder.build)
+TARGETS = ['curseforge', 'multimc', 'server']
+
+# Create the modpack's manifest
+#   Returns the generated manifest structure to be written as a JSON separately
+@tracing.traced('export')
+def createManifest(spec, modList):
+	writer = packtargets.ManifestWriter(spec)
+	for mod in packtargets.selectedMods(modList):
+		writer.addMod(mod)
+	return writer.manifest
+
+# Creates a modpack modlist with credits
+#   Returns the generated HTML string to be written as an HTML file separately
+@tracing.traced('export')
+def createModpackCredits(spec, modList):
+	html = io.StringIO()
+	credits = packtargets.HTMLCredits(html, spec)
+	for mod in packtargets.selectedMods(modList):
+		credits.addMod(mod)
+	credits.finish()
+	return html.getvalue()
+
+# Builds PackSpecs without any GUI
+#   Every pack built by the same PackBuilder shares one worker pool and one set of fetched addons, so mods common to several packs are fetched once
+class PackBuilder:
+	# Instance variables:
+	#   outputFolder  - the folder each pack's output folder is created in
+	#   includeJars   - whether the selected mod jars are put in each zip's overrides/mods (through the shared jarstore.JarStore)
+	#   executor      - the ThreadPoolExecutor shared by every ModList this builder resolves
+	#   fetched       - a dict of {addonID: (addonInfo, addonFiles)} shared by every ModList this builder resolves
+	#   useLocks      - whether existing lockfiles are used to only re-resolve what changed (a new lockfile is written either way)
+	#   checkUpstream - whether locked mods are checked for upstream changes (one batched request per 100 mods); if False, lockfiles are trusted as they are
+	#   targets       - the names of the targets (see TARGETS) each pack is exported to, besides its own folder
+	def __init__(self, outputFolder, maxWorkers=8, includeJars=False, useLocks=True, checkUpstream=True, targets=('curseforge',)):
+		self.outputFolder = outputFolder
+		self.includeJars = includeJars
+		self.targets = list(targets)
+		self.useLocks = useLocks
+		self.checkUpstream = checkUpstream
+		self.maxWorkers = maxWorkers
+		self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='PackBuilder')
+		self.fetched = {}
+		self.store = None
+
+	# Returns a new ModList for spec with its mods added, dependencies resolved and files selected
+	#   Given the lockfile.PackLock of an earlier build, every locked mod that isn't stale (see staleMods) is taken from it without any request,
+	#   and only the stale ones (and any new dependencies of those) are fetched and resolved
+	@tracing.traced('resolve')
+	def resolve(self, spec, lock=None):
+		modList = modlist.ModList(self.maxWorkers, executor=self.executor, fetched=self.fetched)
+		modList.minecraftVersion = spec.minecraftVersion
+
+		locked = set()
+		if lock != None and lock.minecraftVersion == spec.minecraftVersion:
+			stale = self.staleMods(spec, lock)
+			for addonID, lockedMod in lock.mods.items():
+				if addonID not in stale:
+					modList.addMod(lockedMod.toMod(modList), resolveDependencies=False)
+					locked.add(addonID)
+
+		# Fetch every other listed mod at once (their info in batches), then resolve all their dependencies breadth-first together
+		fetchIDs = [addonID for addonID, fileID in spec.mods if addonID not in locked]
+		futures = modList.fetchMods(fetchIDs)
+		for addonID in fetchIDs:
+			if addonID not in modList.mods:
+				addonInfo, addonFiles = futures[addonID].result()
+				modList.addMod(modlist.Mod(modList, addonSearchResult=addonInfo, fileInfo=addonFiles), resolveDependencies=False)
+		modList.setMinecraftVersion(spec.minecraftVersion)
+
+		# Keep the locked and pinned files, and let the solver pick the newest workable file of every other mod the spec needs
+		#   Mods no longer needed (e.g. a locked dependency of a file that was replaced) are left without a file
+		pinned = {addonID: modList.mods[addonID].selectedFile for addonID in locked}
+		for addonID, fileID in spec.mods:
+			if fileID != None and addonID not in locked:
+				mod = modList.mods[addonID]
+				pinned[addonID] = next((file for file in mod.files if file.fileID == fileID), None)
+				if pinned[addonID] == None:
+					raise PackSpecError('{}: mod {} has no file {}'.format(spec.name, mod.modName, fileID))
+		modList.resolveDependencies(list(pinned.values())) # A pinned file may be for another Minecraft version
+		result = modList.solve(solver.PREFER_STABLE, roots=[addonID for addonID, fileID in spec.mods], pinned=pinned)
+		if result.conflicts:
+			raise PackSpecError('{}: {}'.format(spec.name, '; '.join(result.conflicts.values())))
+		return modList
+
+	# Returns the set of addonIDs of the lock's mods that must be resolved again: those whose spec entry is new or changed,
+	#   and (if checkUpstream is set) those modified upstream since they were locked, found with batched getAddonInfos() requests
+	@tracing.traced('resolve')
+	def staleMods(self, spec, lock):
+		stale = lock.changedRequests(spec)
+		if self.checkUpstream:
+			unchanged = [addonID for addonID in lock.mods if addonID not in stale]
+			stale = stale | lock.upstreamChanges(spec, twitchapi.getAddonInfos(unchanged))
+		return stale
+
+	# Raises a PackSpecError if the spec names a Forge version that doesn't exist for its Minecraft version
+	#   The modloader list is fetched once and shared by every spec (see modloaders.getCatalog); specs without a Forge version skip the check
+	def checkForgeVersion(self, spec):
+		if spec.forgeVersion == None:
+			return
+		problem = modloaders.getCatalog().check(spec.minecraftVersion, spec.forgeVersion)
+		if problem != None:
+			raise PackSpecError('{}: {}'.format(spec.name, problem))
+
+	# Resolves spec and exports it into <outputFolder>/<name>/ in one pass (see packtargets.exportPack), then writes its packcrafter.lock there:
+	#   manifest.json, credits.html and credits.md, plus each of the builder's targets:
+	#     curseforge - <name>-<version>.zip, with the jars in overrides/mods/ if includeJars is set
+	#     multimc    - <name>-<version>-multimc.zip, a MultiMC instance with every jar
+	#     server     - server/, with the jars of every mod that isn't client-only
+	#   Jars are downloaded into the shared jarstore.JarStore once, whichever targets use them
+	#   Returns a list of the paths of the targets
+	@tracing.traced('build')
+	def build(self, spec):
+		self.checkForgeVersion(spec)
+		packFolder = os.path.join(self.outputFolder, spec.name)
+		lockPath = os.path.join(packFolder, lockfile.LOCK_FILE_NAME)
+		modList = self.resolve(spec, lockfile.PackLock.load(lockPath) if self.useLocks else None)
+		os.makedirs(packFolder, exist_ok=True)
+
+		targets = [packtargets.PackFolder(packFolder)]
+		if 'curseforge' in self.targets:
+			targets.append(packtargets.CurseForgeZip(os.path.join(packFolder, '{}-{}.zip'.format(spec.name, spec.version)), self.includeJars))
+		if 'multimc' in self.targets:
+			targets.append(packtargets.MultiMCInstance(os.path.join(packFolder, '{}-{}-multimc.zip'.format(spec.name, spec.version))))
+		if 'server' in self.targets:
+			targets.append(packtargets.ServerPack(os.path.join(packFolder, 'server')))
+		if any(target.needsJars for target in targets) and self.store == None:
+			import jarstore
+			self.store = jarstore.JarStore()
+		paths = packtargets.exportPack(spec, modList, targets, self.store, modlist.DownloadManager(maxWorkers=self.maxWorkers))[1:]
+		lockfile.PackLock.fromModList(spec, modList).save(lockPath) # Only once the pack exists, so a failed export is resolved again next time
+		return paths
+
+	# Builds every spec, carrying on after failures
+	#   Returns a list of (PackSpec, list of target paths or the exception that stopped it) tuples
+	def buildAll(self, specs):
+		results = []
+		for spec in specs:
+			try:
+				results.append((spec, self.build(spec)))
+			except (PackSpecError, lockfile.LockError, twitchapi.TwitchAPIError, modlist.DownloadError, OSError) as error:
+				results.append((spec, error))
+		return results
+
+	# Deletes every jar in the shared jarstore.JarStore that no pack references any more, returning the number of bytes freed
+	def collectGarbage(self):
+		if self.store == None:
+			import jarstore
+			self.store = jarstore.JarStore()
+		return self.store.collectGarbage()
+
+	def close(self):
+		self.executor.shutdown()
+		if self.store != None:
+			self.store.close()
+
+# Command-line entry point; returns the process exit code
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Build modpacks from JSON pack specs without the GUI')
+	parser.add_argument('specs', nargs='+', help='pack spec JSON files, each holding one spec or a list of them')
+	parser.add_argument('--output', default='build', help='folder to write each pack into (default: build)')
+	parser.add_argument('--workers', type=int, default=8, help='number of concurrent API requests/downloads (default: 8)')
+	parser.add_argument('--jars', action='store_true', help='include the selected mod jars in each CurseForge zip')
+	parser.add_argument('--targets', nargs='+', choices=TARGETS, default=['curseforge'],
+		help='what to export each pack to: a CurseForge zip, a MultiMC instance zip and/or a server pack folder (default: curseforge)')
+	parser.add_argument('--cache', action='store_true', help='use the persistent API response cache')
+	parser.add_argument('--offline', action='store_true', help='only use the persistent API response cache, never the network')
+	parser.add_argument('--no-lock', action='store_true', help='ignore existing lockfiles and resolve every pack from scratch')
+	parser.add_argument('--frozen', action='store_true', help='trust existing lockfiles without checking locked mods for upstream changes')
+	parser.add_argument('--collect-garbage', action='store_true', help='after building, delete every stored jar no pack references any more')
+	parser.add_argument('--verbose', action='store_true', help='log every mod added and dependency found')
+	parser.add_argument('--trace', metavar='FILE', help='save a Chrome trace-event JSON trace of the build to FILE, and print a summary of it')
+	args = parser.parse_args(argv)
+
+	logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+	if args.trace:
+		tracing.enable()
+
+	if args.cache or args.offline:
+		twitchapi.enableCache(offlineMode=args.offline)
+
+	try:
+		specs = [spec for path in args.specs for spec in loadSpecs(path)]
+	except (OSError, ValueError) as error:
+		print('Error: {}'.format(error), file=sys.stderr)
+		return 2
+
+	builder = PackBuilder(args.output, args.workers, args.jars, useLocks=not args.no_lock, checkUpstream=not args.frozen, targets=args.targets)
+	try:
+		results = builder.buildAll(specs)
+		if args.collect_garbage:
+			print('Freed {:.1f} MB of unreferenced jars'.format(builder.collectGarbage() / 1e6))
+	finally:
+		builder.close()
+		if args.trace:
+			tracer = tracing.disable()
+			tracer.saveChromeTrace(args.trace)
+			print(tracer.summary())
+
+	failures = 0
+	for spec, result in results:
+		if isinstance(result, Exception):
+			failures = failures + 1
+			print('FAILED {} {}: {}'.format(spec.name, spec.version, result), file=sys.stderr)
+		else:
+			print('Built {} {}: {}'.format(spec.name, spec.version, ', '.join(result)))
+	return 1 if failures else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
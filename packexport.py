@@ -0,0 +1,76 @@
+from zipfile import ZipInfo, ZIP_STORED, ZIP_DEFLATED
+import shutil
+import time
+import json
+import io
+import os
+
+# Helpers that stream entries into modpack zips (see packtargets.py for the zips themselves)
+#   Everything is streamed entry by entry straight into the zip, so memory use doesn't grow with the size of the pack,
+#   and the zip never has to seek, so it can be written to a pipe or socket as well as a file
+
+# File extensions that are already compressed; deflating them again costs time and saves nothing
+STORED_EXTENSIONS = frozenset(['.jar', '.zip', '.png', '.jpg', '.jpeg', '.ogg', '.gz', '.xz'])
+
+# The folders every modpack's overrides/ tree starts with
+OVERRIDE_FOLDERS = ['mods', 'config', 'resources', 'scripts']
+
+# Size of the buffer used when copying files into the zip
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Returns the zip compression method to use for an entry with the given name: stored for already-compressed files, deflated otherwise
+def compressionFor(name):
+	return ZIP_STORED if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS else ZIP_DEFLATED
+
+# Returns a ZipInfo for a new entry named name, stamped with the current time
+def newEntry(name, compression=None):
+	entry = ZipInfo(name, date_time=time.localtime()[:6])
+	entry.compress_type = compressionFor(name) if compression == None else compression
+	entry.external_attr = 0o644 << 16
+	return entry
+
+# Streams text into a new zip entry
+def writeText(zipFile, name, text):
+	with zipFile.open(newEntry(name), 'w') as entryFile:
+		with io.TextIOWrapper(entryFile, encoding='utf-8', newline='') as textFile:
+			textFile.write(text)
+
+# Streams a JSON document into a new zip entry without building the encoded string first
+def writeJSON(zipFile, name, document):
+	with zipFile.open(newEntry(name), 'w') as entryFile:
+		with io.TextIOWrapper(entryFile, encoding='utf-8', newline='') as textFile:
+			json.dump(document, textFile)
+
+# Copies the file at path into a new zip entry through a fixed-size buffer
+def writeFile(zipFile, name, path):
+	with open(path, 'rb') as sourceFile, zipFile.open(newEntry(name), 'w', force_zip64=os.path.getsize(path) > 0x7fffffff) as entryFile:
+		shutil.copyfileobj(sourceFile, entryFile, COPY_BUFFER_SIZE)
+
+# Adds an empty directory entry
+def writeFolder(zipFile, name):
+	entry = ZipInfo(name.rstrip('/') + '/', date_time=time.localtime()[:6])
+	entry.external_attr = (0o40755 << 16) | 0x10 # Unix directory mode, and the MS-DOS directory flag
+	zipFile.writestr(entry, b'')
+
+# Writes a modpack's overrides/ tree into an open zip: the standard folders, the contents of overridesFolder (if given),
+#   then the (fileName, path) pairs of modJars into overrides/mods/
+def writeOverrides(zipFile, overridesFolder=None, modJars=()):
+	written = set()
+	for folder in OVERRIDE_FOLDERS:
+		writeFolder(zipFile, 'overrides/' + folder)
+		written.add('overrides/' + folder + '/')
+
+	if overridesFolder != None:
+		for directory, folders, fileNames in os.walk(overridesFolder):
+			folders.sort()
+			relativeDirectory = os.path.relpath(directory, overridesFolder)
+			for fileName in sorted(fileNames):
+				relativePath = fileName if relativeDirectory == os.curdir else os.path.join(relativeDirectory, fileName)
+				name = 'overrides/' + relativePath.replace(os.sep, '/')
+				writeFile(zipFile, name, os.path.join(directory, fileName))
+				written.add(name)
+
+	for fileName, path in modJars:
+		name = 'overrides/mods/' + fileName
+		if name not in written: # A jar placed in the overrides folder by hand wins
+			writeFile(zipFile, name, path)
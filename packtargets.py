@@ -0,0 +1,329 @@
+from zipfile import ZipFile
+import logging
+import shutil
+import json
+import io
+import os
+
+import packexport
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Exports a resolved ModList to every output a pack ships as, in one pass
+#   The ModList is walked once, and each Mod with a selected file is handed to every target in turn: each one streams what it needs
+#   (manifest entries, credits, jars) into its own output as it goes. The jars any target needs are collected through the jarstore.JarStore
+#   once, before the walk, and the same stored jar is streamed or linked into every target
+#   Usage:
+#     targets = [packtargets.CurseForgeZip('MyPack.zip'), packtargets.MultiMCInstance('MyPack-multimc.zip'), packtargets.ServerPack('server')]
+#     paths = packtargets.exportPack(spec, modList, targets, jarstore.JarStore())
+
+# The "uid"s MultiMC gives Minecraft and Forge in mmc-pack.json
+MULTIMC_MINECRAFT_UID = 'net.minecraft'
+MULTIMC_FORGE_UID = 'net.minecraftforge'
+
+# Returns a list of the Mods of the ModList that have a selected file, in ModList order
+def selectedMods(modList):
+	return [mod for mod in modList.mods.values() if mod.selectedFile != None]
+
+# Returns the Forge version number of a modloader name, e.g. "14.23.5.2847" for "forge-14.23.5.2847"
+def forgeNumber(forgeVersion):
+	return forgeVersion[len('forge-'):] if forgeVersion.startswith('forge-') else forgeVersion
+
+# Builds the CurseForge manifest.json structure, one Mod at a time
+class ManifestWriter:
+	# Instance variables:
+	#   manifest - the manifest structure, complete once every Mod has been added
+	def __init__(self, spec):
+		self.manifest = {
+			"minecraft": {
+				"version": spec.minecraftVersion,
+				"modLoaders": [
+						{
+							"id": spec.forgeVersion,
+							"primary": True
+						}
+					]
+				},
+			"manifestType": "minecraftModpack",
+			"manifestVersion": 1,
+			"name": spec.name,
+			"version": spec.version,
+			"author": spec.author,
+			"files": [],
+			"overrides": "overrides"
+			}
+
+	# Adds the Mod's selected File (means each Mod doesn't need to be downloaded)
+	def addMod(self, mod):
+		self.manifest['files'].append({'projectID': mod.addonID, 'fileID': mod.selectedFile.fileID, 'required': True})
+
+# Streams the modpack's credits as HTML into a text file, one Mod at a time
+class HTMLCredits:
+	def __init__(self, textFile, spec):
+		self.textFile = textFile
+		textFile.write("<!DOCTYPE html><html><body>\n")
+		textFile.write("<h1>Modpack Information</h1><p>Name: {}</p><p>Version: {}</p><p>Author: {}</p><p>Minecraft Version: {}</p><p>Forge Version: {}</p>".format(spec.name, spec.version, spec.author, spec.minecraftVersion, spec.forgeVersion))
+		textFile.write("<h1>Mod Credits</h1>")
+
+	def addMod(self, mod):
+		self.textFile.write("<h2>{}</h2><p>Version: {}</p><p>Author(s): {}</p><p>Website: {}</p>".format(mod.modName, mod.selectedFile.fileName, mod.authors, mod.modURL))
+
+	# Writes the end of the document; the text file is left open
+	def finish(self):
+		self.textFile.write("</body></html>")
+
+# Streams the modpack's credits as Markdown into a text file, one Mod at a time
+class MarkdownCredits:
+	def __init__(self, textFile, spec):
+		self.textFile = textFile
+		textFile.write('# {} {}\n\nBy {}, for Minecraft {} with Forge {}\n\n## Mod Credits\n\n'.format(spec.name, spec.version, spec.author,
+			spec.minecraftVersion, spec.forgeVersion))
+
+	def addMod(self, mod):
+		self.textFile.write('- [{}]({}) by {}: {}\n'.format(mod.modName, mod.modURL, ', '.join(mod.authors), mod.selectedFile.fileName))
+
+	def finish(self):
+		pass
+
+# One output of exportPack(); subclasses override what they need
+#   open() is called before the walk, addMod() once per Mod with a selected file, then close() to finish the output and return its path
+#   (or whatever else it was written to)
+#   If anything fails, abort() is called instead of close(), even if open() wasn't; it must leave no half-written output behind
+class ExportTarget:
+	# Class variables:
+	#   needsJars - whether addMod() must be given the path of each Mod's jar
+	needsJars = False
+
+	# spec is the packbuilder.PackSpec being exported; store is the jarstore.JarStore the jars come from, or None
+	def open(self, spec, store):
+		pass
+
+	# jarPath is the path of the stored jar of the Mod's selected File, or None if no target needs jars
+	def addMod(self, mod, jarPath):
+		pass
+
+	def close(self):
+		pass
+
+	def abort(self):
+		pass
+
+# A zip written to a path or streamed into a writable file-like object, which doesn't have to be seekable (e.g. a pipe or an HTTP response)
+#   A path is written under a temporary name, then renamed into place once complete; a file object is written to as it is,
+#   so what it received before an abort is up to its owner to discard
+class ZipTarget(ExportTarget):
+	# Instance variables:
+	#   path    - the path of the zip, or the file object it's written to
+	#   zipFile - the open ZipFile while the target is being written
+	def __init__(self, path):
+		self.path = path
+		self.zipFile = None
+
+	# Returns True if the zip is written to a file object rather than a path
+	def isStream(self):
+		return hasattr(self.path, 'write')
+
+	def open(self, spec, store):
+		self.zipFile = ZipFile(self.path if self.isStream() else self.path + '.part', 'w', allowZip64=True)
+
+	def close(self):
+		self.zipFile.close()
+		self.zipFile = None
+		if not self.isStream():
+			os.replace(self.path + '.part', self.path)
+		return self.path
+
+	def abort(self):
+		if self.zipFile != None:
+			try:
+				self.zipFile.close()
+			except (OSError, ValueError):
+				pass
+			self.zipFile = None
+		if not self.isStream() and os.path.exists(self.path + '.part'):
+			os.remove(self.path + '.part')
+
+# The pack's own folder: manifest.json, credits.html and credits.md
+#   Each file is written under a temporary name, and they're all renamed into place once complete
+class PackFolder(ExportTarget):
+	# The files written, in the order they're renamed into place
+	FILE_NAMES = ['credits.html', 'credits.md', 'manifest.json']
+
+	# Instance variables:
+	#   folder - the folder the files are written into
+	def __init__(self, folder):
+		self.folder = folder
+		self.files = []
+
+	# Returns the temporary path the file named name is written to
+	def partPath(self, name):
+		return os.path.join(self.folder, name + '.part')
+
+	def open(self, spec, store):
+		os.makedirs(self.folder, exist_ok=True)
+		self.manifest = ManifestWriter(spec)
+		self.files = [open(self.partPath(name), 'w', encoding='utf-8') for name in ['credits.html', 'credits.md']]
+		self.credits = [HTMLCredits(self.files[0], spec), MarkdownCredits(self.files[1], spec)]
+
+	def addMod(self, mod, jarPath):
+		self.manifest.addMod(mod)
+		for credits in self.credits:
+			credits.addMod(mod)
+
+	def closeFiles(self):
+		for textFile in self.files:
+			textFile.close()
+		self.files = []
+
+	def close(self):
+		for credits in self.credits:
+			credits.finish()
+		self.closeFiles()
+		with open(self.partPath('manifest.json'), 'w', encoding='utf-8') as manifestFile:
+			json.dump(self.manifest.manifest, manifestFile, indent='\t')
+		for name in self.FILE_NAMES:
+			os.replace(self.partPath(name), os.path.join(self.folder, name))
+		return self.folder
+
+	def abort(self):
+		self.closeFiles()
+		for name in self.FILE_NAMES:
+			if os.path.exists(self.partPath(name)):
+				os.remove(self.partPath(name))
+
+# A CurseForge-style modpack zip (see packexport.py), optionally with the jars in overrides/mods/
+#   The credits are streamed into the zip during the walk; the manifest and jars are written once it's over,
+#   as a zip can only have one entry open at a time
+class CurseForgeZip(ZipTarget):
+	# Instance variables:
+	#   includeJars     - whether the jars are put in overrides/mods/
+	#   overridesFolder - an optional folder whose contents are copied into overrides/
+	def __init__(self, path, includeJars=False, overridesFolder=None):
+		super().__init__(path)
+		self.needsJars = includeJars
+		self.includeJars = includeJars
+		self.overridesFolder = overridesFolder
+		self.creditsFile = None
+
+	def open(self, spec, store):
+		super().open(spec, store)
+		self.manifest = ManifestWriter(spec)
+		self.modJars = []
+		self.creditsFile = io.TextIOWrapper(self.zipFile.open(packexport.newEntry('credits.html'), 'w'), encoding='utf-8', newline='')
+		self.credits = HTMLCredits(self.creditsFile, spec)
+
+	def addMod(self, mod, jarPath):
+		self.manifest.addMod(mod)
+		self.credits.addMod(mod)
+		if self.includeJars:
+			self.modJars.append((mod.selectedFile.fileName, jarPath))
+
+	def close(self):
+		self.credits.finish()
+		self.creditsFile.close()
+		self.creditsFile = None
+		packexport.writeJSON(self.zipFile, 'manifest.json', self.manifest.manifest)
+		packexport.writeOverrides(self.zipFile, self.overridesFolder, self.modJars)
+		return super().close()
+
+	def abort(self):
+		if self.creditsFile != None: # The entry has to be closed before the zip can be
+			try:
+				self.creditsFile.close()
+			except (OSError, ValueError):
+				pass
+			self.creditsFile = None
+		super().abort()
+
+# A MultiMC instance zip, importable with "Import from zip": instance.cfg, mmc-pack.json and every jar in .minecraft/mods/
+#   Each jar is streamed into the zip as its Mod comes up in the walk
+class MultiMCInstance(ZipTarget):
+	needsJars = True
+
+	def open(self, spec, store):
+		super().open(spec, store)
+		packexport.writeText(self.zipFile, 'instance.cfg', 'InstanceType=OneSix\nname={}\nnotes={} by {}\n'.format(spec.name, spec.version, spec.author))
+		components = [{'uid': MULTIMC_MINECRAFT_UID, 'version': spec.minecraftVersion, 'important': True}]
+		if spec.forgeVersion != None:
+			components.append({'uid': MULTIMC_FORGE_UID, 'version': forgeNumber(spec.forgeVersion)})
+		packexport.writeJSON(self.zipFile, 'mmc-pack.json', {'components': components, 'formatVersion': 1})
+		packexport.writeFolder(self.zipFile, '.minecraft/mods')
+
+	def addMod(self, mod, jarPath):
+		packexport.writeFile(self.zipFile, '.minecraft/mods/' + mod.selectedFile.fileName, jarPath)
+
+# A server pack folder, with the jar of every Mod that isn't client-only in its mods/ folder
+#   A Mod is client-only if CurseForge tags its selected file so (see File.clientOnly) or the spec lists it in clientOnly
+#   Jars are hardlinked from the store where possible (see JarStore.place) into a fresh mods.part/ folder, which replaces mods/ once complete,
+#   so jars left from an earlier export that the pack no longer uses go with it
+class ServerPack(ExportTarget):
+	needsJars = True
+
+	# Instance variables:
+	#   folder  - the folder of the server pack
+	#   skipped - a list of the client-only Mods left out by the last export
+	def __init__(self, folder):
+		self.folder = folder
+		self.modsFolder = os.path.join(folder, 'mods')
+		self.skipped = []
+
+	def open(self, spec, store):
+		for leftover in [self.modsFolder + '.part', self.modsFolder + '.old']: # Left by an export that was killed
+			shutil.rmtree(leftover, ignore_errors=True)
+		os.makedirs(self.modsFolder + '.part')
+		self.clientOnly = spec.clientOnly
+		self.store = store
+		self.skipped = []
+
+	def addMod(self, mod, jarPath):
+		if mod.selectedFile.clientOnly or mod.addonID in self.clientOnly:
+			logger.info('Leaving client-only mod %s out of the server pack', mod.modName)
+			self.skipped.append(mod)
+			return
+		destination = os.path.join(self.modsFolder + '.part', mod.selectedFile.fileName)
+		if self.store != None:
+			self.store.place(jarPath, destination)
+		else:
+			shutil.copyfile(jarPath, destination)
+
+	def close(self):
+		if os.path.exists(self.modsFolder): # Moved aside rather than deleted first, so mods/ is only ever missing between two renames
+			os.replace(self.modsFolder, self.modsFolder + '.old')
+		os.replace(self.modsFolder + '.part', self.modsFolder)
+		shutil.rmtree(self.modsFolder + '.old', ignore_errors=True)
+		tracing.count('export.serverSkipped', len(self.skipped))
+		return self.folder
+
+	def abort(self):
+		shutil.rmtree(self.modsFolder + '.part', ignore_errors=True)
+
+# Exports the ModList to every target in a single walk over its Mods, returning a list of the path each target wrote
+#   If any target needs jars, the selected jars are collected through store (downloading those it doesn't have with downloadManager)
+#   and referenced under the pack's name; if anything fails, every target is aborted
+@tracing.traced('export')
+def exportPack(spec, modList, targets, store=None, downloadManager=None):
+	mods = selectedMods(modList)
+	objectPaths = {}
+	if any(target.needsJars for target in targets):
+		if store == None:
+			raise ValueError('Exporting jars needs a jarstore.JarStore')
+		objectPaths = store.collectFiles([mod.selectedFile for mod in mods], spec.name, downloadManager)
+
+	try:
+		for target in targets:
+			target.open(spec, store)
+		with tracing.span('walk', 'export', mods=len(mods), targets=len(targets)):
+			for mod in mods:
+				jarPath = objectPaths.get(mod.selectedFile.fileID)
+				for target in targets:
+					target.addMod(mod, jarPath)
+		paths = []
+		for target in targets:
+			with tracing.span(type(target).__name__, 'export'):
+				paths.append(target.close())
+	except BaseException:
+		for target in targets:
+			target.abort()
+		raise
+	return paths
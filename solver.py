@@ -0,0 +1,117 @@
+import modlist
+
+# Picks the file of every Mod of a ModList at once (see ModList.solve), instead of one combobox at a time
+#   A Mod can be given a file if one of its files allowed by the ReleasePolicy supports the Minecraft version and requires only Mods
+#   that can be given a file themselves. Dependencies are on whole addons, never on particular files, so whether a Mod can be given
+#   a file doesn't depend on which files the others get; the newest such file is always the best choice
+#   Every Mod is assumed solvable, then any Mod none of whose files can work is ruled out, and so are the Mods only it kept solvable,
+#   until nothing changes (so dependency cycles are fine). Each Mod's compatible files are found once and memoized, so solving again
+#   after adding a Mod only looks at that Mod's files
+
+# Which ReleaseTypes a ReleasePolicy allows, in order of preference
+class ReleasePolicy:
+	# Instance variables:
+	#   name         - the name of the policy, e.g. "allow beta"
+	#   releaseTypes - a tuple of the ReleaseTypes that may be selected
+	#   preferStable - if True, the newest file of a more stable ReleaseType beats any newer file of a less stable one;
+	#                  otherwise the newest allowed file wins
+	def __init__(self, name, releaseTypes, preferStable=False):
+		self.name = name
+		self.releaseTypes = tuple(releaseTypes)
+		self.preferStable = preferStable
+
+	# Returns the Mod's files that this policy allows for the Minecraft version, best first
+	def files(self, mod, minecraftVersion):
+		if self.preferStable:
+			return [file for releaseType in self.releaseTypes for file in mod.getFiles(minecraftVersion, [releaseType])]
+		return mod.getFiles(minecraftVersion, self.releaseTypes)
+
+RELEASE_ONLY = ReleasePolicy('release only', [modlist.ReleaseType.RELEASE])
+ALLOW_BETA = ReleasePolicy('allow beta', [modlist.ReleaseType.RELEASE, modlist.ReleaseType.BETA])
+ALLOW_ALPHA = ReleasePolicy('allow alpha', [modlist.ReleaseType.RELEASE, modlist.ReleaseType.BETA, modlist.ReleaseType.ALPHA])
+PREFER_STABLE = ReleasePolicy('prefer stable', [modlist.ReleaseType.RELEASE, modlist.ReleaseType.BETA, modlist.ReleaseType.ALPHA], preferStable=True)
+
+# What FileSolver.solve() found
+class SolveResult:
+	# Instance variables:
+	#   selected  - a dict of {addonID: File} of every Mod given a file
+	#   conflicts - a dict of {addonID: message} of every Mod that was needed but can't be given a file, saying why
+	def __init__(self, selected, conflicts):
+		self.selected = selected
+		self.conflicts = conflicts
+
+class FileSolver:
+	# Instance variables:
+	#   modList          - the ModList being solved
+	#   minecraftVersion - the Minecraft version files must support
+	#   policy           - the ReleasePolicy files are chosen by
+	#   candidates       - a dict of {addonID: (Mod, list of Files)} memoizing each Mod's allowed files for the version, best first;
+	#                      an entry is only used while the ModList still holds that same Mod
+	def __init__(self, modList, minecraftVersion, policy):
+		self.modList = modList
+		self.minecraftVersion = minecraftVersion
+		self.policy = policy
+		self.candidates = {}
+
+	# Returns the Mod's allowed files for the version, best first
+	def candidatesOf(self, mod):
+		memo = self.candidates.get(mod.addonID)
+		if memo == None or memo[0] is not mod:
+			memo = self.candidates[mod.addonID] = (mod, self.policy.files(mod, self.minecraftVersion))
+		return memo[1]
+
+	# Picks the best workable file of every Mod in roots (every Mod by default) and of every Mod they require, directly or not
+	#   pinned is a dict of {addonID: File} of files to keep as they are (e.g. chosen by the user), whatever their version or release type
+	#   Returns a SolveResult; Mods that aren't needed get no file
+	def solve(self, roots=None, pinned=None):
+		mods = self.modList.mods
+		pinned = pinned if pinned != None else {}
+		options = {addonID: [pinned[addonID]] if addonID in pinned else self.candidatesOf(mod) for addonID, mod in mods.items()}
+
+		# Rule out Mods without options, then every Mod all of whose options require a ruled-out (or missing) Mod, until nothing changes
+		dependents = {}
+		for addonID, files in options.items():
+			for file in files:
+				for dependencyID, dependencyType in file.dependencyIDs:
+					dependents.setdefault(dependencyID, set()).add(addonID)
+		viable = {addonID for addonID, files in options.items() if files}
+		ruledOut = [addonID for addonID in dependents if addonID not in viable]
+		while ruledOut:
+			for addonID in dependents.get(ruledOut.pop(), ()):
+				if addonID in viable and not any(self.workable(file, viable) for file in options[addonID]):
+					viable.discard(addonID)
+					ruledOut.append(addonID)
+
+		# Give the roots, then everything their files require, the best workable option
+		selected = {}
+		conflicts = {}
+		pending = list(roots) if roots != None else list(mods)
+		while pending:
+			addonID = pending.pop()
+			if addonID in selected or addonID in conflicts:
+				continue
+			if addonID not in viable: # Explain what blocks it too
+				conflicts[addonID], blocking = self.explain(addonID, options, viable)
+				pending.extend(blocking)
+				continue
+			file = next(file for file in options[addonID] if self.workable(file, viable))
+			selected[addonID] = file
+			pending.extend(dependencyID for dependencyID, dependencyType in file.dependencyIDs)
+		return SolveResult(selected, conflicts)
+
+	# Returns True if every Mod the file requires can be given a file
+	@staticmethod
+	def workable(file, viable):
+		return all(dependencyID in viable for dependencyID, dependencyType in file.dependencyIDs)
+
+	# Returns (why the Mod with addonID can't be given a file, list of the addonIDs of the required Mods that stop it)
+	def explain(self, addonID, options, viable):
+		mod = self.modList.mods.get(addonID)
+		if mod == None:
+			return 'Mod {} is required but not in the modlist'.format(addonID), []
+		if not options[addonID]:
+			return '{} has no file for Minecraft {} ({})'.format(mod.modName, self.minecraftVersion, self.policy.name), []
+		blocking = sorted({dependencyID for file in options[addonID] for dependencyID, dependencyType in file.dependencyIDs if dependencyID not in viable})
+		names = [self.modList.mods[dependencyID].modName if dependencyID in self.modList.mods else 'mod {}'.format(dependencyID) for dependencyID in blocking]
+		return 'every file of {} for Minecraft {} ({}) requires one of {}, which can\'t be given a file'.format(mod.modName, self.minecraftVersion,
+			self.policy.name, ', '.join(names)), blocking
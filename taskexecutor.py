@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import queue
+
+import tracing
+
+# Runs slow work (Twitch API calls, dependency resolution, downloads) off the Tk main thread
+#   Results are handed back to the main thread through a queue polled with after(), since Tk may only be used from the thread that created it
+
+# Holds the Task each worker thread is running, for currentTask()
+workerState = threading.local()
+
+# Returns the Task the calling worker thread is running, or None outside of a task
+#   Lets long-running work check currentTask().isCancelled() without being handed its Task
+def currentTask():
+	return getattr(workerState, 'task', None)
+
+# A unit of work submitted to a TaskExecutor
+class Task:
+	# Instance variables:
+	#   key         - an optional hashable identifying the task; at most one task per key runs at a time
+	#   description - a short text describing the task, shown while it runs (e.g. "Adding JEI")
+	#   future      - the concurrent.futures.Future running the task
+	#   cancelled   - True once cancel() has been called; the task's result is then thrown away
+	#   onSuccess   - called on the main thread with the task's result
+	#   onError     - called on the main thread with the exception the task raised
+	def __init__(self, key, description, onSuccess, onError):
+		self.key = key
+		self.description = description
+		self.onSuccess = onSuccess
+		self.onError = onError
+		self.future = None
+		self.cancelled = False
+
+	# Cancels the task: it won't start if it hasn't yet, and its callbacks won't be called if it has
+	#   Work already running can check isCancelled() to stop early
+	def cancel(self):
+		self.cancelled = True
+		if self.future != None:
+			self.future.cancel()
+
+	def isCancelled(self):
+		return self.cancelled
+
+class TaskExecutor:
+	# Instance variables:
+	#   root          - the Tk widget whose after() is used to poll for finished tasks
+	#   pool          - the ThreadPoolExecutor running tasks that don't need a lane
+	#   lanes         - a dict of {lane name: single-thread ThreadPoolExecutor}; tasks in the same lane run one at a time, in order
+	#   tasks         - a dict of {key: Task} of unfinished tasks that were given a key
+	#   active        - a list of every unfinished Task, oldest first
+	#   finished      - a queue of (Task, succeeded, result or exception) tuples waiting to be handed to the main thread
+	#   onBusyChanged - called on the main thread with the list of active (not cancelled) Tasks whenever it changes
+	#   onError       - called on the main thread with (Task, exception) for failed tasks that have no onError of their own
+	def __init__(self, root, maxWorkers=4, onBusyChanged=None, onError=None, pollInterval=50):
+		self.root = root
+		self.pool = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='Task')
+		self.lanes = {}
+		self.tasks = {}
+		self.active = []
+		self.finished = queue.Queue()
+		self.onBusyChanged = onBusyChanged
+		self.onError = onError
+		self.pollInterval = pollInterval
+		self.closed = False
+		self.root.after(self.pollInterval, self.poll)
+
+	# Runs function(*args) on a worker thread, and calls onSuccess(result) or onError(exception) on the main thread afterwards
+	#   If key is given and a task with the same key is unfinished, the new task replaces it when supersede is True (e.g. an outdated search),
+	#   otherwise the existing task is returned and nothing new is started (e.g. adding the same mod twice)
+	#   Tasks given the same lane run one at a time in submission order, for work that mutates shared state such as the ModList
+	#   Returns the Task
+	def submit(self, function, *args, description='', key=None, supersede=False, lane=None, onSuccess=None, onError=None):
+		if key != None and key in self.tasks:
+			if not supersede:
+				return self.tasks[key]
+			self.tasks[key].cancel()
+
+		task = Task(key, description, onSuccess, onError)
+		if lane == None:
+			executor = self.pool
+		else:
+			if lane not in self.lanes:
+				self.lanes[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Task-' + str(lane))
+			executor = self.lanes[lane]
+		if key != None:
+			self.tasks[key] = task
+		self.active.append(task)
+		task.future = executor.submit(self.run, task, function, args)
+		task.future.add_done_callback(lambda future: future.cancelled() and self.finished.put((task, False, None)))
+		self.busyChanged()
+		return task
+
+	# Worker thread side of a task
+	def run(self, task, function, args):
+		if task.cancelled:
+			self.finished.put((task, False, None))
+			return
+		workerState.task = task
+		try:
+			with tracing.span(task.description or getattr(function, '__qualname__', 'task'), 'task'):
+				result = function(*args)
+		except Exception as error:
+			self.finished.put((task, False, error))
+		else:
+			self.finished.put((task, True, result))
+		finally:
+			workerState.task = None
+
+	# Main thread side: hands every finished task's result to its callback, then checks again after pollInterval milliseconds
+	def poll(self):
+		try:
+			self.handleFinished()
+		finally:
+			if not self.closed:
+				self.root.after(self.pollInterval, self.poll)
+
+	def handleFinished(self):
+		changed = False
+		while True:
+			try:
+				task, succeeded, result = self.finished.get_nowait()
+			except queue.Empty:
+				break
+			if task not in self.active:
+				continue
+			self.active.remove(task)
+			if task.key != None and self.tasks.get(task.key) is task:
+				del self.tasks[task.key]
+			changed = True
+			if task.cancelled:
+				continue
+			if succeeded:
+				if task.onSuccess != None:
+					task.onSuccess(result)
+			elif task.onError != None:
+				task.onError(result)
+			elif self.onError != None:
+				self.onError(task, result)
+		if changed:
+			self.busyChanged()
+
+	def busyChanged(self):
+		if self.onBusyChanged != None:
+			self.onBusyChanged([task for task in self.active if not task.cancelled])
+
+	# Cancels the unfinished task with the given key, if there is one
+	def cancel(self, key):
+		if key in self.tasks:
+			self.tasks[key].cancel()
+			self.busyChanged()
+
+	# Cancels every unfinished task
+	def cancelAll(self):
+		for task in list(self.active):
+			task.cancel()
+		self.busyChanged()
+
+	# Stops polling and shuts down every worker thread without waiting for running tasks
+	#   Queued tasks are cancelled through their futures by cancelAll(), so the pools have nothing left to start
+	def shutdown(self):
+		self.closed = True
+		self.cancelAll()
+		self.pool.shutdown(wait=False)
+		for executor in self.lanes.values():
+			executor.shutdown(wait=False)
@@ -0,0 +1,53 @@
+import unittest
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import twitchapi
+
+# Tests twitchapi.decodeArray on bodies split into chunks at every byte offset, against json.loads on the whole body
+#   Usage: python -m unittest discover tests
+
+# A body with every kind of element, numbers that can be cut into valid shorter numbers ("1." or "1e"), and a multi-byte character
+FIXTURE = '[1.5, 1e3, -2.25E-2, 0, 10, true, false, null, "a, b]", "héllo \\"x\\"", {"id": 1, "files": [1, 2.5]}, [], [3, [4]]]'.encode('utf-8')
+
+# Bodies decodeArray must reject however they're split
+INVALID = [b'[1]x', b'[1] [2]', b'[1],', b'[1,]', b'[,1]', b'[1 2]', b'[1', b'[', b'', b'{"id": 1}', b'[1.]', b'[1e]', b'[tru]']
+
+class DecodeArrayTest(unittest.TestCase):
+	def decode(self, chunks):
+		return list(twitchapi.decodeArray(chunks, 'https://example.com'))
+
+	def test_whole_body(self):
+		self.assertEqual(self.decode([FIXTURE]), json.loads(FIXTURE))
+
+	def test_split_at_every_offset(self):
+		expected = json.loads(FIXTURE)
+		for offset in range(len(FIXTURE) + 1):
+			with self.subTest(offset=offset):
+				self.assertEqual(self.decode([FIXTURE[:offset], FIXTURE[offset:]]), expected)
+
+	def test_one_byte_chunks(self):
+		self.assertEqual(self.decode([FIXTURE[i:i + 1] for i in range(len(FIXTURE))]), json.loads(FIXTURE))
+
+	def test_numbers_split_where_a_shorter_number_ends(self):
+		self.assertEqual(self.decode([b'[1.', b'5]']), [1.5])
+		self.assertEqual(self.decode([b'[1e', b'3]']), [1000.0])
+		self.assertEqual(self.decode([b'[1', b'2, 3', b'4]']), [12, 34])
+
+	def test_empty_array_and_whitespace(self):
+		self.assertEqual(self.decode([b' \r\n[', b' ]', b' \n']), [])
+
+	def test_project(self):
+		self.assertEqual(list(twitchapi.decodeArray([b'[{"id": 1}, ', b'{"id": 2}]'], 'https://example.com', lambda element: element['id'])), [1, 2])
+
+	def test_invalid_bodies(self):
+		for body in INVALID:
+			for offset in range(len(body) + 1):
+				with self.subTest(body=body, offset=offset):
+					with self.assertRaises(twitchapi.TwitchAPIError):
+						self.decode([body[:offset], body[offset:]])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+import tempfile
+import random
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import modimport
+
+# Tests modimport.fingerprint, CurseForge's whitespace-stripped MurmurHash2, against a textbook MurmurHash2
+#   The reference is checked with SMHasher's verification value for MurmurHash2 first, so the fingerprints are known to be right
+#   Usage: python -m unittest discover tests
+
+# SMHasher's verification value for MurmurHash2: the hash (seed 0) of the hashes of the keys bytes(range(n)) with seed 256 - n, for n in 0..255
+SMHASHER_VERIFICATION = 0x27864C1E
+
+# CurseForge fingerprints of small inputs, from the reference below
+KNOWN_FINGERPRINTS = [
+	(b'', 0x5bd15e36),
+	(b'a', 0x2550b18c),
+	(b'ab', 0x64e150ee),
+	(b'abc', 0x60a4fcc1),
+	(b'abcd', 0xc93f7a16),
+	(b'Hello, World!', 0x74e5d78b),
+	(b'Hello, World!\r\n', 0x74e5d78b),
+	(b'The quick brown fox jumps over the lazy dog', 0xdf9f94f7),
+	]
+
+# Returns the 32-bit MurmurHash2 of data, one word at a time
+def murmur2(data, seed):
+	m = 0x5bd1e995
+	h = (seed ^ len(data)) & 0xFFFFFFFF
+	tail = len(data) - len(data) % 4
+	for start in range(0, tail, 4):
+		k = int.from_bytes(data[start:start + 4], 'little') * m & 0xFFFFFFFF
+		k = (k ^ k >> 24) * m & 0xFFFFFFFF
+		h = (h * m & 0xFFFFFFFF) ^ k
+	if tail < len(data):
+		h = (h ^ int.from_bytes(data[tail:], 'little')) * m & 0xFFFFFFFF
+	h = (h ^ h >> 13) * m & 0xFFFFFFFF
+	return h ^ h >> 15
+
+# Returns the CurseForge fingerprint of data, computed with the reference MurmurHash2
+def referenceFingerprint(data):
+	return murmur2(bytes(data).translate(None, b'\t\n\r '), 1)
+
+class FingerprintTest(unittest.TestCase):
+	def test_reference_matches_smhasher(self):
+		hashes = b''.join(murmur2(bytes(range(n)), 256 - n).to_bytes(4, 'little') for n in range(256))
+		self.assertEqual(murmur2(hashes, 0), SMHASHER_VERIFICATION)
+
+	def test_known_fingerprints(self):
+		for data, expected in KNOWN_FINGERPRINTS:
+			with self.subTest(data=data):
+				self.assertEqual(referenceFingerprint(data), expected)
+				self.assertEqual(modimport.fingerprint(data), expected)
+
+	def test_whitespace_is_ignored(self):
+		self.assertEqual(modimport.fingerprint(b' a\tb\r\nc d '), modimport.fingerprint(b'abcd'))
+
+	def test_matches_reference_across_block_boundaries(self):
+		rng = random.Random(1)
+		data = bytes(rng.choice(b'\t\n\r abcdefgh\x00\xff') for _ in range(4099))
+		with mock.patch.object(modimport, 'FINGERPRINT_BLOCK_SIZE', 64):
+			for size in list(range(0, 140)) + [1021, 1024, 4095, 4099]:
+				with self.subTest(size=size):
+					self.assertEqual(modimport.fingerprint(data[:size]), referenceFingerprint(data[:size]))
+
+	def test_fingerprint_file(self):
+		data = bytes(random.Random(2).getrandbits(8) for _ in range(100000))
+		with tempfile.TemporaryDirectory() as folder:
+			path = os.path.join(folder, 'mod.jar')
+			with open(path, 'wb') as jarFile:
+				jarFile.write(data)
+			self.assertEqual(modimport.fingerprintFile(path), referenceFingerprint(data))
+			emptyPath = os.path.join(folder, 'empty.jar')
+			open(emptyPath, 'wb').close()
+			self.assertEqual(modimport.fingerprintFile(emptyPath), KNOWN_FINGERPRINTS[0][1])
+
+if __name__ == '__main__':
+	unittest.main()
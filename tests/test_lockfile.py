@@ -0,0 +1,73 @@
+import unittest
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lockfile
+import packbuilder
+
+# Tests how a PackLock decides what must be resolved again (see lockfile.py), and that it survives a save and load
+#   Usage: python -m unittest discover tests
+
+# Returns a LockedMod of addon addonID with a single file, last modified upstream at dateModified
+def lockedMod(addonID, fileID, dateModified='2021-01-01T00:00:00Z', dependencies=()):
+	return lockfile.LockedMod(addonID, 'Mod {}'.format(addonID), 'https://example.com/{}'.format(addonID), ['author'], dateModified,
+		fileID, 'mod-{}.jar'.format(fileID), 'https://example.com/mod-{}.jar'.format(fileID), 1000, ('sha1', 'ab' * 20), 1, ['1.16.5'], dependencies)
+
+# Returns a PackSpec requesting mods, a list of (addonID, fileID) tuples
+def packSpec(mods):
+	return packbuilder.PackSpec('Pack', '1.0', 'author', '1.16.5', 'forge-36.1.0', mods)
+
+class PackLockTest(unittest.TestCase):
+	def setUp(self):
+		# Mods 1 (pinned to file 10) and 2 were requested; 3 is a dependency of 2
+		self.lock = lockfile.PackLock('1.16.5', [(1, 10), (2, None)], {1: lockedMod(1, 10), 2: lockedMod(2, 20, dependencies=[3]), 3: lockedMod(3, 30)})
+
+	def test_unchanged_spec_has_no_changed_requests(self):
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 10), (2, None)])), set())
+		self.assertEqual(self.lock.changedRequests(packSpec([(2, None), (1, 10)])), set()) # Order doesn't matter
+
+	def test_changed_requests(self):
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 11), (2, None)])), {1}) # Pinned to another file
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, None), (2, None)])), {1}) # Unpinned
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 10), (2, 21)])), {2}) # Newly pinned
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 10), (2, None), (4, None)])), {4}) # Newly listed
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 10), (3, None)])), {3}) # Only a dependency before
+		self.assertEqual(self.lock.changedRequests(packSpec([(1, 10)])), set()) # Removals need no resolving
+
+	def test_upstream_changes(self):
+		spec = packSpec([(1, 10), (2, None)])
+		infos = {addonID: {'id': addonID, 'dateModified': '2021-01-01T00:00:00Z'} for addonID in (1, 2, 3)}
+		self.assertEqual(self.lock.upstreamChanges(spec, infos), set())
+		infos[3]['dateModified'] = '2021-06-01T00:00:00Z'
+		self.assertEqual(self.lock.upstreamChanges(spec, infos), {3})
+		infos[1]['dateModified'] = '2021-06-01T00:00:00Z' # Mod 1 is pinned, so its updates don't matter
+		self.assertEqual(self.lock.upstreamChanges(spec, infos), {3})
+		del infos[2] # Missing from the API's answer: counted as modified
+		self.assertEqual(self.lock.upstreamChanges(spec, infos), {2, 3})
+
+	def test_save_and_load(self):
+		with tempfile.TemporaryDirectory() as folder:
+			path = os.path.join(folder, lockfile.LOCK_FILE_NAME)
+			self.assertIsNone(lockfile.PackLock.load(path))
+			self.lock.save(path)
+			loaded = lockfile.PackLock.load(path)
+		self.assertEqual(loaded.toJSON(), self.lock.toJSON())
+		self.assertEqual(list(loaded.mods), [1, 2, 3])
+		self.assertEqual(loaded.mods[1].fileHash, ('sha1', 'ab' * 20))
+
+	def test_locked_mod_rebuilds_its_file(self):
+		import modlist
+		mod = self.lock.mods[2].toMod(modlist.ModList())
+		self.assertEqual((mod.addonID, mod.selectedFile.fileID, mod.selectedFile.dependencyIDs), (2, 20, ((3, modlist.DependencyType.REQUIRED),)))
+		self.assertEqual(lockfile.LockedMod.fromMod(mod).toJSON(), self.lock.mods[2].toJSON())
+
+	def test_invalid_lockfile(self):
+		with self.assertRaises(lockfile.LockError):
+			lockfile.PackLock.fromJSON({'lockVersion': lockfile.LOCK_VERSION + 1})
+		with self.assertRaises(lockfile.LockError):
+			lockfile.PackLock.fromJSON({'lockVersion': lockfile.LOCK_VERSION, 'minecraftVersion': '1.16.5'})
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import modlist
+import solver
+
+# Tests ModList.solve (see solver.py): newest compatible files, pruning, conflicts, pins and incremental re-solving, on small ModLists built from file lists, without the Twitch API
+#   Usage: python -m unittest discover tests
+
+# Returns a file list item as the Twitch API gives it
+#   dependencies is a list of the addonIDs the file requires
+def fileItem(fileID, fileName, mcVersions=('1.16.5',), releaseType=modlist.ReleaseType.RELEASE, dependencies=()):
+	return {'id': fileID, 'fileName': fileName, 'gameVersion': list(mcVersions), 'downloadUrl': 'https://example.com/{}'.format(fileName),
+		'fileLength': 1000, 'releaseType': int(releaseType), 'hashes': [],
+		'dependencies': [{'addonId': addonID, 'type': int(modlist.DependencyType.REQUIRED)} for addonID in dependencies]}
+
+# Adds a Mod with the given file list items to the ModList, without resolving its dependencies; returns the Mod
+def addMod(modList, addonID, files):
+	mod = modlist.Mod(modList, addonSearchResult={'id': addonID, 'name': 'Mod {}'.format(addonID),
+		'websiteUrl': 'https://example.com/{}'.format(addonID), 'authors': [{'name': 'author'}]}, fileInfo=files)
+	modList.addMod(mod, resolveDependencies=False)
+	return mod
+
+# Returns the File of the Mod with the given fileID
+def fileOf(mod, fileID):
+	return next(file for file in mod.files if file.fileID == fileID)
+
+class SolveTest(unittest.TestCase):
+	def setUp(self):
+		self.modList = modlist.ModList()
+		self.modList.minecraftVersion = '1.16.5'
+
+	def test_pinned_file_survives_solve(self):
+		mod = addMod(self.modList, 1, [fileItem(10, 'mod-1.0.jar'), fileItem(11, 'mod-1.1.jar'), fileItem(12, 'mod-1.2.jar')])
+		pinned = fileOf(mod, 10)
+		mod.selectedFile = pinned
+		result = self.modList.solve(solver.RELEASE_ONLY, pinned={1: pinned})
+		self.assertIs(result.selected[1], pinned)
+		self.assertIs(mod.selectedFile, pinned)
+		result = self.modList.solve(solver.RELEASE_ONLY) # Without the pin, the newest file wins again
+		self.assertEqual(mod.selectedFile.fileID, 12)
+
+	def test_newest_compatible_file(self):
+		mod = addMod(self.modList, 1, [fileItem(10, 'mod-1.9.jar'), fileItem(11, 'mod-1.10.jar'), fileItem(12, 'mod-2.0.jar', mcVersions=['1.17.1']),
+			fileItem(13, 'mod-1.11-beta.jar', releaseType=modlist.ReleaseType.BETA)])
+		self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(mod.selectedFile.fileID, 11) # 1.10 is newer than 1.9; 2.0 is for another version, 1.11 is a beta
+		self.modList.solve(solver.ALLOW_BETA)
+		self.assertEqual(mod.selectedFile.fileID, 13)
+		self.modList.solve(solver.PREFER_STABLE)
+		self.assertEqual(mod.selectedFile.fileID, 11)
+		self.modList.solve(solver.RELEASE_ONLY, minecraftVersion='1.17.1')
+		self.assertEqual(mod.selectedFile.fileID, 12)
+
+	def test_file_requiring_unsolvable_mod_is_pruned(self):
+		mod = addMod(self.modList, 1, [fileItem(10, 'mod-1.0.jar'), fileItem(11, 'mod-2.0.jar', dependencies=[2])])
+		library = addMod(self.modList, 2, [fileItem(20, 'lib-1.0.jar', mcVersions=['1.12.2'])])
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(mod.selectedFile.fileID, 10) # The newest file needs a library with no file for 1.16.5
+		self.assertIsNone(library.selectedFile)
+		self.assertEqual(list(result.conflicts), [2])
+
+	def test_dependencies_of_roots_are_selected_and_unneeded_mods_cleared(self):
+		addMod(self.modList, 1, [fileItem(10, 'mod-1.0.jar', dependencies=[2])])
+		addMod(self.modList, 2, [fileItem(20, 'lib-1.0.jar', dependencies=[3])])
+		core = addMod(self.modList, 3, [fileItem(30, 'core-1.0.jar')])
+		unneeded = addMod(self.modList, 4, [fileItem(40, 'other-1.0.jar')])
+		unneeded.selectedFile = unneeded.files[0]
+		result = self.modList.solve(solver.RELEASE_ONLY, roots=[1])
+		self.assertEqual({addonID: file.fileID for addonID, file in result.selected.items()}, {1: 10, 2: 20, 3: 30})
+		self.assertIs(core.selectedFile, core.files[0])
+		self.assertIsNone(unneeded.selectedFile)
+
+	def test_conflicts_explain_what_blocks_a_mod(self):
+		addMod(self.modList, 1, [fileItem(10, 'mod-1.0.jar', dependencies=[2])])
+		addMod(self.modList, 2, [fileItem(20, 'lib-1.0.jar', dependencies=[99])])
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(result.selected, {})
+		self.assertEqual(set(result.conflicts), {1, 2, 99})
+		self.assertIn('Mod 2', result.conflicts[1])
+		self.assertIn('mod 99', result.conflicts[2])
+		self.assertIn('not in the modlist', result.conflicts[99])
+
+	def test_dependency_cycle_is_solvable(self):
+		addMod(self.modList, 1, [fileItem(10, 'a-1.0.jar', dependencies=[2])])
+		addMod(self.modList, 2, [fileItem(20, 'b-1.0.jar', dependencies=[1])])
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(set(result.selected), {1, 2})
+		self.assertEqual(result.conflicts, {})
+
+	def test_incremental_resolve(self):
+		addMod(self.modList, 1, [fileItem(10, 'mod-1.0.jar', dependencies=[2])])
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(set(result.conflicts), {1, 2})
+		fileSolver = self.modList.solver
+
+		addMod(self.modList, 2, [fileItem(20, 'lib-1.0.jar')]) # Adding the missing library makes the mod solvable
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertIs(self.modList.solver, fileSolver) # Same version and policy: the memoized candidates are reused
+		self.assertEqual({addonID: file.fileID for addonID, file in result.selected.items()}, {1: 10, 2: 20})
+
+		self.modList.removeMod(2)
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(result.selected, {})
+		addMod(self.modList, 2, [fileItem(21, 'lib-1.1.jar')]) # A new Mod object for the same addon isn't served from the memo
+		result = self.modList.solve(solver.RELEASE_ONLY)
+		self.assertEqual(result.selected[2].fileID, 21)
+
+		self.modList.solve(solver.ALLOW_BETA)
+		self.assertIsNot(self.modList.solver, fileSolver)
+
+if __name__ == '__main__':
+	unittest.main()
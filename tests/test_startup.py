@@ -0,0 +1,34 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import startup
+
+# Enforces the GUI's startup import budget (see benchmarks/startup.py): runs "python -X importtime -c 'import application'"
+#   in fresh interpreters and fails if the import goes over startup.IMPORT_BUDGET_MS, or pulls in any of startup.DEFERRED_MODULES
+#   Usage: python -m unittest discover tests
+
+# Number of imports measured; the fastest counts, so one slow run on a busy machine doesn't fail the test
+RUNS = 3
+
+class StartupImportTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		try:
+			import tkinter
+		except ImportError:
+			raise unittest.SkipTest('tkinter is not available')
+		cls.measurements = [startup.importTime('application') for _ in range(RUNS)]
+
+	def test_import_within_budget(self):
+		cumulative = min(cumulative for cumulative, subtree in self.measurements)
+		self.assertLessEqual(cumulative / 1000, startup.IMPORT_BUDGET_MS,
+			'importing application took {:.1f} ms (budget {:.1f} ms)'.format(cumulative / 1000, startup.IMPORT_BUDGET_MS))
+
+	def test_no_deferred_modules(self):
+		cumulative, subtree = self.measurements[0]
+		self.assertEqual([name for name in startup.DEFERRED_MODULES if name in subtree], [], 'imported at startup')
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,165 @@
+import functools
+import threading
+import time
+import json
+import os
+import re
+
+# Lightweight tracing of API requests, dependency resolution and export, for finding out where a slow pack build spends its time
+#   Tracing is off by default, and then span() and count() do next to nothing; enable() starts recording into a Tracer
+#   A Tracer can be saved as a Chrome trace-event JSON file (open it in chrome://tracing or https://ui.perfetto.dev) or printed as a summary table
+#   Usage:
+#     tracer = tracing.enable()
+#     with tracing.span('createManifest', 'export', mods=len(modList.mods)) as span:
+#       ...
+#       span.set(files=len(manifest['files']))
+#     tracing.count('cache.hit')
+#     @tracing.traced('export')   (times every call of the decorated function)
+#     tracing.disable().saveChromeTrace('trace.json')
+
+# The Tracer spans and counters are recorded into, or None when tracing is off
+tracer = None
+
+# A span of work being timed; returned by span() while a Tracer is active
+class Span:
+	__slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+	# Instance variables:
+	#   tracer   - the Tracer the span is recorded into when it ends
+	#   name     - what is being done, e.g. the URL template of a request or "Mod"
+	#   category - the kind of work, e.g. "api", "resolve" or "export"; spans are grouped by (category, name) in the summary
+	#   args     - a dict of details shown with the span, e.g. {'status': 200, 'bytes': 51234}
+	#   start    - time.perf_counter_ns() when the span was entered
+	def __init__(self, tracer, name, category, args):
+		self.tracer = tracer
+		self.name = name
+		self.category = category
+		self.args = args
+		self.start = None
+
+	# Adds details to the span, e.g. ones only known once the work is done
+	def set(self, **args):
+		self.args.update(args)
+
+	def __enter__(self):
+		self.start = time.perf_counter_ns()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		end = time.perf_counter_ns()
+		if excType != None:
+			self.args['error'] = excType.__name__
+		self.tracer.record(self.name, self.category, self.start, end - self.start, threading.get_ident(), self.args)
+		return False
+
+# Stands in for a Span while tracing is off; a single shared instance that records nothing
+class NullSpan:
+	__slots__ = ()
+
+	def set(self, **args):
+		pass
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		return False
+
+NULL_SPAN = NullSpan()
+
+# Records finished spans and counters
+class Tracer:
+	# Instance variables:
+	#   events      - a list of (name, category, start ns, duration ns, thread ID, args) tuples of every finished span
+	#   counters    - a dict of {counter name: value}
+	#   threadNames - a dict of {thread ID: thread name} of every thread a span finished on
+	#   origin      - time.perf_counter_ns() when tracing started; trace timestamps are relative to it
+	def __init__(self):
+		self.events = []
+		self.counters = {}
+		self.threadNames = {}
+		self.origin = time.perf_counter_ns()
+		self.lock = threading.Lock()
+
+	def record(self, name, category, start, duration, threadID, args):
+		self.events.append((name, category, start, duration, threadID, args)) # list.append is atomic, so spans need no lock
+		if threadID not in self.threadNames:
+			self.threadNames[threadID] = threading.current_thread().name
+
+	def count(self, name, amount=1):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + amount
+
+	# Returns the trace as a Chrome trace-event format document
+	def toChromeTrace(self):
+		pid = os.getpid()
+		traceEvents = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': threadID, 'args': {'name': threadName}}
+			for threadID, threadName in self.threadNames.items()]
+		for name, category, start, duration, threadID, args in list(self.events):
+			traceEvents.append({'name': name, 'cat': category, 'ph': 'X', 'ts': (start - self.origin) / 1000, 'dur': duration / 1000,
+				'pid': pid, 'tid': threadID, 'args': args})
+		if self.counters:
+			traceEvents.append({'name': 'counters', 'ph': 'C', 'ts': (time.perf_counter_ns() - self.origin) / 1000, 'pid': pid, 'tid': 0,
+				'args': dict(self.counters)})
+		return {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+
+	def saveChromeTrace(self, path):
+		with open(path, 'w', encoding='utf-8') as traceFile:
+			json.dump(self.toChromeTrace(), traceFile, default=str)
+
+	# Returns a table of every (category, name) of span with its count, total, mean and maximum duration, slowest total first, then the counters
+	def summary(self):
+		groups = {}
+		for name, category, start, duration, threadID, args in list(self.events):
+			groups.setdefault((category, name), []).append(duration)
+		lines = ['{:<10} {:<32} {:>7} {:>11} {:>10} {:>10}'.format('category', 'span', 'count', 'total ms', 'mean ms', 'max ms')]
+		for (category, name), durations in sorted(groups.items(), key=lambda item: -sum(item[1])):
+			lines.append('{:<10} {:<32} {:>7} {:>11.1f} {:>10.3f} {:>10.3f}'.format(category, name[:32], len(durations), sum(durations) / 1e6,
+				sum(durations) / len(durations) / 1e6, max(durations) / 1e6))
+		for name, value in sorted(self.counters.items()):
+			lines.append('{:<43} {:>7}'.format(name, value))
+		return '\n'.join(lines)
+
+# Starts recording spans and counters into a new Tracer, and returns it
+def enable():
+	global tracer
+	tracer = Tracer()
+	return tracer
+
+# Stops recording, and returns the Tracer that was recording (or None)
+def disable():
+	global tracer
+	previous = tracer
+	tracer = None
+	return previous
+
+# Returns a context manager timing the work done inside it as a span, with args as its details
+#   Returns NULL_SPAN when tracing is off, so wrapping work in a span costs a function call
+#   The details can't be called spanName or spanCategory
+def span(spanName, spanCategory, **args):
+	if tracer == None:
+		return NULL_SPAN
+	return Span(tracer, spanName, spanCategory, args)
+
+# Decorator timing every call of the decorated function as a span named after it
+def traced(category):
+	def decorate(function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			if tracer == None:
+				return function(*args, **kwargs)
+			with Span(tracer, function.__qualname__, category, {}):
+				return function(*args, **kwargs)
+		return wrapper
+	return decorate
+
+# Adds amount to the named counter, if tracing is on
+def count(name, amount=1):
+	if tracer != None:
+		tracer.count(name, amount)
+
+# Returns the URL's path with numeric segments replaced by {} and no query string, e.g. "/addon/{}/files", to group requests by endpoint
+def urlTemplate(url, baseURL=''):
+	if url.startswith(baseURL):
+		url = url[len(baseURL):]
+	return re.sub(r'/\d+(?=/|$)', '/{}', url.split('?', 1)[0])
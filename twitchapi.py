@@ -1,47 +1,561 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import codecs
+import random
+import time
 import json
+import os
+
+import tracing
 
 # Uses the Twitch App API: https://twitchappapi.docs.apiary.io/
+#   requests (and apicache's sqlite3) are only imported once the first request is sent (or the cache is enabled),
+#   so importing this module stays cheap and the GUI can show its window before any of it loads
 
 # 'Constant' values
 MC_GAME_ID = 432
+MC_MODS_SECTION_ID = 6 # The "Mods" category section, as opposed to modpacks, resource packs and worlds
+SORT_LAST_UPDATED = 2  # Addon search sort order: most recently updated first
 HEADERS = {'User-Agent': 'ModpackBot/1.0'} # Extra header defining bot User-Agent
+DEFAULT_BASE_URL = 'https://addons-ecs.forgesvc.net/api/v2'
 URL_GET_ADDON_INFO             = 'https://addons-ecs.forgesvc.net/api/v2/addon/{}'
 URL_TWITCH_ADDON_SEARCH        = 'https://addons-ecs.forgesvc.net/api/v2/addon/search?gameId={}&searchFilter={}'
 URL_GET_ADDON_FILES            = 'https://addons-ecs.forgesvc.net/api/v2/addon/{}/files'
+URL_GET_MODS_PAGE              = 'https://addons-ecs.forgesvc.net/api/v2/addon/search?gameId={}&sectionId={}&sort={}&index={}&pageSize={}'
+URL_GET_VERSION_MODS_PAGE      = 'https://addons-ecs.forgesvc.net/api/v2/addon/search?gameId={}&sectionId={}&sort={}&index={}&pageSize={}&gameVersion={}'
 URL_GET_MINECRAFT_VERSION_LIST = 'https://addons-ecs.forgesvc.net/api/v2/minecraft/version'
 URL_GET_MODLOADER_LIST         = 'https://addons-ecs.forgesvc.net/api/v2/minecraft/modloader'
+URL_GET_ADDONS                 = 'https://addons-ecs.forgesvc.net/api/v2/addon'       # POST a JSON list of addonIDs
+URL_GET_FILES                  = 'https://addons-ecs.forgesvc.net/api/v2/addon/files' # POST a JSON list of fileIDs
+URL_GET_FINGERPRINT_MATCHES    = 'https://addons-ecs.forgesvc.net/api/v2/fingerprint' # POST a JSON list of fingerprints (see modimport.fingerprint)
+
+# How many IDs are sent in each batched request, and how many of those requests may run at once
+BATCH_CHUNK_SIZE = 100
+BATCH_MAX_WORKERS = 4
+
+# Streamed responses (see twitchAPIStream) are read and parsed this many bytes at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# decodeArray() states: before the opening bracket, before the first element (or the closing bracket), before a later element, after an element,
+#   after the closing bracket
+ARRAY_START = 0
+ARRAY_FIRST = 1
+ARRAY_ELEMENT = 2
+ARRAY_SEPARATOR = 3
+ARRAY_END = 4
+
+# How long, in seconds, a cached response from each endpoint is served without asking the server again
+#   Only used once the response cache has been enabled with enableCache()
+CACHE_TTLS = {
+	URL_GET_ADDON_INFO:             60 * 60,
+	URL_TWITCH_ADDON_SEARCH:        10 * 60,
+	URL_GET_ADDON_FILES:            60 * 60,
+	URL_GET_MODS_PAGE:              10 * 60,
+	URL_GET_VERSION_MODS_PAGE:      10 * 60,
+	URL_GET_MINECRAFT_VERSION_LIST: 24 * 60 * 60,
+	URL_GET_MODLOADER_LIST:         6 * 60 * 60,
+	}
+
+# HTTP status codes worth retrying: rate limiting and transient server-side failures
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# Base exception for any failed Twitch API call
+#   Raised instead of exiting so callers (the GUI, batch builds) can decide how to recover
+class TwitchAPIError(Exception):
+	def __init__(self, message, url=None, statusCode=None):
+		super().__init__(message)
+		self.url = url
+		self.statusCode = statusCode
+
+# Raised when the server answered, but not with HTTP 200 (after any retries were exhausted)
+class TwitchAPIStatusError(TwitchAPIError):
+	pass
+
+# Raised when no response could be obtained at all (connection refused, DNS failure, timeout)
+class TwitchAPIConnectionError(TwitchAPIError):
+	pass
+
+# Raised in offline mode when a response isn't available from the cache
+class TwitchAPIOfflineError(TwitchAPIError):
+	pass
+
+# Thread-safe counters describing how the transport has been used
+#   Useful for seeing what connection pooling and retries actually cost/save
+class TransportStats:
+	# Instance variables:
+	#   calls        - number of twitchAPI() calls made (successful or not)
+	#   attempts     - number of HTTP requests actually sent, including retries
+	#   retries      - number of attempts that were retries of an earlier failed attempt
+	#   failures     - number of calls that ended in a TwitchAPIError
+	#   totalLatency - summed wall time of every call in seconds, including backoff sleeps
+	#   maxLatency   - the slowest single call in seconds
+	#   lastLatency  - wall time of the most recent call in seconds
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.reset()
+
+	def reset(self):
+		self.calls = 0
+		self.attempts = 0
+		self.retries = 0
+		self.failures = 0
+		self.totalLatency = 0.0
+		self.maxLatency = 0.0
+		self.lastLatency = 0.0
+
+	def record(self, latency, attempts, failed):
+		with self.lock:
+			self.calls = self.calls + 1
+			self.attempts = self.attempts + attempts
+			self.retries = self.retries + attempts - 1
+			if failed:
+				self.failures = self.failures + 1
+			self.totalLatency = self.totalLatency + latency
+			self.maxLatency = max(self.maxLatency, latency)
+			self.lastLatency = latency
+
+	# Returns a plain dict snapshot of the counters
+	def snapshot(self):
+		with self.lock:
+			return {
+				'calls': self.calls,
+				'attempts': self.attempts,
+				'retries': self.retries,
+				'failures': self.failures,
+				'totalLatency': self.totalLatency,
+				'meanLatency': self.totalLatency / self.calls if self.calls else 0.0,
+				'maxLatency': self.maxLatency,
+				'lastLatency': self.lastLatency,
+				}
+
+	def __str__(self):
+		stats = self.snapshot()
+		return '{} calls, {} attempts ({} retries), {} failures, mean latency {:.3f}s, max latency {:.3f}s'.format(
+			stats['calls'], stats['attempts'], stats['retries'], stats['failures'], stats['meanLatency'], stats['maxLatency'])
+
+# Shared HTTP transport used by every Twitch API call
+#   Keeps a pool of keep-alive connections, and retries transient failures with jittered exponential backoff
+class Transport:
+	# Instance variables:
+	#   session        - the requests.Session holding the keep-alive connection pool; created by connect() on first use
+	#   connectTimeout - seconds to wait for a connection to be established
+	#   readTimeout    - seconds to wait between bytes of the response
+	#   maxRetries     - how many times a failed request is retried before giving up
+	#   backoffBase    - the first backoff delay in seconds; doubled on every retry
+	#   backoffMax     - upper bound for any single backoff or Retry-After delay in seconds
+	#   stats          - a TransportStats object counting calls, retries and latency
+	def __init__(self, poolSize=16, connectTimeout=5.0, readTimeout=30.0, maxRetries=4, backoffBase=0.5, backoffMax=30.0):
+		self.connectTimeout = connectTimeout
+		self.readTimeout = readTimeout
+		self.maxRetries = maxRetries
+		self.backoffBase = backoffBase
+		self.backoffMax = backoffMax
+		self.stats = TransportStats()
+		self.poolSize = poolSize
+		self.session = None
+		self.lock = threading.Lock()
+
+	# Returns the requests.Session, importing requests and creating the session the first time it's needed
+	def connect(self):
+		with self.lock:
+			if self.session == None:
+				import requests
+				from requests.adapters import HTTPAdapter
+				session = requests.Session()
+				session.headers.update(HEADERS)
+				adapter = HTTPAdapter(pool_connections=self.poolSize, pool_maxsize=self.poolSize, max_retries=0) # Retries are handled here, not by urllib3
+				session.mount('https://', adapter)
+				session.mount('http://', adapter)
+				self.session = session
+			return self.session
+
+	# Returns the delay before the next attempt, using "full jitter" so many clients don't retry in lockstep
+	def backoffDelay(self, attempt):
+		return random.uniform(0, min(self.backoffMax, self.backoffBase * (2 ** attempt)))
+
+	# Returns the delay requested by a Retry-After header in seconds, or None if it's absent/unparseable
+	#   The header may either be a number of seconds or an HTTP date
+	def retryAfterDelay(self, response):
+		retryAfter = response.headers.get('Retry-After')
+		if retryAfter == None:
+			return None
+		try:
+			return min(self.backoffMax, max(0.0, float(retryAfter)))
+		except ValueError:
+			pass
+		from email.utils import parsedate_to_datetime
+		from datetime import datetime, timezone
+		try:
+			retryDate = parsedate_to_datetime(retryAfter)
+		except (TypeError, ValueError):
+			return None
+		if retryDate.tzinfo == None:
+			retryDate = retryDate.replace(tzinfo=timezone.utc)
+		return min(self.backoffMax, max(0.0, (retryDate - datetime.now(timezone.utc)).total_seconds()))
+
+	# Sends a request, retrying transient failures, and returns the successful requests.Response
+	#   Traced as an "api" span named after the endpoint (see tracing.urlTemplate), with the response's status and size
+	#   okStatusCodes lists the HTTP statuses counted as success (e.g. 304 for conditional requests)
+	#   Raises TwitchAPIStatusError or TwitchAPIConnectionError once retries are exhausted; connection failures, timeouts and bodies cut off
+	#   mid-transfer are retried, and any other requests exception (bad URL, redirect loop, undecodable body) is raised at once as a TwitchAPIConnectionError
+	def request(self, method, url, headers=None, okStatusCodes=(200,), **kwargs):
+		session = self.connect()
+		import requests
+		with tracing.span(tracing.urlTemplate(url, baseURL), 'api', method=method, url=url) as span:
+			start = time.perf_counter()
+			attempt = 0
+			try:
+				while True:
+					attempt = attempt + 1
+					try:
+						response = session.request(method, url, headers=headers, timeout=(self.connectTimeout, self.readTimeout), **kwargs)
+						if not kwargs.get('stream'):
+							response.content # Read the body here, so a transfer cut off part way is retried too
+					except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as error:
+						if attempt > self.maxRetries:
+							raise TwitchAPIConnectionError('Request to {} failed: {}'.format(url, error), url=url) from error
+						time.sleep(self.backoffDelay(attempt - 1))
+						continue
+					except requests.RequestException as error:
+						raise TwitchAPIConnectionError('Request to {} failed: {}'.format(url, error), url=url) from error
+
+					if response.status_code in okStatusCodes:
+						self.stats.record(time.perf_counter() - start, attempt, False)
+						span.set(status=response.status_code, attempts=attempt,
+							bytes=response.headers.get('Content-Length') if kwargs.get('stream') else len(response.content)) # Don't read a streamed body here
+						return response
+
+					if response.status_code not in RETRY_STATUS_CODES or attempt > self.maxRetries:
+						raise TwitchAPIStatusError('Request to {} failed with HTTP {}'.format(url, response.status_code), url=url, statusCode=response.status_code)
+
+					# Prefer the server's own idea of when to come back, otherwise back off exponentially
+					delay = self.retryAfterDelay(response)
+					if delay == None:
+						delay = self.backoffDelay(attempt - 1)
+					response.close() # Release the connection back to the pool before sleeping
+					time.sleep(delay)
+			except TwitchAPIError as error:
+				self.stats.record(time.perf_counter() - start, attempt, True)
+				span.set(status=getattr(error, 'statusCode', None), attempts=attempt)
+				raise
+
+	def close(self):
+		with self.lock:
+			if self.session != None:
+				self.session.close()
+				self.session = None
+
+# The transport shared by every call in this module
+transport = Transport()
+
+# Replaces the shared transport with one using the given settings (see Transport for the available keyword arguments)
+def configureTransport(**kwargs):
+	global transport
+	transport.close()
+	transport = Transport(**kwargs)
+	return transport
+
+# Returns a snapshot dict of the shared transport's call/retry/latency counters
+def getTransportStats():
+	return transport.stats.snapshot()
+
+# The server every request is sent to, in place of DEFAULT_BASE_URL (e.g. a local stand-in server for testing and benchmarks)
+#   Defaults to the PACKCRAFTER_API_URL environment variable if it's set
+baseURL = os.environ.get('PACKCRAFTER_API_URL', DEFAULT_BASE_URL).rstrip('/')
+
+# Sends every following request to the server at url instead (or back to the real API if url is None)
+def setBaseURL(url=None):
+	global baseURL
+	baseURL = (url if url != None else DEFAULT_BASE_URL).rstrip('/')
+
+# Returns url pointed at baseURL
+def rebase(url):
+	if baseURL != DEFAULT_BASE_URL and url.startswith(DEFAULT_BASE_URL):
+		return baseURL + url[len(DEFAULT_BASE_URL):]
+	return url
+
+# The persistent response cache, or None if caching is disabled (the default)
+cache = None
+# When True, every call is answered from the cache and the network is never touched
+offline = False
+
+# Turns on the persistent response cache (see apicache.ResponseCache), optionally in offline mode
+def enableCache(path=None, maxSize=256 * 1024 * 1024, offlineMode=False):
+	import apicache
+	global cache, offline
+	if cache != None:
+		cache.close()
+	cache = apicache.ResponseCache(path, maxSize)
+	offline = offlineMode
+	return cache
+
+# Turns off the persistent response cache and offline mode
+def disableCache():
+	global cache, offline
+	if cache != None:
+		cache.close()
+	cache = None
+	offline = False
+
+# Parses a response body as JSON, raising a TwitchAPIError if it's malformed
+def decodeJSON(body, url):
+	try:
+		return json.loads(body)
+	except ValueError as error:
+		raise TwitchAPIError('Invalid JSON returned by {}'.format(url), url=url) from error
+
+# Parses a response body that is a JSON array one element at a time, yielding project(element) (or the element itself) for each
+#   chunks is an iterable of bytes, e.g. a streamed response's iter_content(); only the element being parsed and the chunk it's in
+#   are held at once, so the whole array never has to be in memory, and the caller can work on each element as soon as it has arrived
+#   Raises a TwitchAPIError if the body isn't a well-formed JSON array, including if anything but whitespace follows it
+def decodeArray(chunks, url, project=None):
+	decoder = json.JSONDecoder()
+	textDecoder = codecs.getincrementaldecoder('utf-8')()
+	chunks = iter(chunks)
+	buffer = ''
+	position = 0
+	final = False
+	state = ARRAY_START
+	while True:
+		while position < len(buffer) and buffer[position] in ' \t\r\n':
+			position = position + 1
+		if position == len(buffer) and not final:
+			chunk = next(chunks, None)
+			final = chunk == None
+			buffer = buffer[position:] + textDecoder.decode(chunk if chunk != None else b'', final)
+			position = 0
+			continue
+		character = buffer[position] if position < len(buffer) else ''
+
+		if state == ARRAY_START:
+			if character != '[':
+				raise TwitchAPIError('Expected a JSON array from {}'.format(url), url=url)
+			position = position + 1
+			state = ARRAY_FIRST
+		elif state == ARRAY_FIRST and character == ']':
+			position = position + 1
+			state = ARRAY_END
+		elif state == ARRAY_FIRST or state == ARRAY_ELEMENT:
+			try:
+				element, end = decoder.raw_decode(buffer, position)
+			except ValueError:
+				end = None
+			# The element may carry on in the next chunk: raw_decode() takes 1 from "1." or "1e", so until the "," or "]" after a number
+			#   (or other scalar) has arrived, it may only be the start of one
+			if end == None or (not final and not isinstance(element, (dict, list)) and buffer.find(',', end) == -1 and buffer.find(']', end) == -1):
+				if final:
+					raise TwitchAPIError('Invalid JSON returned by {}'.format(url), url=url)
+				chunk = next(chunks, None)
+				final = chunk == None
+				buffer = buffer[position:] + textDecoder.decode(chunk if chunk != None else b'', final)
+				position = 0
+				continue
+			position = end
+			state = ARRAY_SEPARATOR
+			yield project(element) if project != None else element
+		elif state == ARRAY_SEPARATOR and character == ',':
+			position = position + 1
+			state = ARRAY_ELEMENT
+		elif state == ARRAY_SEPARATOR and character == ']':
+			position = position + 1
+			state = ARRAY_END
+		elif state == ARRAY_END and character == '':
+			return
+		else:
+			raise TwitchAPIError('Invalid JSON returned by {}'.format(url), url=url)
+
+# Sends a get request to url, unless the cache can answer it
+#   Returns (the cached body, None) if the cache has a response younger than ttl seconds (or any response, offline),
+#   or one the server confirms is still current with a 304; otherwise (None, the successful requests.Response)
+#   An older cached response is revalidated with ETag/Last-Modified; stream is passed on to requests
+def cachedGet(url, headers, ttl, stream=False):
+	if cache == None:
+		return None, transport.request('GET', url, headers=headers, stream=stream)
+
+	entry = cache.get(url)
+	if entry != None and (offline or entry.isFresh(ttl)):
+		tracing.count('cache.hit')
+		return entry.body, None
+	tracing.count('cache.miss')
+	if offline:
+		raise TwitchAPIOfflineError('{} is not cached and offline mode is enabled'.format(url), url=url)
+
+	requestHeaders = dict(headers)
+	if entry != None:
+		requestHeaders.update(entry.validatorHeaders())
+	response = transport.request('GET', url, headers=requestHeaders, okStatusCodes=(200, 304) if entry != None else (200,), stream=stream)
+	if response.status_code == 304:
+		tracing.count('cache.revalidated')
+		response.close()
+		cache.touch(url)
+		return entry.body, None
+	return None, response
 
 # Sends a get request to the provided URL, and returns the result as a JSON
-def twitchAPI(url, headers):
-	response = requests.get(url, headers=headers)
-	# Check for successful response (HTTP 200: OK)
-	if response.status_code != 200 :
-		print("Error: " + str(response.status_code))
-		exit()
-	return response.json()
+#   If the cache is enabled, a cached response younger than ttl seconds is returned without a request,
+#   and an older one is revalidated with ETag/Last-Modified before being reused
+#   Raises a TwitchAPIError if the request can't be completed
+def twitchAPI(url, headers=HEADERS, ttl=None):
+	url = rebase(url)
+	body, response = cachedGet(url, headers, ttl)
+	if response == None:
+		return decodeJSON(body, url)
+	result = decodeJSON(response.content, url)
+	if cache != None:
+		cache.put(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+	return result
+
+# Like twitchAPI() for a URL whose response is a JSON array, but yields its elements one at a time as they're downloaded (see decodeArray),
+#   each passed through project() if given, so fields that aren't needed are dropped as soon as each element has been parsed
+#   Nothing is sent until the first element is asked for. With the cache enabled, the raw body is kept to be cached once it has all
+#   arrived (still far smaller than the parsed array), and cached responses are parsed the same way
+#   Raises a TwitchAPIError if the request can't be completed, or the download fails partway
+def twitchAPIStream(url, project=None, headers=HEADERS, ttl=None):
+	import requests
+	url = rebase(url)
+	body, response = cachedGet(url, headers, ttl, stream=True)
+	if response == None:
+		yield from decodeArray((body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)), url, project)
+		return
+
+	received = [] if cache != None else None
+	def chunks():
+		for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+			if received != None:
+				received.append(chunk)
+			yield chunk
+	try:
+		yield from decodeArray(chunks(), url, project)
+	except requests.RequestException as error:
+		raise TwitchAPIConnectionError('Download from {} failed: {}'.format(url, error), url=url) from error
+	finally:
+		response.close()
+	if received != None:
+		cache.put(url, b''.join(received), response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+# Sends a post request with a JSON payload to the provided URL, and returns the result as a JSON
+#   Posts are never cached; raises a TwitchAPIOfflineError in offline mode, or a TwitchAPIError if the request can't be completed
+def twitchAPIPost(url, payload, headers=HEADERS):
+	url = rebase(url)
+	if offline:
+		raise TwitchAPIOfflineError('Cannot post to {} in offline mode'.format(url), url=url)
+	return decodeJSON(transport.request('POST', url, headers=headers, json=payload).content, url)
+
+# Posts ids to url in chunks of at most chunkSize, with up to maxWorkers chunks in flight at once
+#   Returns the list of JSON responses, one per chunk
+def postChunks(url, ids, chunkSize=BATCH_CHUNK_SIZE, maxWorkers=BATCH_MAX_WORKERS):
+	chunks = [ids[i:i + chunkSize] for i in range(0, len(ids), chunkSize)]
+	if len(chunks) <= 1 or maxWorkers <= 1:
+		return [twitchAPIPost(url, chunk) for chunk in chunks]
+	with ThreadPoolExecutor(max_workers=min(maxWorkers, len(chunks)), thread_name_prefix='Batch') as executor:
+		return list(executor.map(lambda chunk: twitchAPIPost(url, chunk), chunks))
 
 # Returns the JSON response to the "Get Addon Info" Twitch API call
 #   Behavior defined at: https://twitchappapi.docs.apiary.io/#/reference/0/get-addon-info/get-addon-info/200?mc=reference%2F0%2Fget-addon-info%2Fget-addon-info%2F200
 def getAddonInfo(addonID):
-	return twitchAPI(URL_GET_ADDON_INFO.format(addonID), HEADERS)
+	return twitchAPI(URL_GET_ADDON_INFO.format(addonID), HEADERS, CACHE_TTLS[URL_GET_ADDON_INFO])
+
+# Returns a dict of {addonID: "Get Addon Info" JSON response} for many addons, using the "Get Multiple Addons" Twitch API call
+#   Addons with a fresh cached getAddonInfo() response aren't requested again, and fetched ones are cached as if by getAddonInfo()
+#   The rest are requested in concurrent chunks (see postChunks); addonIDs the server doesn't know are left out of the result
+def getAddonInfos(addonIDs, chunkSize=BATCH_CHUNK_SIZE, maxWorkers=BATCH_MAX_WORKERS):
+	infos = {}
+	missing = []
+	for addonID in dict.fromkeys(addonIDs):
+		entry = cache.get(rebase(URL_GET_ADDON_INFO.format(addonID))) if cache != None else None
+		if entry != None and (offline or entry.isFresh(CACHE_TTLS[URL_GET_ADDON_INFO])):
+			tracing.count('cache.hit')
+			infos[addonID] = decodeJSON(entry.body, entry.url)
+		else:
+			missing.append(addonID)
+
+	if len(missing) == 1: # A plain GET can be revalidated with its ETag next time
+		try:
+			infos[missing[0]] = getAddonInfo(missing[0])
+		except TwitchAPIStatusError as error:
+			if error.statusCode != 404:
+				raise
+	elif missing:
+		if cache != None:
+			tracing.count('cache.miss', len(missing))
+		for response in postChunks(URL_GET_ADDONS, missing, chunkSize, maxWorkers):
+			for info in response:
+				infos[info['id']] = info
+				if cache != None:
+					cache.put(rebase(URL_GET_ADDON_INFO.format(info['id'])), json.dumps(info).encode('utf-8'))
+	return infos
+
+# Returns a dict of {fileID: file JSON} for many files, using the "Get Multiple Files" Twitch API call
+#   The files are requested in concurrent chunks (see postChunks); fileIDs the server doesn't know are left out of the result
+def getFiles(fileIDs, chunkSize=BATCH_CHUNK_SIZE, maxWorkers=BATCH_MAX_WORKERS):
+	files = {}
+	for response in postChunks(URL_GET_FILES, list(dict.fromkeys(fileIDs)), chunkSize, maxWorkers):
+		# The response maps each requested ID to a list of files; accept a plain list of files as well
+		for fileInfo in (fileInfo for value in response.values() for fileInfo in value) if isinstance(response, dict) else response:
+			files[fileInfo['id']] = fileInfo
+	return files
+
+# Returns a dict of {fingerprint: (addonID, file JSON)} of the fingerprints that exactly match a CurseForge file, using the "Get Fingerprint Matches" Twitch API call
+#   Every fingerprint is looked up in a single request; fingerprints that match nothing are left out of the result
+def getFingerprintMatches(fingerprints):
+	fingerprints = list(dict.fromkeys(fingerprints))
+	if not fingerprints:
+		return {}
+	response = twitchAPIPost(URL_GET_FINGERPRINT_MATCHES, fingerprints)
+	return {match['file']['packageFingerprint']: (match['id'], match['file']) for match in response.get('exactMatches') or ()}
+
+# Returns the fields of a "Get Addon Files" response element that modlist.File uses, dropping the rest (modules, fingerprints, changelogs...)
+def projectFile(fileInfo):
+	return {
+		'id': fileInfo['id'],
+		'fileName': fileInfo['fileName'],
+		'downloadUrl': fileInfo['downloadUrl'],
+		'fileLength': fileInfo.get('fileLength'),
+		'hashes': [{'algo': entry.get('algo', entry.get('algorithm')), 'value': entry['value']} for entry in fileInfo.get('hashes') or ()],
+		'releaseType': fileInfo['releaseType'],
+		'gameVersion': fileInfo['gameVersion'],
+		'dependencies': [{'addonId': dependency['addonId'], 'type': dependency['type']} for dependency in fileInfo['dependencies']],
+		}
+
+# Returns the fields of a "Get Modloader List" response element that modloaders.Modloader uses
+def projectModloader(entry):
+	return {'name': entry['name'], 'gameVersion': entry['gameVersion'], 'latest': entry.get('latest'), 'recommended': entry.get('recommended')}
 
 # Returns the JSON response to the "Twitch Addon Search" Twitch API call
 #   Behavior defined at: https://twitchappapi.docs.apiary.io/#/reference/0/twitch-addon-search/twitch-addon-search/200?mc=reference%2F0%2Ftwitch-addon-search%2Ftwitch-addon-search%2F200
 def twitchAddonSearch(searchFilter):
-	return twitchAPI(URL_TWITCH_ADDON_SEARCH.format(MC_GAME_ID, searchFilter), HEADERS)
+	return twitchAPI(URL_TWITCH_ADDON_SEARCH.format(MC_GAME_ID, searchFilter), HEADERS, CACHE_TTLS[URL_TWITCH_ADDON_SEARCH])
 
 # Returns the JSON response to the "Get Addon Files" Twitch API call
 #   Behavior defined at: https://twitchappapi.docs.apiary.io/#/reference/0/get-addon-files/get-addon-files/200?mc=reference%2F0%2Fget-addon-files%2Fget-addon-files%2F200
 def getAddonFiles(addonID):
-	return twitchAPI(URL_GET_ADDON_FILES.format(addonID), HEADERS)
+	return twitchAPI(URL_GET_ADDON_FILES.format(addonID), HEADERS, CACHE_TTLS[URL_GET_ADDON_FILES])
+
+# Yields the files of getAddonFiles() one at a time as they're downloaded, reduced to the fields modlist.File uses (see projectFile)
+#   Popular mods have thousands of files, and their full response is several megabytes of JSON
+def streamAddonFiles(addonID):
+	return twitchAPIStream(URL_GET_ADDON_FILES.format(addonID), projectFile, HEADERS, CACHE_TTLS[URL_GET_ADDON_FILES])
+
+# Returns one page of the "Twitch Addon Search" Twitch API call listing every Minecraft mod (no search filter), in the given sort order
+#   index is the number of results to skip; used by catalog.Catalog to page through the whole mod catalog
+#   If gameVersion is given, only mods with files for that Minecraft version are listed
+#   The server refuses (with HTTP 400) an index past the deepest it allows, so a listing longer than that can't be paged to the end
+def getModsPage(index, pageSize=50, sort=SORT_LAST_UPDATED, gameVersion=None):
+	if gameVersion != None:
+		return twitchAPI(URL_GET_VERSION_MODS_PAGE.format(MC_GAME_ID, MC_MODS_SECTION_ID, sort, index, pageSize, gameVersion), HEADERS, CACHE_TTLS[URL_GET_VERSION_MODS_PAGE])
+	return twitchAPI(URL_GET_MODS_PAGE.format(MC_GAME_ID, MC_MODS_SECTION_ID, sort, index, pageSize), HEADERS, CACHE_TTLS[URL_GET_MODS_PAGE])
 
 # Returns the JSON response to the "Get Minecraft Version List" Twitch API call
 #   Behavior defined at: https://twitchappapi.docs.apiary.io/#/reference/0/get-minecraft-version-list/get-minecraft-version-list/200?mc=reference%2F0%2Fget-minecraft-version-list%2Fget-minecraft-version-list%2F200
 def getMinecraftVersionList():
-	return twitchAPI(URL_GET_MINECRAFT_VERSION_LIST, HEADERS)
+	return twitchAPI(URL_GET_MINECRAFT_VERSION_LIST, HEADERS, CACHE_TTLS[URL_GET_MINECRAFT_VERSION_LIST])
 
 # Returns the JSON response to the "Get Modloader List" Twitch API call
 #   Behavior defined at: https://twitchappapi.docs.apiary.io/#/reference/0/get-modloader-list/get-modloader-list/200?mc=reference%2F0%2Fget-modloader-list%2Fget-modloader-list%2F200
 def getModloaderList():
-	return twitchAPI(URL_GET_MODLOADER_LIST, HEADERS)
+	return twitchAPI(URL_GET_MODLOADER_LIST, HEADERS, CACHE_TTLS[URL_GET_MODLOADER_LIST])
+
+# Yields the entries of getModloaderList() one at a time as they're downloaded, reduced to the fields modloaders.Modloader uses
+#   The list holds every Forge build for every Minecraft version, and is several megabytes of JSON
+def streamModloaderList():
+	return twitchAPIStream(URL_GET_MODLOADER_LIST, projectModloader, HEADERS, CACHE_TTLS[URL_GET_MODLOADER_LIST])
@@ -0,0 +1,218 @@
+import argparse
+import logging
+import json
+import sys
+import os
+
+import twitchapi
+import modlist
+import lockfile
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Checks built packs for newer files of their mods, without resolving any ModList again
+#   Only the addon info of each mod is needed: its "gameVersionLatestFiles" names the newest file of every Minecraft version and
+#   release type, so a pack is checked by comparing those with its manifest.json. The infos of every pack checked together are fetched
+#   with batched getAddonInfos() calls (and cached, if the response cache is enabled), so 40 packs take a handful of requests
+#   Applying upgrades rewrites the pack's manifest.json and packcrafter.lock in place; rebuilding it then only regenerates its output
+#   Usage:
+#     python updatecheck.py build/*/manifest.json                                (lists the upgrades of every pack)
+#     python updatecheck.py build/MyPack/manifest.json --allow beta --apply      (applies the newest release or beta of every mod)
+#     python updatecheck.py build/MyPack/manifest.json --apply 238222 32274      (applies the upgrades of only these mods)
+
+# The "modLoader" number of Forge in gameVersionLatestFiles entries (entries without one apply to every modloader)
+MODLOADER_FORGE = 1
+
+# A newer file for one of a pack's mods
+class Upgrade:
+	# Instance variables:
+	#   addonID       - the CurseForge "Addon ID" of the mod
+	#   name          - the name of the mod
+	#   currentFileID - the "File ID" of the file the pack uses now
+	#   fileID        - the "File ID" of the newer file
+	#   fileName      - the name of the newer file
+	#   releaseType   - the ReleaseType of the newer file
+	def __init__(self, addonID, name, currentFileID, fileID, fileName, releaseType):
+		self.addonID = addonID
+		self.name = name
+		self.currentFileID = currentFileID
+		self.fileID = fileID
+		self.fileName = fileName
+		self.releaseType = modlist.ReleaseType(releaseType)
+
+	def __str__(self):
+		return '{} {}'.format(self.releaseType.name.lower(), self.fileName)
+
+# The upgrades available for one built pack
+class PackUpdates:
+	# Instance variables:
+	#   manifestPath - the path of the pack's manifest.json
+	#   manifest     - the manifest's JSON structure
+	#   lock         - the lockfile.PackLock saved next to the manifest, or None if there is none
+	#   infos        - a dict of {addonID: addon info} of (at least) the pack's mods, as fetched when the pack was checked
+	#   upgrades     - a dict of {addonID: list of Upgrades, newest first} of the mods with newer files; at most one Upgrade per ReleaseType
+	#   pinned       - the set of addonIDs the pack spec pins to a file (as recorded in the lockfile); these are reported, but never applied
+	def __init__(self, manifestPath, manifest, lock, infos):
+		self.manifestPath = manifestPath
+		self.manifest = manifest
+		self.lock = lock
+		self.infos = infos
+		self.pinned = {addonID for addonID, fileID in lock.requested.items() if fileID != None} if lock != None else set()
+		self.upgrades = findUpgrades(manifest, infos)
+
+	@property
+	def minecraftVersion(self):
+		return self.manifest['minecraft']['version']
+
+	# Returns a list of the newest Upgrade of every mod (or only of those in addonIDs) that is of an allowed release type:
+	#   allow is the least stable ReleaseType to accept, e.g. ReleaseType.BETA accepts releases and betas. Pinned mods are left out
+	def best(self, allow=modlist.ReleaseType.RELEASE, addonIDs=None):
+		chosen = []
+		for addonID, upgrades in self.upgrades.items():
+			if addonID in self.pinned or (addonIDs != None and addonID not in addonIDs):
+				continue
+			upgrade = next((upgrade for upgrade in upgrades if upgrade.releaseType <= allow), None)
+			if upgrade != None:
+				chosen.append(upgrade)
+		return chosen
+
+	# Returns the name of the file the pack uses for addonID if the lockfile knows it, otherwise its file ID
+	def currentFileName(self, addonID, fileID):
+		if self.lock != None and addonID in self.lock.mods and self.lock.mods[addonID].fileID == fileID:
+			return self.lock.mods[addonID].fileName
+		return 'file {}'.format(fileID)
+
+# Returns the manifest.json structure saved at path
+def loadManifest(path):
+	with open(path, encoding='utf-8') as manifestFile:
+		return json.load(manifestFile)
+
+# Returns a dict of {ReleaseType: (fileID, fileName)} of the newest Forge file of each release type an addon has for the Minecraft version,
+#   read from its addon info's "gameVersionLatestFiles"
+def latestFiles(info, minecraftVersion):
+	latest = {}
+	for entry in info.get('gameVersionLatestFiles') or ():
+		if entry.get('gameVersion') != minecraftVersion or entry.get('modLoader') not in (None, MODLOADER_FORGE) or 'projectFileId' not in entry:
+			continue
+		releaseType = modlist.ReleaseType(entry['fileType'])
+		if releaseType not in latest or entry['projectFileId'] > latest[releaseType][0]:
+			latest[releaseType] = (entry['projectFileId'], entry.get('projectFileName'))
+	return latest
+
+# Returns a dict of {addonID: list of Upgrades, newest first} of the manifest's mods that have a file newer than the one they use
+#   CurseForge file IDs only ever grow, so a newer file is one with a greater file ID; infos is a dict of {addonID: addon info}
+def findUpgrades(manifest, infos):
+	minecraftVersion = manifest['minecraft']['version']
+	upgrades = {}
+	for entry in manifest['files']:
+		addonID, fileID = entry['projectID'], entry['fileID']
+		if addonID not in infos:
+			logger.warning('Mod %s no longer exists on CurseForge', addonID)
+			continue
+		found = [Upgrade(addonID, infos[addonID]['name'], fileID, newFileID, fileName, releaseType)
+			for releaseType, (newFileID, fileName) in latestFiles(infos[addonID], minecraftVersion).items() if newFileID > fileID]
+		if found:
+			upgrades[addonID] = sorted(found, key=lambda upgrade: -upgrade.fileID)
+	return upgrades
+
+# Checks the packs whose manifest.json files are at manifestPaths for upgrades, and returns a list of their PackUpdates
+#   The addon info of every mod of every pack is fetched at once, in batches (see twitchapi.getAddonInfos)
+@tracing.traced('update')
+def checkPacks(manifestPaths):
+	loaded = []
+	for path in manifestPaths:
+		lock = lockfile.PackLock.load(os.path.join(os.path.dirname(path), lockfile.LOCK_FILE_NAME))
+		loaded.append((path, loadManifest(path), lock))
+	infos = twitchapi.getAddonInfos([entry['projectID'] for path, manifest, lock in loaded for entry in manifest['files']])
+	return [PackUpdates(path, manifest, lock, infos) for path, manifest, lock in loaded]
+
+# Applies the given Upgrades of a pack to its manifest.json and lockfile, in place
+#   Only the upgraded files are fetched (one batched getFiles() request). An upgrade whose file requires a mod the pack doesn't have
+#   is skipped, as adding that mod takes a rebuild that resolves it
+#   Returns (list of the Upgrades applied, list of (Upgrade, reason) tuples of those skipped)
+@tracing.traced('update')
+def applyUpgrades(packUpdates, upgrades):
+	files = twitchapi.getFiles([upgrade.fileID for upgrade in upgrades])
+	entries = {entry['projectID']: entry for entry in packUpdates.manifest['files']}
+	applied = []
+	skipped = []
+	for upgrade in upgrades:
+		fileInfo = files.get(upgrade.fileID)
+		if fileInfo == None:
+			skipped.append((upgrade, 'file {} no longer exists'.format(upgrade.fileID)))
+			continue
+		missing = [dependency['addonId'] for dependency in fileInfo['dependencies']
+			if dependency['type'] == modlist.DependencyType.REQUIRED and dependency['addonId'] not in entries]
+		if missing:
+			skipped.append((upgrade, 'it requires mods the pack does not have ({}); rebuild the pack to add them'.format(', '.join(str(addonID) for addonID in missing))))
+			continue
+		entries[upgrade.addonID]['fileID'] = upgrade.fileID
+		if packUpdates.lock != None and upgrade.addonID in packUpdates.lock.mods:
+			packUpdates.lock.mods[upgrade.addonID] = lockfile.LockedMod.fromInfo(packUpdates.infos[upgrade.addonID], fileInfo)
+		applied.append(upgrade)
+		logger.info('Upgraded %s to %s', upgrade.name, upgrade.fileName)
+
+	if applied:
+		with open(packUpdates.manifestPath + '.tmp', 'w', encoding='utf-8') as manifestFile:
+			json.dump(packUpdates.manifest, manifestFile, indent='\t')
+		os.replace(packUpdates.manifestPath + '.tmp', packUpdates.manifestPath)
+		if packUpdates.lock != None:
+			packUpdates.lock.save(os.path.join(os.path.dirname(packUpdates.manifestPath), lockfile.LOCK_FILE_NAME))
+	for upgrade in applied:
+		packUpdates.upgrades.pop(upgrade.addonID, None)
+	return applied, skipped
+
+# Prints the upgrades of a pack, marking those of release types allow doesn't accept and those of pinned mods
+def printUpdates(packUpdates, allow):
+	manifest = packUpdates.manifest
+	print('{} {} (Minecraft {}): {} of {} mods have newer files'.format(manifest['name'], manifest['version'], packUpdates.minecraftVersion,
+		len(packUpdates.upgrades), len(manifest['files'])))
+	for addonID, upgrades in packUpdates.upgrades.items():
+		note = ' (pinned)' if addonID in packUpdates.pinned else ''
+		if not note and all(upgrade.releaseType > allow for upgrade in upgrades):
+			note = ' (no {} or more stable file)'.format(allow.name.lower())
+		print('  {} [{}]: {} -> {}{}'.format(upgrades[0].name, addonID, packUpdates.currentFileName(addonID, upgrades[0].currentFileID),
+			', '.join(str(upgrade) for upgrade in upgrades), note))
+
+# Command-line entry point; returns the process exit code
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Check built modpacks for newer files of their mods, and optionally apply them')
+	parser.add_argument('manifests', nargs='+', help='manifest.json files of built packs')
+	parser.add_argument('--allow', choices=['release', 'beta', 'alpha'], default='release',
+		help='least stable release type to upgrade to (default: release)')
+	parser.add_argument('--apply', nargs='*', type=int, metavar='ADDONID', help='apply the newest allowed upgrade of every mod, or only of the given addonIDs')
+	parser.add_argument('--cache', action='store_true', help='use the persistent API response cache')
+	parser.add_argument('--verbose', action='store_true', help='log every upgrade applied')
+	parser.add_argument('--trace', metavar='FILE', help='save a Chrome trace-event JSON trace of the check to FILE, and print a summary of it')
+	args = parser.parse_args(argv)
+
+	logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+	if args.trace:
+		tracing.enable()
+	if args.cache:
+		twitchapi.enableCache()
+
+	allow = modlist.ReleaseType[args.allow.upper()]
+	try:
+		packs = checkPacks(args.manifests)
+		for packUpdates in packs:
+			printUpdates(packUpdates, allow)
+			if args.apply != None:
+				applied, skipped = applyUpgrades(packUpdates, packUpdates.best(allow, set(args.apply) if args.apply else None))
+				for upgrade in applied:
+					print('  Upgraded {} to {}'.format(upgrade.name, upgrade.fileName))
+				for upgrade, reason in skipped:
+					print('  Skipped {} {}: {}'.format(upgrade.name, upgrade.fileName, reason))
+	except (OSError, ValueError, KeyError, twitchapi.TwitchAPIError) as error:
+		print('Error: {}'.format(error), file=sys.stderr)
+		return 2
+	finally:
+		if args.trace:
+			tracer = tracing.disable()
+			tracer.saveChromeTrace(args.trace)
+			print(tracer.summary())
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())